@@ -8,14 +8,40 @@
 '''
 
 from typing import Callable
+from array import array
+import asyncio
+import time
 import carb.events
 import omni.kit.app
 
+from .plc_types import compile_type
+
 EVENT_TYPE_DATA_INIT = carb.events.type_from_string("loupe.simulation.br_bridge.DATA_INIT")
 EVENT_TYPE_DATA_READ = carb.events.type_from_string("loupe.simulation.br_bridge.DATA_READ")
 EVENT_TYPE_DATA_READ_REQ = carb.events.type_from_string("loupe.simulation.br_bridge.DATA_READ_REQ")
 EVENT_TYPE_DATA_WRITE_REQ = carb.events.type_from_string("loupe.simulation.br_bridge.DATA_WRITE_REQ")
 
+# The running bridge, for queries that can't be answered through the event stream.
+_active_bridge = None
+
+def _set_active_bridge(bridge):
+    global _active_bridge
+    _active_bridge = bridge
+
+class DataViewEvent():
+    """
+    Passed to lazy data callbacks in place of the DATA_READ event.
+
+    Attributes:
+        type (int): The event type.
+        payload (dict): {'data': NestedView}, shaped like the payload of the DATA_READ event.
+
+    """
+
+    def __init__(self, event, view):
+        self.type = event.type if event is not None else EVENT_TYPE_DATA_READ
+        self.payload = {'data': view}
+
 class Manager:
     """
     Manager class provides an interface for interacting with the B&R Bridge Extension.
@@ -25,11 +51,53 @@ class Manager:
 
         register_init_callback( callback : Callable[[carb.events.IEvent], None] ): Registers a callback function for the DATA_INIT event.
     
-        register_data_callback( callback : Callable[[carb.events.IEvent], None] ): Registers a callback function for the DATA_READ event.
+        register_data_callback( callback : Callable[[carb.events.IEvent], None], lazy : bool = False ): Registers a callback function for the DATA_READ event.
         
-        add_cyclic_read_variables( variable_name_array : list[str]): Adds variables to the cyclic read list.
+        add_cyclic_read_variables( variable_name_array : list[str], deadband : float = None, relative_deadband : float = None): Adds variables to the cyclic read list.
+
+        add_read_group( name : str, variable_name_array : list[str], trigger : str, predicate : Callable[[any], bool] = None, fallback_period : float = None ): Adds variables that are read when a trigger fires, instead of every cycle.
+
+        remove_read_group( name : str ): Removes a read group.
+
+        set_deadband( pattern : str, absolute : float = 0.0, relative : float = 0.0 ): Sets the deadband for variables matching a pattern.
+
+        set_variable_types( types : dict ): Sets the PLC types of variables, to normalize read values and validate written values.
         
-        write_variable( name : str, value : any ): Writes a variable value to the B&R Bridge.
+        write_variable( name : str, value : any, priority : bool = False ): Writes a variable value to the B&R Bridge.
+
+        write_variables( values : dict, priority : bool = False ): Writes multiple variable values to the B&R Bridge with a single event.
+
+        tick(): Triggers a communication cycle, if the bridge is driven by external ticks.
+
+        async read( variable_name_array : list[str], timeout : float = 5.0 ): Reads variables once, and returns their values.
+
+        async write( values : dict, timeout : float = 5.0 ): Writes variable values, and returns their read-back values.
+
+        accessor( name : str ): Returns a precompiled getter for the latest value of a variable.
+
+        get_snapshot( sequence : int = None ): Returns the data of a published snapshot, by the sequence number of its DATA_READ event.
+
+        get_values( names : list[str], sequence : int = None ): Returns some values of a published snapshot, without copying the rest.
+
+        get_interpolated_value( name : str, timestamp : float = None, max_extrapolation : float = None ): Estimates the value of a numeric variable at any time.
+
+        get_samples( name : str ): Returns the last few timestamped samples of a numeric variable.
+
+        enable_history( variable_name_array : list[str], capacity : int ): Starts recording the history of numeric variables.
+
+        disable_history( variable_name_array : list[str] ): Stops recording the history of variables.
+
+        get_history_last( name : str, n : int ): Returns the newest n samples of a variable's history.
+
+        get_history_range( name : str, start_time : float, end_time : float ): Returns the samples of a variable's history between two times.
+
+        enable_tracing( enabled : bool = True ): Starts or stops recording the phases of every communication cycle.
+
+        dump_trace( path : str = None ): Exports the recorded phases as Chrome trace events.
+
+        get_metrics(): Returns the communication counters, gauges and latency histograms.
+
+        get_refresh_rate_adjustments(): Returns the last changes of the adaptive refresh rate.
     """
 
     def __init__(self):
@@ -62,13 +130,23 @@ class Manager:
         self._callbacks.append(self._event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_INIT, callback))
         callback(None)
 
-    def register_data_callback( self, callback : Callable[[carb.events.IEvent], None] ):
+    def register_data_callback( self, callback : Callable[[carb.events.IEvent], None], lazy : bool = False ):
         """
         Registers a callback function for the DATA_READ event.
         The callback is triggered when the B&R Bridge receives new data. The payload contains the updated variables.
 
+        With lazy=True, event.payload['data'] is a read-only view with the same nested shape, which only builds the
+        parts that are accessed. Combined with the Flat Output setting, the nested data is never built in full.
+
+        With the EVENT_PAYLOAD setting set to "handle", event.payload only holds the 'sequence' and 'timestamp' of
+        the snapshot, and the data is fetched with get_snapshot() or get_values().
+
+        With the WRITE_OVERLAY setting, written values are shown in the data until they are read back, and
+        event.payload['optimistic'] lists the variables showing a written value. Lazy views only show read values.
+
         Args:
             callback (Callable): The callback function to be registered.
+            lazy (bool): If True, the callback gets a lazy nested view of the data instead of the event payload.
 
         example callback:
             def on_message( event ):
@@ -77,31 +155,418 @@ class Manager:
         Returns:
             None
         """
-        self._callbacks.append(self._event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_READ, callback))
+        if lazy:
+            def on_message( event ):
+                if _active_bridge is not None:
+                    callback(DataViewEvent(event, _active_bridge.data_view()))
+            self._callbacks.append(self._event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_READ, on_message))
+        else:
+            self._callbacks.append(self._event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_READ, callback))
 
-    def add_cyclic_read_variables(self, variable_name_array : list[str]):
+    def add_cyclic_read_variables(self, variable_name_array : list[str], deadband : float = None, relative_deadband : float = None):
         """
         Adds variables to the cyclic read list.
         Variables in the cyclic read list are read from the B&R Bridge at a fixed interval.
+        A range of array elements can be added as one entry, "MAIN:buf[0..999]". Its value is a list indexed like the
+        PLC array.
 
         Args:
             variableList (list): List of variables to be added. ["MAIN.myStruct.myvar1", "MAIN.var2", ...]
+            deadband (float): Optional absolute deadband. Numeric changes smaller than this are not published.
+            relative_deadband (float): Optional deadband as a fraction of the last published value (0.01 = 1%).
+
+        Returns:
+            None
+        """
+        payload = {'variables': variable_name_array}
+        if deadband is not None or relative_deadband is not None:
+            payload['deadbands'] = [{'pattern': name, 'absolute': deadband or 0.0, 'relative': relative_deadband or 0.0} 
+                                    for name in variable_name_array]
+        self._event_stream.push(event_type=EVENT_TYPE_DATA_READ_REQ, payload=payload)
+
+    def add_read_group(self, name : str, variable_name_array : list[str], trigger : str,
+                       predicate : Callable[[any], bool] = None, fallback_period : float = None):
+        """
+        Adds a group of variables that is read once when a trigger fires, instead of every cycle, e.g. a recipe that
+        only changes when a handshake flag toggles. The trigger is added to the cyclic read list, and evaluated by the
+        bridge after every cyclic read. The group is read in the cycle its trigger fires, and its values stay in the
+        DATA_READ data until it is read again. A group with the same name is replaced.
+
+        Args:
+            name (str): The name of the group.
+            variable_name_array (list[str]): The variables of the group. ["MAIN:recipe", "MAIN:steps[0..99]"]
+            trigger (str): The trigger variable. "MAIN:recipeLoaded"
+            predicate (Callable[[any], bool]): Optional. If set, the group is read when this becomes true for the
+                trigger's value, instead of whenever the value changes. lambda value: value is True
+            fallback_period (float): Optional, read the group at least this often, in seconds.
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+            ValueError: If a variable is a range that ends before it starts.
+
+        Returns:
+            None
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        _active_bridge.add_read_group(name, variable_name_array, trigger, predicate, fallback_period)
+
+    def remove_read_group(self, name : str):
+        """
+        Removes a read group. Its trigger stays in the cyclic read list.
+
+        Args:
+            name (str): The name of the group.
+
+        Returns:
+            None
+        """
+        if _active_bridge is not None:
+            _active_bridge.remove_read_group(name)
+
+    def set_deadband(self, pattern : str, absolute : float = 0.0, relative : float = 0.0):
+        """
+        Sets the deadband for a variable, or for every variable matching a pattern.
+        Numeric changes smaller than the deadband are not published; the last published value is kept instead.
+        If both are set, the larger of the two thresholds applies.
+
+        Args:
+            pattern (str): A variable name, or a pattern using '*' and '?' wildcards. "MAIN:axis[*].position"
+            absolute (float): Changes smaller than this amount are suppressed.
+            relative (float): Changes smaller than this fraction of the last published value are suppressed.
+
+        Returns:
+            None
+        """
+        payload = {'variables': [], 'deadbands': [{'pattern': pattern, 'absolute': absolute, 'relative': relative}]}
+        self._event_stream.push(event_type=EVENT_TYPE_DATA_READ_REQ, payload=payload)
+
+    def set_variable_types(self, types : dict):
+        """
+        Sets the PLC types of variables. Read values are normalized to their type (e.g. 1 becomes 1.0 for a REAL),
+        and written values are validated and coerced before they are sent (e.g. "1" becomes 1 for a DINT).
+        Invalid writes are dropped and reported in the status field.
+        Elements of a typed array ("MAIN:arr[3]") use the array's element type.
+
+        Args:
+            types (dict): Variable names and types. {"MAIN:speed": "REAL", "MAIN:name": "STRING[80]", "MAIN:arr": "ARRAY[0..9] OF DINT"}
+                Supported types are BOOL, SINT, INT, DINT, LINT, USINT, UINT, UDINT, ULINT, BYTE, WORD, DWORD, REAL, 
+                LREAL, STRING[n], WSTRING[n] and ARRAY[low..high] OF any of these.
+
+        Raises:
+            PLCTypeException: If a type is not supported.
 
         Returns:
             None
         """
-        self._event_stream.push(event_type=EVENT_TYPE_DATA_READ_REQ, payload={'variables': variable_name_array})
+        for type_spec in types.values():
+            compile_type(type_spec)
+        payload = {'variables': [], 'types': [{'name': name, 'type': type_spec} for name, type_spec in types.items()]}
+        self._event_stream.push(event_type=EVENT_TYPE_DATA_READ_REQ, payload=payload)
 
-    def write_variable(self, name : str, value : any ):
+    def write_variable(self, name : str, value : any, priority : bool = False ):
         """
         Writes a variable value to the B&R Bridge.
 
         Args:
             name (str): The name of the variable. "MAIN.myStruct.myvar1"
             value (basic type): The value to be written.  1, 2.5, "Hello", ...
+            priority (bool): If True, the write is sent right away instead of with the next cyclic read.
+
+        Returns:
+            None
+        """
+        payload = {"variables": [{'name': name, 'value': value}], "priority": priority}
+        self._event_stream.push(event_type=EVENT_TYPE_DATA_WRITE_REQ, payload=payload)
+
+    def write_variables(self, values : dict, priority : bool = False):
+        """
+        Writes multiple variable values to the B&R Bridge.
+        This pushes a single event for all variables, which is much cheaper than calling write_variable() for each.
+
+        Args:
+            values (dict): Variable names and values to write. {"MAIN:myStruct.myvar1": 1, "MAIN:var2": 2.5}
+            priority (bool): If True, the writes are sent right away instead of with the next cyclic read.
 
         Returns:
             None
         """
-        payload = {"variables": [{'name': name, 'value': value}]}
+        payload = {"variables": [{'name': name, 'value': value} for name, value in values.items()], "priority": priority}
         self._event_stream.push(event_type=EVENT_TYPE_DATA_WRITE_REQ, payload=payload)
+
+    def tick(self):
+        """
+        Triggers a communication cycle, if the Cycle Trigger setting is "External Tick" or "Lockstep With Simulation".
+        Physics steps already tick the bridge; this is for scripts that drive the bridge from their own callbacks.
+        In lockstep, this blocks until the write-then-read exchange is done, or the lockstep timeout expires.
+
+        Returns:
+            bool: True if a cycle was triggered (and, in lockstep, completed).
+        """
+        if _active_bridge is None:
+            return False
+        return _active_bridge.tick()
+
+    async def read(self, variable_name_array : list[str], timeout : float = 5.0):
+        """
+        Reads variables once, right away or at the start of the next communication cycle.
+        The variables don't need to be in the cyclic read list.
+
+        Args:
+            variable_name_array (list): List of variables to read. ["MAIN:myStruct.myvar1", "MAIN:var2", ...]
+            timeout (float): Seconds to wait for the values.
+
+        example:
+            values = await br_bridge.read(["MAIN:state"])
+            state = values["MAIN:state"]
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+            asyncio.TimeoutError: If the values were not read within the timeout.
+
+        Returns:
+            dict: A flat dictionary of variable names and values.
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        future = _active_bridge.submit_read(variable_name_array)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    async def write(self, values : dict, timeout : float = 5.0):
+        """
+        Writes variable values right away or at the start of the next communication cycle, and reads them back as acknowledgement.
+        Earlier writes to the same variables that have not been sent yet are discarded.
+
+        Args:
+            values (dict): Variable names and values to write. {"MAIN:cmd": 1, "MAIN:setpoint": 2.5}
+            timeout (float): Seconds to wait for the acknowledgement.
+
+        example:
+            await br_bridge.write({"MAIN:start": True})
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+            asyncio.TimeoutError: If the write was not acknowledged within the timeout.
+
+        Returns:
+            dict: A flat dictionary of the written variables and their values read back from the PLC.
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        future = _active_bridge.submit_write(values)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def accessor(self, name : str):
+        """
+        Returns a precompiled getter for the latest value of a variable, adding it to the cyclic read list.
+        Calling the getter is a single slot lookup, which is much cheaper than walking the nested data on every frame.
+        The getter stays valid when the read list is cleared, and returns None until the variable is read again.
+
+        Args:
+            name (str): The name of the variable. "MAIN:axis[3].position"
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+
+        Returns:
+            Callable[[], any]: Returns the latest value, or None if it hasn't been read yet.
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        return _active_bridge.accessor(name)
+
+    def get_snapshot(self, sequence : int = None):
+        """
+        Returns the data of a published snapshot, as it was passed to the DATA_READ event. The data is shared with
+        other readers, and must not be modified. The last few snapshots are kept, see the SNAPSHOT_STORE_DEPTH setting.
+
+        Args:
+            sequence (int): The sequence number of the snapshot, from event.payload['sequence']. Defaults to the latest.
+
+        Returns:
+            dict: The data, or None if the snapshot is no longer kept or the B&R Bridge is not running.
+        """
+        if _active_bridge is None:
+            return None
+        snapshot = _active_bridge.snapshots.get(sequence)
+        return snapshot.data if snapshot is not None else None
+
+    def get_values(self, names : list[str], sequence : int = None):
+        """
+        Returns some values of a published snapshot, without copying the rest of it.
+
+        Args:
+            names (list[str]): Variable names, or paths of structs and arrays. ["MAIN:axis[3]", "MAIN:flag"]
+            sequence (int): The sequence number of the snapshot, from event.payload['sequence']. Defaults to the latest.
+
+        Returns:
+            dict: The values by name, None for names that aren't in the snapshot.
+            None if the snapshot is no longer kept or the B&R Bridge is not running.
+        """
+        if _active_bridge is None:
+            return None
+        snapshot = _active_bridge.snapshots.get(sequence)
+        return snapshot.slice(names) if snapshot is not None else None
+
+    def get_interpolated_value(self, name : str, timestamp : float = None, max_extrapolation : float = None):
+        """
+        Estimates the value of a numeric variable at any time, from the last few samples read from the PLC.
+        Samples are stamped with the midpoint between the read request and its response.
+        This allows consumers running at render rate to see smooth values while the PLC is polled more slowly.
+
+        Args:
+            name (str): The name of a variable in the cyclic read list. "MAIN:axis.position"
+            timestamp (float): The time to estimate the value at, as returned by time.time(). Defaults to now.
+            max_extrapolation (float): Seconds past the newest sample to extrapolate for. 
+                Defaults to the interval between the two newest samples.
+
+        Returns:
+            float: The estimated value, or None if no samples are available.
+        """
+        if _active_bridge is None:
+            return None
+        if timestamp is None:
+            timestamp = time.time()
+        return _active_bridge.get_interpolated_value(name, timestamp, max_extrapolation)
+
+    def get_samples(self, name : str):
+        """
+        Returns the last few timestamped samples of a numeric variable.
+
+        Args:
+            name (str): The name of a variable in the cyclic read list. "MAIN:axis.position"
+
+        Returns:
+            list: A list of (timestamp, value) tuples, oldest first.
+        """
+        if _active_bridge is None:
+            return []
+        return _active_bridge.get_samples(name)
+
+    def enable_history(self, variable_name_array : list[str], capacity : int):
+        """
+        Starts recording the history of numeric variables in fixed-capacity ring buffers.
+        The variables still need to be in the cyclic read list to be recorded.
+        All buffers together are limited by the HISTORY_MEMORY_BUDGET_MB setting (16 bytes per sample).
+
+        Args:
+            variable_name_array (list): List of variables to record. ["MAIN:axis.position", ...]
+            capacity (int): The number of samples to keep per variable.
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+            HistoryBudgetException: If the buffers would exceed the memory budget.
+
+        Returns:
+            None
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        for name in variable_name_array:
+            _active_bridge.enable_history(name, capacity)
+
+    def disable_history(self, variable_name_array : list[str]):
+        """
+        Stops recording the history of variables and frees their buffers.
+
+        Args:
+            variable_name_array (list): List of variables to stop recording. ["MAIN:axis.position", ...]
+
+        Returns:
+            None
+        """
+        if _active_bridge is None:
+            return
+        for name in variable_name_array:
+            _active_bridge.disable_history(name)
+
+    def get_history_last(self, name : str, n : int):
+        """
+        Returns the newest n samples of a variable's history, oldest first.
+
+        Args:
+            name (str): The name of a variable with history enabled. "MAIN:axis.position"
+            n (int): The number of samples to return.
+
+        Returns:
+            tuple: (timestamps, values) as array.array('d'). Both are empty if no history is recorded.
+        """
+        if _active_bridge is None:
+            return array('d'), array('d')
+        return _active_bridge.get_history_last(name, n)
+
+    def get_history_range(self, name : str, start_time : float, end_time : float):
+        """
+        Returns the samples of a variable's history between two times (inclusive), oldest first.
+
+        Args:
+            name (str): The name of a variable with history enabled. "MAIN:axis.position"
+            start_time (float): Start of the range, as returned by time.time().
+            end_time (float): End of the range, as returned by time.time().
+
+        Returns:
+            tuple: (timestamps, values) as array.array('d'). Both are empty if no history is recorded.
+        """
+        if _active_bridge is None:
+            return array('d'), array('d')
+        return _active_bridge.get_history_range(name, start_time, end_time)
+
+    def enable_tracing(self, enabled : bool = True):
+        """
+        Starts or stops recording the phases of every communication cycle (connect, write, read, decode, parse,
+        publish, UI update) into a bounded in-memory ring. Tracing is off by default, and costs next to nothing then.
+
+        Args:
+            enabled (bool): Whether to record.
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        _active_bridge.enable_tracing(enabled)
+
+    def dump_trace(self, path : str = None):
+        """
+        Exports the recorded phases as Chrome trace events, which can be opened in chrome://tracing or
+        https://ui.perfetto.dev.
+
+        Args:
+            path (str): JSON file to write the trace to. If None, the trace is returned instead.
+
+        Raises:
+            RuntimeError: If the B&R Bridge is not running.
+
+        Returns:
+            dict: The trace, if no path was given. {"traceEvents": [...], ...}
+        """
+        if _active_bridge is None:
+            raise RuntimeError("The B&R Bridge is not running")
+        return _active_bridge.dump_trace(path)
+
+    def get_metrics(self):
+        """
+        Returns the communication metrics: cycles, overruns, reconnects, messages and bytes sent and received, parse
+        errors, writes, read-list and snapshot sizes, and histograms of the cycle, read and write latencies.
+        The same metrics are served in the Prometheus text format if the METRICS_PORT setting is set.
+
+        Returns:
+            dict: Counter and gauge values, and {'count', 'sum', 'buckets'} for histograms, by metric name.
+            Empty if the B&R Bridge is not running.
+        """
+        if _active_bridge is None:
+            return {}
+        return _active_bridge.get_metrics()
+
+    def get_refresh_rate_adjustments(self):
+        """
+        Returns the last changes the adaptive refresh rate made to the refresh period, oldest first.
+        Only filled while the ADAPTIVE_REFRESH_RATE setting is enabled.
+
+        Returns:
+            list[dict]: {'time', 'previous', 'period', 'reason', 'busy_time', 'round_trip_time', 'parse_time',
+            'overruns'}, with periods and costs in seconds. Empty if the B&R Bridge is not running.
+        """
+        if _active_bridge is None:
+            return []
+        return _active_bridge.get_refresh_rate_adjustments()
@@ -8,4 +8,9 @@
 # license agreement from NVIDIA CORPORATION is strictly prohibited.
 #
 
-from .extension import *
+import sys
+
+# The extension needs Kit. Outside of Kit, e.g. in the out-of-process communication worker,
+# only the Kit-independent modules are imported.
+if "carb" in sys.modules:
+    from .extension import *
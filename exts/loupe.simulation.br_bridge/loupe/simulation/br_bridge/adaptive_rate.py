@@ -0,0 +1,128 @@
+'''
+  File: **adaptive_rate.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import time
+from collections import deque
+
+DEFAULT_TARGET_UTILIZATION = 0.5
+DEFAULT_ADJUST_INTERVAL = 20 # cycles
+DEFAULT_MAX_STEP = 0.25 # relative change per adjustment
+DEFAULT_SMOOTHING = 0.2
+HYSTERESIS = 0.05 # relative changes below this are not applied
+MAX_ADJUSTMENTS = 100
+
+class AdaptiveRateController():
+    """
+    Tunes the refresh period from measured cycle costs, to keep the communication busy for a target fraction of
+    every period.
+
+    Every cycle reports its busy time (the time from the start of the cycle to the end of publishing, which includes
+    the round trip and parsing). The controller smooths it, and every adjust_interval cycles moves the period towards
+    busy / target_utilization, by at most max_step. Overruns (busy times longer than the period) move the period up
+    by at least max_step. The period always stays within the bounds set by the user.
+
+    Args:
+        min_period (float): The shortest period, in seconds.
+        max_period (float): The longest period, in seconds.
+        target_utilization (float): The fraction of the period the communication should be busy, between 0 and 1.
+        period (float): The initial period, in seconds. Defaults to min_period.
+
+    Attributes:
+        period (float): The current period, in seconds.
+        adjustments (deque): The last adjustments, newest last. See observe().
+
+    """
+
+    def __init__(self, min_period : float, max_period : float, target_utilization=DEFAULT_TARGET_UTILIZATION,
+                 period=None, adjust_interval=DEFAULT_ADJUST_INTERVAL, max_step=DEFAULT_MAX_STEP,
+                 smoothing=DEFAULT_SMOOTHING, clock=time.time):
+        if not 0 < target_utilization <= 1:
+            raise ValueError("target_utilization must be between 0 and 1")
+        self.min_period = min_period
+        self.max_period = max(min_period, max_period)
+        self.target_utilization = target_utilization
+        self.adjust_interval = adjust_interval
+        self.max_step = max_step
+        self.smoothing = smoothing
+        self.period = self._clamp(min_period if period is None else period)
+        self.adjustments = deque(maxlen=MAX_ADJUSTMENTS)
+        self._clock = clock
+        self.busy_time = None
+        self.round_trip_time = None
+        self.parse_time = None
+        self._cycles = 0
+        self._overruns = 0
+
+    def _clamp(self, period):
+        return min(max(period, self.min_period), self.max_period)
+
+    def _smooth(self, average, new):
+        if new is None:
+            return average
+        if average is None:
+            return new
+        return average + self.smoothing * (new - average)
+
+    def set_bounds(self, min_period : float, max_period : float):
+        """Changes the bounds of the period. The period is clamped right away."""
+        self.min_period = min_period
+        self.max_period = max(min_period, max_period)
+        self.period = self._clamp(self.period)
+
+    def observe(self, busy_time : float, round_trip_time=None, parse_time=None):
+        """
+        Reports the cost of one cycle.
+
+        Args:
+            busy_time (float): The seconds the cycle took.
+            round_trip_time (float): The seconds the read request took, if known. Only reported.
+            parse_time (float): The seconds parsing the response took, if known. Only reported.
+
+        Returns:
+            dict: The adjustment if the period was changed, None otherwise.
+            {'time', 'previous', 'period', 'reason', 'busy_time', 'round_trip_time', 'parse_time', 'overruns'}
+
+        """
+        self.busy_time = self._smooth(self.busy_time, busy_time)
+        self.round_trip_time = self._smooth(self.round_trip_time, round_trip_time)
+        self.parse_time = self._smooth(self.parse_time, parse_time)
+        self._cycles += 1
+        if busy_time > self.period:
+            self._overruns += 1
+        if self._cycles < self.adjust_interval:
+            return None
+
+        overruns = self._overruns
+        self._cycles = self._overruns = 0
+        previous = self.period
+        target = self.busy_time / self.target_utilization
+        lowest, highest = previous * (1 - self.max_step), previous * (1 + self.max_step)
+        if overruns:
+            target, reason = max(target, highest), 'overrun'
+        elif target > previous:
+            reason = 'utilization above target'
+        else:
+            reason = 'utilization below target'
+        period = self._clamp(min(max(target, lowest), highest))
+        # Small changes are skipped to keep the period steady, unless they reach a bound
+        if period == previous or (abs(period - previous) <= HYSTERESIS * previous
+                                  and period not in (self.min_period, self.max_period)):
+            return None
+
+        self.period = period
+        adjustment = {'time': self._clock(),
+                      'previous': previous,
+                      'period': period,
+                      'reason': reason,
+                      'busy_time': self.busy_time,
+                      'round_trip_time': self.round_trip_time,
+                      'parse_time': self.parse_time,
+                      'overruns': overruns}
+        self.adjustments.append(adjustment)
+        return adjustment
@@ -0,0 +1,133 @@
+'''
+  File: **compact_snapshot.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+from collections.abc import Mapping
+
+from .nested_view import _ListNode, _MergedRanges
+
+class KeyTable():
+    """
+    The member names of a struct type, shared by every record of that type.
+
+    Attributes:
+        keys (tuple): The member names, in order.
+        index (dict): The position of every member name.
+
+    """
+
+    __slots__ = ('keys', 'index')
+
+    def __init__(self, keys : tuple):
+        self.keys = keys
+        self.index = {key: position for position, key in enumerate(keys)}
+
+class Record(Mapping):
+    """
+    A read-only struct in a compact snapshot. The values are kept in a tuple, and the member names in a KeyTable that
+    is shared by every record with the same members, e.g. every element of an array of structs.
+    """
+
+    __slots__ = ('_table', '_values')
+
+    def __init__(self, table : KeyTable, values : tuple):
+        self._table = table
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._table.index[key]]
+
+    def __iter__(self):
+        return iter(self._table.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+    def to_dict(self):
+        """Returns this record and everything below it as plain dicts and lists."""
+        return {key: to_plain(value) for key, value in zip(self._table.keys, self._values)}
+
+def to_plain(value):
+    """Returns a value of a compact snapshot as plain dicts and lists, e.g. to encode it as JSON."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    elif isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
+
+class _ListPlan():
+
+    __slots__ = ('length', 'items')
+
+    def __init__(self, length, items):
+        self.length = length
+        self.items = items
+
+class _RecordPlan():
+
+    __slots__ = ('table', 'children')
+
+    def __init__(self, table, children):
+        self.table = table
+        self.children = children
+
+class CompactBuilder():
+    """
+    Builds compact snapshots of slot values, shaped like the nested data: structs become Records, arrays stay lists.
+    The plan and the key tables are built once per read list, so a snapshot only allocates the records, the value
+    tuples and the lists.
+
+    Args:
+        shape (dict): The shape of the nested data, see nested_view.build_shape().
+
+    """
+
+    def __init__(self, shape : dict):
+        self._tables = {}
+        self._plan = self._compile(shape)
+
+    @property
+    def table_count(self):
+        """The number of distinct struct types."""
+        return len(self._tables)
+
+    def _compile(self, node):
+        if type(node) is int or type(node) is _MergedRanges:
+            return node
+        if isinstance(node, _ListNode):
+            return _ListPlan(node.length, [(index, self._compile(child)) for index, child in node.items()])
+        keys = tuple(node)
+        table = self._tables.get(keys)
+        if table is None:
+            table = self._tables[keys] = KeyTable(keys)
+        return _RecordPlan(table, [self._compile(child) for child in node.values()])
+
+    def build(self, values : list):
+        """
+        Returns a compact snapshot of the slot values of one cycle.
+
+        Returns:
+            Record: {"Program": {"axis": [None, None, None, {"pos": 1.5}]}}, as Records and lists.
+
+        """
+        return _build(self._plan, values)
+
+def _build(plan, values):
+    if type(plan) is int:
+        return values[plan]
+    if type(plan) is _MergedRanges:
+        return plan.merge(values)
+    if type(plan) is _ListPlan:
+        array = [None] * plan.length
+        for index, child in plan.items:
+            array[index] = _build(child, values)
+        return array
+    return Record(plan.table, tuple([_build(child, values) for child in plan.children]))
@@ -0,0 +1,117 @@
+'''
+  File: **deadband.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import re
+
+class Deadband():
+    """
+    Absolute and relative thresholds below which a change in a numeric value is suppressed.
+
+    Attributes:
+        absolute (float): Changes smaller than this amount are suppressed.
+        relative (float): Changes smaller than this fraction of the last published value are suppressed.
+
+    """
+
+    def __init__(self, absolute=0.0, relative=0.0):
+        self.absolute = abs(float(absolute))
+        self.relative = abs(float(relative))
+
+    def threshold(self, last_value):
+        """Returns the largest change that is suppressed, given the last published value."""
+        return max(self.absolute, self.relative * abs(last_value))
+
+def _compile_pattern(pattern : str):
+    """
+    Compile a variable name pattern into a regular expression.
+    Only '*' and '?' are wildcards, so that array brackets in PLC var names are matched literally.
+    """
+    return re.compile(re.escape(pattern).replace(r'\*', '.*').replace(r'\?', '.') + '$')
+
+class DeadbandFilter():
+    """
+    Suppresses small changes of numeric PLC values, per variable or per name pattern.
+
+    Deadbands for exact variable names take precedence over patterns, and later patterns take precedence over
+    earlier ones. The deadband that applies to a variable is resolved once and cached, so the per-value cost is a
+    single dictionary lookup.
+
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._patterns = []
+        self._resolved = {}
+        self._last_published = {}
+
+    def set_deadband(self, pattern : str, absolute=0.0, relative=0.0):
+        """
+        Sets the deadband for a variable, or for every variable matching a pattern.
+
+        Args:
+            pattern (str): A PLC var name, or a pattern using '*' and '?' wildcards. "Program:axis[*].pos"
+            absolute (float): Changes smaller than this amount are suppressed.
+            relative (float): Changes smaller than this fraction of the last published value are suppressed.
+
+        """
+        deadband = Deadband(absolute, relative)
+        if '*' in pattern or '?' in pattern:
+            self._patterns = [(p, r, d) for p, r, d in self._patterns if p != pattern]
+            self._patterns.append((pattern, _compile_pattern(pattern), deadband))
+        else:
+            self._exact[pattern] = deadband
+        self._resolved = {}
+
+    def clear_deadbands(self):
+        """Removes all configured deadbands."""
+        self._exact = {}
+        self._patterns = []
+        self._resolved = {}
+        self._last_published = {}
+
+    def reset(self):
+        """Forgets the last published values, so the next value of every variable is passed through."""
+        self._last_published = {}
+
+    def _resolve(self, plc_var : str):
+        deadband = self._exact.get(plc_var)
+        if deadband is None:
+            for _, regex, pattern_deadband in reversed(self._patterns):
+                if regex.match(plc_var):
+                    deadband = pattern_deadband
+                    break
+        self._resolved[plc_var] = deadband
+        return deadband
+
+    def filter(self, plc_var : str, value):
+        """
+        Returns the value that should be published for a variable.
+
+        If the change from the last published value is smaller than the deadband, the last published value is
+        returned instead, so that consumers keep seeing a consistent value.
+
+        Args:
+            plc_var (str): The name of the variable. "Program:my_struct.my_var"
+            value (any): The value read from the PLC.
+
+        """
+        try:
+            deadband = self._resolved[plc_var]
+        except KeyError:
+            deadband = self._resolve(plc_var)
+
+        if deadband is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value
+
+        last_value = self._last_published.get(plc_var)
+        if last_value is not None and abs(value - last_value) < deadband.threshold(last_value):
+            return last_value
+
+        self._last_published[plc_var] = value
+        return value
@@ -0,0 +1,988 @@
+'''
+  File: **engine.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+    Kit-independent bridge engine.
+    Runs the connect, write, read and publish loop of the bridge. In Kit, UIBuilder configures the engine from the
+    persistent settings and publishes its data on the message bus. Outside of Kit, the engine runs from a shell, e.g.
+    for soak tests or as a data daemon that feeds the shared memory snapshot export and the metrics endpoint:
+        python -m loupe.simulation.br_bridge.engine --ip 192.168.0.10 --read-list variables.txt --print
+'''
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from threading import RLock
+
+from websockets.exceptions import ConnectionClosed, ConnectionClosedError
+
+from .websockets_driver import WebsocketsDriver, PLCDataParsingException, WebsocketsConnectionException, \
+    ResponseTimeoutException, LinkDeadException
+from .process_driver import ProcessWebsocketsDriver, _python_executable
+from .shared_snapshot import SharedSnapshotWriter
+from .plc_types import PLCTypeException
+from .tracing import DEFAULT_TRACE_CAPACITY
+from .metrics import MetricsServer
+from .compact_snapshot import to_plain
+from .write_overlay import WriteOverlay
+from .snapshot_store import SnapshotStore, DEFAULT_SNAPSHOT_STORE_DEPTH
+from .adaptive_rate import AdaptiveRateController, DEFAULT_TARGET_UTILIZATION
+from .tick_source import CycleScheduler, WallClockTickSource, ExternalTickSource, LockstepTickSource, CYCLE, PRIORITY, CONTROL
+
+# What triggers a communication cycle, see tick_source.py
+TICK_SOURCES = ["wall_clock", "external", "lockstep"]
+
+# Where cyclic responses are decoded: inline on the communication loop, or in a thread or process pool
+DECODE_OFFLOAD_MODES = ["none", "thread", "process"]
+
+DATA_READ_FAIL_SLEEP_TIME_SECONDS = 2 # wait this long before retrying, also allows the status to stick around
+DISCONNECT_TIMEOUT = 2 # in seconds
+
+def default_setting(name, default_value=None):
+    """A settings getter that always returns the default."""
+    return default_value
+
+def _ignore(*args):
+    pass
+
+class BridgeEngine():
+    """
+    The communication loop of the bridge: connects and reconnects to the PLC, sends queued writes and one-shot
+    requests, reads the cyclic read list, and publishes the results. The loop runs in its own thread, with its own
+    asyncio event loop. Nothing in the engine depends on Kit.
+
+    The engine reads its configuration through a settings getter, with the same names as the extension's persistent
+    settings (PLC_IP_ADDRESS, PLC_PORT, REFRESH_RATE, ...). Settings that can change while running are properties.
+
+    Args:
+        get_setting (Callable[[str, any], any]): Returns the value of a setting, or the given default.
+
+    Attributes:
+        driver (WebsocketsDriver): The connection to the PLC.
+        data (dict): The data of the last cyclic read.
+        publish_on_change (bool): Only publish data that changed.
+        last_cycle_time (float): Seconds between the last two cyclic reads.
+        average_latency (float): Rolling average of last_cycle_time.
+        worst_latency (float): Largest last_cycle_time since connecting, or since reset_worst_latency().
+        snapshots (SnapshotStore): The last few published snapshots, by sequence number.
+        optimistic (list): The variables whose pending writes were laid over the last published data, if the write
+            overlay is enabled.
+        on_data (Callable[[dict], None]): Called with the data of every cycle that is published.
+        on_data_changed (Callable[[dict], None]): Called with the data of every cycle in which it changed.
+        on_status (Callable[[str, bool], None]): Called with status messages, and whether the data is no longer valid.
+        on_statistics (Callable[[], None]): Called after every cycle, once the timing statistics are updated.
+        on_refresh_period_changed (Callable[[float], None]): Called with the new refresh period, in seconds.
+
+    """
+
+    def __init__(self, get_setting=default_setting):
+        self.get_setting = get_setting
+
+        self._enable_communication = get_setting('ENABLE_COMMUNICATION', False)
+        self._refresh_rate = get_setting('REFRESH_RATE', 20) # in ms
+        self.publish_on_change = get_setting('PUBLISH_ON_CHANGE', False)
+        self._write_min_spacing = get_setting('WRITE_MIN_SPACING', 5) # in ms
+        self._tick_source_name = get_setting('TICK_SOURCE', 'wall_clock')
+        self._lockstep_timeout = get_setting('LOCKSTEP_TIMEOUT', 100) # in ms
+        # Tune the refresh period between the refresh rate and the max refresh rate, to hold the target utilization
+        self._adaptive_refresh_rate = get_setting('ADAPTIVE_REFRESH_RATE', False)
+        self._max_refresh_rate = get_setting('MAX_REFRESH_RATE', 1000) # in ms
+        self._target_utilization = get_setting('TARGET_UTILIZATION', DEFAULT_TARGET_UTILIZATION)
+
+        # Run the PLC connection in a separate worker process. Only read when the engine is created.
+        self.out_of_process = get_setting('OUT_OF_PROCESS', False)
+        # Decode and parse cyclic responses off the communication loop. Read when the engine is started.
+        self.decode_offload = get_setting('DECODE_OFFLOAD', 'none')
+        self.decode_workers = get_setting('DECODE_WORKERS', 1)
+
+        self.on_data = _ignore
+        self.on_data_changed = _ignore
+        self.on_status = _ignore
+        self.on_statistics = _ignore
+        self.on_refresh_period_changed = _ignore
+        # Errors found while setting up, reported through on_status when the engine starts, once it's set
+        self._setup_errors = []
+
+        # Internal status flags
+        self._running = False
+        self._thread = None
+        self._communication_initialized = False
+        self._disconnect_command = False # command to trigger disconnect from outside the loop
+        self._stopping = False # stay disconnected after the disconnect command, until started again
+        self._has_connected = False
+        self.data = {}
+
+        # Timing variables
+        self.last_cycle_time = 0
+        self.average_latency = 0
+        self.worst_latency = 0
+        self._last_cyclic_read_time = 0
+
+        if self.out_of_process:
+            self.driver = ProcessWebsocketsDriver(ip=get_setting('PLC_IP_ADDRESS', '127.0.0.1'), port=get_setting('PLC_PORT', 8000),
+                                                  python_executable=get_setting('WORKER_PYTHON', '') or None)
+            self.driver.refresh_rate = self._refresh_rate
+        else:
+            self.driver = WebsocketsDriver(ip=get_setting('PLC_IP_ADDRESS', '127.0.0.1'), port=get_setting('PLC_PORT', 8000))
+        self.driver.history.memory_budget = get_setting('HISTORY_MEMORY_BUDGET_MB', 64) * 1024 * 1024
+        self.driver.flat_output = get_setting('FLAT_OUTPUT', False)
+        self.driver.compact_output = get_setting('COMPACT_OUTPUT', False)
+        # Request read ranges by the name of their array, for PLCs that return whole arrays
+        self.driver.range_requests = get_setting('RANGE_REQUESTS', False)
+        # Heartbeat: declare the link dead after this many read responses in a row missed the response timeout, and
+        # reconnect right away. Off if the response timeout is 0.
+        response_timeout = get_setting('RESPONSE_TIMEOUT', 1000) # in ms
+        self.driver.response_timeout = response_timeout/1000 if response_timeout else None
+        self.driver.max_missed_responses = max(1, int(get_setting('MAX_MISSED_RESPONSES', 3)))
+        self.driver.heartbeat_interval = get_setting('HEARTBEAT_INTERVAL', 1000)/1000 # in ms
+        self.load_type_schema(get_setting('TYPE_SCHEMA_FILE', ''))
+        self._tracer = self.driver.tracer
+        self._tracer.capacity = get_setting('TRACE_CAPACITY', DEFAULT_TRACE_CAPACITY)
+
+        # The driver's registry is shared, so all metrics are exported together
+        self._metrics = self.driver.metrics
+        self._metric_cycles = self._metrics.counter('br_bridge_cycles_total', "Communication cycles")
+        self._metric_overruns = self._metrics.counter('br_bridge_cycle_overruns_total', "Cycles that took longer than the refresh period")
+        self._metric_reconnects = self._metrics.counter('br_bridge_reconnects_total', "Connections re-established after the first one")
+        self._metric_cycle_duration = self._metrics.histogram('br_bridge_cycle_duration_seconds', "Duration of communication cycles")
+        self._metric_snapshot_values = self._metrics.gauge('br_bridge_snapshot_values', "Values in the latest published data")
+        self._metric_snapshot_bytes = self._metrics.gauge('br_bridge_snapshot_bytes', "Bytes used in the shared memory snapshot export")
+        self._metric_refresh_period = self._metrics.gauge('br_bridge_refresh_period_seconds', "Current refresh period")
+        self._metric_refresh_period.set(self._refresh_rate/1000)
+
+        # Serve the metrics in the Prometheus text format on this local port. Off if 0.
+        self._metrics_server = None
+        metrics_port = get_setting('METRICS_PORT', 0)
+        if metrics_port:
+            try:
+                self._metrics_server = MetricsServer(self._metrics, host=get_setting('METRICS_HOST', '127.0.0.1'), port=metrics_port)
+                self._metrics_server.start()
+            except OSError as e:
+                self._report_setup_error(f"Metrics endpoint on port {metrics_port} failed: {e}")
+                self._metrics_server = None
+
+        # Publish the latest values into a named shared memory segment for other local processes. Off if empty.
+        self._snapshot_export = None
+        self._snapshot_export_connected = False
+        snapshot_export_name = get_setting('SNAPSHOT_EXPORT_NAME', '')
+        if snapshot_export_name:
+            try:
+                self._snapshot_export = SharedSnapshotWriter(name=snapshot_export_name)
+            except Exception as e:
+                self._report_setup_error(f"Snapshot export {snapshot_export_name} failed: {e}")
+
+        self.write_queue = dict()
+        self.write_lock = RLock()
+
+        # Lay queued and sent writes over the published data until they are read back. Guarded by the write lock.
+        self._write_overlay_enabled = get_setting('WRITE_OVERLAY', False)
+        self._write_overlay = WriteOverlay(get_setting('WRITE_OVERLAY_TIMEOUT', 1000)/1000) # in ms
+        self.optimistic = []
+
+        # The last few published snapshots, for readers that fetch data by sequence number instead of receiving it
+        self.snapshots = SnapshotStore(get_setting('SNAPSHOT_STORE_DEPTH', DEFAULT_SNAPSHOT_STORE_DEPTH))
+
+        # One-shot reads and confirmed writes, processed at the start of the next cycle
+        self._requests = deque()
+
+        self._rate_controller = AdaptiveRateController(self._refresh_rate/1000, self._max_refresh_rate/1000,
+                                                       self._target_utilization)
+
+        # Paces the communication loop. Priority writes and requests wake it up to be sent between cycles.
+        self._scheduler = CycleScheduler(self._create_tick_source(self._tick_source_name))
+        self._scheduler.write_min_spacing = self._write_min_spacing/1000
+
+    ####################################
+    ####################################
+    # Lifecycle
+    ####################################
+    ####################################
+
+    def start(self):
+        """Start the communication thread, if it isn't running."""
+        if self.is_running():
+            return
+        setup_errors, self._setup_errors = self._setup_errors, None
+        for message in setup_errors or ():
+            self.on_status(message, False)
+        self._running = True
+        self._stopping = False
+        if self._enable_communication:
+            # Connect right away, without waiting for the first tick
+            self._scheduler.request_control()
+        self._thread = threading.Thread(target=self._thread_target, name="br_bridge_engine", daemon=True)
+        self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _report_setup_error(self, message):
+        """Reports a setting that couldn't be applied. Until the engine starts, the message is kept for start()."""
+        if self._setup_errors is None:
+            self.on_status(message, False)
+        else:
+            self._setup_errors.append(message)
+
+    def stop(self):
+        """
+        Disconnect from the PLC, stop the communication thread, and release the worker, the snapshot export and the
+        metrics endpoint. Tries to disconnect nicely before forcing.
+        """
+        if self.is_running():
+            self._stopping = True
+            self._disconnect_command = True
+            self._scheduler.request_control()
+            start_time = time.time()
+            while self.driver.is_connected():
+                time.sleep(.1)
+                if time.time() - start_time > DISCONNECT_TIMEOUT:
+                    break
+        self._running = False
+        self._scheduler.wake()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.out_of_process:
+            self.driver.stop_worker()
+        if self._snapshot_export:
+            self._snapshot_export.close()
+            self._snapshot_export = None
+        if self._metrics_server:
+            self._metrics_server.stop()
+            self._metrics_server = None
+
+    def reconnect(self):
+        """Disconnect, and connect again on the next cycle. Used after the address changed."""
+        self._communication_initialized = False
+        self._disconnect_command = True
+        self._scheduler.request_control()
+
+    ####################################
+    ####################################
+    # Configuration
+    ####################################
+    ####################################
+
+    @property
+    def enable_communication(self):
+        return self._enable_communication
+
+    @enable_communication.setter
+    def enable_communication(self, enabled):
+        self._enable_communication = enabled
+        if not enabled:
+            self.reconnect()
+        else:
+            self._scheduler.request_control()
+
+    @property
+    def refresh_rate(self):
+        """The refresh rate set by the user, in ms. The lower bound of the adaptive refresh rate."""
+        return self._refresh_rate
+
+    @refresh_rate.setter
+    def refresh_rate(self, refresh_rate):
+        self._refresh_rate = refresh_rate
+        self._rate_controller.set_bounds(self._refresh_rate/1000, self._max_refresh_rate/1000)
+        self._apply_refresh_period()
+
+    @property
+    def adaptive_refresh_rate(self):
+        return self._adaptive_refresh_rate
+
+    @adaptive_refresh_rate.setter
+    def adaptive_refresh_rate(self, enabled):
+        self._adaptive_refresh_rate = enabled
+        self._apply_refresh_period()
+
+    @property
+    def max_refresh_rate(self):
+        """The upper bound of the adaptive refresh rate, in ms."""
+        return self._max_refresh_rate
+
+    @max_refresh_rate.setter
+    def max_refresh_rate(self, max_refresh_rate):
+        self._max_refresh_rate = max_refresh_rate
+        self._rate_controller.set_bounds(self._refresh_rate/1000, self._max_refresh_rate/1000)
+        self._apply_refresh_period()
+
+    @property
+    def target_utilization(self):
+        return self._target_utilization
+
+    @target_utilization.setter
+    def target_utilization(self, target_utilization):
+        self._target_utilization = min(max(target_utilization, 0.05), 1.0)
+        self._rate_controller.target_utilization = self._target_utilization
+
+    @property
+    def refresh_period(self):
+        """The current refresh period in seconds, as set by the user or by the adaptive refresh rate."""
+        return self._current_period()
+
+    @property
+    def write_min_spacing(self):
+        """The minimum time between priority writes, in ms."""
+        return self._write_min_spacing
+
+    @write_min_spacing.setter
+    def write_min_spacing(self, write_min_spacing):
+        self._write_min_spacing = write_min_spacing
+        self._scheduler.write_min_spacing = self._write_min_spacing/1000
+
+    @property
+    def tick_source_name(self):
+        """What triggers a cycle, one of TICK_SOURCES."""
+        return self._tick_source_name
+
+    @tick_source_name.setter
+    def tick_source_name(self, name):
+        self._tick_source_name = name
+        self._scheduler.tick_source = self._create_tick_source(name)
+
+    @property
+    def lockstep_timeout(self):
+        """The maximum time a lockstep tick waits for its cycle, in ms."""
+        return self._lockstep_timeout
+
+    @lockstep_timeout.setter
+    def lockstep_timeout(self, lockstep_timeout):
+        self._lockstep_timeout = lockstep_timeout
+        if isinstance(self._scheduler.tick_source, LockstepTickSource):
+            self._scheduler.tick_source.timeout = self._lockstep_timeout/1000
+
+    @property
+    def flat_output(self):
+        return self.driver.flat_output
+
+    @flat_output.setter
+    def flat_output(self, flat_output):
+        self.driver.flat_output = flat_output
+
+    @property
+    def compact_output(self):
+        return self.driver.compact_output
+
+    @compact_output.setter
+    def compact_output(self, compact_output):
+        self.driver.compact_output = compact_output
+
+    @property
+    def write_overlay(self):
+        """If True, queued and sent writes are laid over the published data until they are read back."""
+        return self._write_overlay_enabled
+
+    @write_overlay.setter
+    def write_overlay(self, enabled):
+        self._write_overlay_enabled = enabled
+        if not enabled:
+            with self.write_lock:
+                self._write_overlay.clear()
+
+    def _create_tick_source(self, name):
+        if name == 'lockstep':
+            return LockstepTickSource(timeout=self._lockstep_timeout/1000)
+        elif name == 'external':
+            return ExternalTickSource()
+        return WallClockTickSource(self._current_period)
+
+    def load_type_schema(self, path):
+        """
+        Load variable types from a JSON file. {"Program:my_var": "REAL", ...}
+        A file that can't be loaded is reported through on_status, once the engine is started.
+        """
+        if not path:
+            return
+        try:
+            with open(path, encoding='utf-8') as file:
+                self.driver.types.set_types(json.load(file))
+        except (OSError, ValueError, PLCTypeException) as e:
+            self._report_setup_error(f"Type schema {path} could not be loaded: {e}")
+
+    ####################################
+    ####################################
+    # Reads and writes
+    ####################################
+    ####################################
+
+    def add_read(self, name, deadband=None, relative_deadband=None):
+        """Add a variable to the cyclic read list, see WebsocketsDriver.add_read()."""
+        self.driver.add_read(name, deadband, relative_deadband)
+
+    def clear_read_list(self):
+        """Clear the cyclic read list and the read groups."""
+        self.driver.clear_read_list()
+
+    def add_read_group(self, name, variables, trigger, predicate=None, fallback_period=None):
+        """Add variables that are read when a trigger fires instead of every cycle, see WebsocketsDriver.add_read_group()."""
+        self.driver.add_read_group(name, variables, trigger, predicate, fallback_period)
+
+    def remove_read_group(self, name):
+        self.driver.remove_read_group(name)
+
+    def queue_write(self, name, value, priority=False):
+        """
+        Add PLC variable to the write queue for sending variables and values to the PLC.
+
+        Args
+        name: str
+            The name of the variable to write to.
+        value:
+            The value to write to the variable.
+        priority: bool
+            If True, send the write queue right away instead of with the next cyclic read.
+        """
+        values = self._validate_writes({name: value})
+        with self.write_lock:
+            self.write_queue.update(values)
+            self._add_to_write_overlay(values)
+        if priority:
+            self._wake_for_priority()
+
+    def queue_writes(self, values, priority=False):
+        """
+        Add multiple PLC variables to the write queue, taking the write lock only once.
+
+        Args
+        values: dict
+            The names of the variables to write to, and their values.
+        priority: bool
+            If True, send the write queue right away instead of with the next cyclic read.
+        """
+        values = self._validate_writes(values)
+        with self.write_lock:
+            self.write_queue.update(values)
+            self._add_to_write_overlay(values)
+        if priority:
+            self._wake_for_priority()
+
+    def _validate_writes(self, values):
+        """
+        Coerce values to their variables' types before they are queued.
+        Invalid values are dropped and reported in the status, so they don't hold up the other writes.
+        """
+        types = self.driver.types
+        if not types:
+            return values
+        valid = {}
+        for name, value in values.items():
+            try:
+                valid[name] = types.encode(name, value)
+            except PLCTypeException as e:
+                self.on_status(f"Invalid write: {e}", False)
+        return valid
+
+    def _add_to_write_overlay(self, values):
+        if self._write_overlay_enabled:
+            types = self.driver.types
+            if types:
+                # Shown as they will be read back
+                values = {name: types.decode(name, value) for name, value in values.items()}
+            self._write_overlay.add(values, time.time())
+
+    def _mark_writes_sent(self, values):
+        if self._write_overlay_enabled:
+            with self.write_lock:
+                self._write_overlay.mark_sent(values, time.time(), self.driver.published_values)
+
+    def _wake_for_priority(self):
+        """Wake the communication loop to send writes and requests before the next cyclic read."""
+        self._scheduler.request_priority()
+
+    def tick(self):
+        """
+        Trigger a communication cycle, if the bridge is driven by external ticks.
+        In lockstep, this blocks until the cycle is done or the lockstep timeout expires.
+
+        Returns:
+            bool: True if a cycle was triggered (and, in lockstep, completed).
+        """
+        return self._scheduler.tick_source.tick()
+
+    def submit_read(self, names):
+        """
+        Schedule a one-shot read at the start of the next cycle.
+
+        Args
+        names: list
+            The names of the variables to read.
+
+        Returns:
+            concurrent.futures.Future: Resolves with a flat dictionary of variable names and values.
+        """
+        future = Future()
+        self._requests.append(('read', list(names), future))
+        self._wake_for_priority()
+        return future
+
+    def submit_write(self, values):
+        """
+        Schedule a confirmed write at the start of the next cycle.
+        The written variables are read back once the write has been sent, as acknowledgement.
+
+        Args
+        values: dict
+            The names of the variables to write, and their values.
+
+        Returns:
+            concurrent.futures.Future: Resolves with a flat dictionary of the written variables' read-back values.
+        """
+        values = dict(values)
+        future = Future()
+        with self.write_lock:
+            # Older queued writes to the same variables would otherwise overwrite these values
+            for name in values:
+                self.write_queue.pop(name, None)
+            self._requests.append(('write', values, future))
+            self._add_to_write_overlay(values)
+        self._wake_for_priority()
+        return future
+
+    ####################################
+    ####################################
+    # Queries
+    ####################################
+    ####################################
+
+    def get_metrics(self):
+        """Return the current values of all metrics, see MetricsRegistry.snapshot()."""
+        return self._metrics.snapshot()
+
+    @property
+    def tracing_enabled(self):
+        return self._tracer.enabled
+
+    def enable_tracing(self, enabled=True):
+        """Start or stop recording the phases of every cycle, see Tracer."""
+        self._tracer.enabled = enabled
+
+    def dump_trace(self, path=None):
+        """
+        Export the recorded phases as Chrome trace events.
+
+        Args:
+            path (str): File to write the trace to. If None, the trace is returned instead.
+
+        Returns:
+            dict: The trace, if no path was given.
+        """
+        if path is None:
+            return self._tracer.to_chrome_trace()
+        self._tracer.dump(path)
+
+    def get_refresh_rate_adjustments(self):
+        """Return the last adjustments of the adaptive refresh rate, see AdaptiveRateController.observe()."""
+        return list(self._rate_controller.adjustments)
+
+    def data_view(self):
+        """Return a lazy nested view of the latest values, see WebsocketsDriver.data_view()."""
+        return self.driver.data_view()
+
+    def accessor(self, name):
+        """Return a precompiled getter for the latest value of a variable, see WebsocketsDriver.accessor()."""
+        return self.driver.accessor(name)
+
+    def get_interpolated_value(self, name, timestamp, max_extrapolation=None):
+        """Estimate the value of a numeric variable at a given time, see SampleStore.interpolate()."""
+        return self.driver.samples.interpolate(name, timestamp, max_extrapolation)
+
+    def get_samples(self, name):
+        """Return the last few timestamped samples of a numeric variable."""
+        return self.driver.samples.get_samples(name)
+
+    def enable_history(self, name, capacity):
+        """Start recording the history of a numeric variable, see HistoryStore.track()."""
+        self.driver.history.track(name, capacity)
+
+    def disable_history(self, name):
+        """Stop recording the history of a variable."""
+        self.driver.history.untrack(name)
+
+    def get_history_last(self, name, n):
+        """Return the newest n samples of a variable's history."""
+        return self.driver.history.last(name, n)
+
+    def get_history_range(self, name, start_time, end_time):
+        """Return the samples of a variable's history between two times."""
+        return self.driver.history.range(name, start_time, end_time)
+
+    ####################################
+    ####################################
+    # Communication loop
+    ####################################
+    ####################################
+
+    async def _process_requests(self):
+        """Process one-shot reads and confirmed writes, in the order they were submitted."""
+        while self._requests:
+            kind, data, future = self._requests.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue # The caller stopped waiting
+            try:
+                if kind == 'write':
+                    await self.driver.write_data(data)
+                    self._mark_writes_sent(data)
+                    result = await self.driver.read_variables(list(data))
+                else:
+                    result = await self.driver.read_variables(data)
+            except Exception as e:
+                future.set_exception(e)
+                if isinstance(e, (ConnectionClosed, LinkDeadException)):
+                    raise
+            else:
+                future.set_result(result)
+
+    async def _flush_write_queue(self):
+        """Send all queued writes to the PLC in a single message."""
+        if self.write_queue:
+            with self.write_lock:
+                # Swapping is enough: queue_write() only adds to the new dict, and a copy here couldn't protect values
+                # the caller changed before the flush anyway
+                values = self.write_queue
+                self.write_queue = {}
+            await self.driver.write_data(values)
+            self._mark_writes_sent(values)
+            self._scheduler.last_write_time = time.time()
+
+    async def _send_priority_writes(self):
+        """Send requests and queued writes between cyclic reads, without touching the read pacing."""
+        if not (self._communication_initialized and self.driver.is_connected()):
+            return # Everything stays queued for the next cycle
+        try:
+            await self._process_requests()
+            await self._flush_write_queue()
+        except ConnectionClosedError as e:
+            self.on_status(f"Connection Closed: {e}", False)
+            self._communication_initialized = False
+        except LinkDeadException as e:
+            self._link_down(e)
+        except Exception as e:
+            self.on_status(f"Error writing data to PLC: {e}", False)
+
+    def _publish_snapshot_export(self):
+        """Publish the latest flat values to the shared memory snapshot export, if enabled."""
+        if not self._snapshot_export:
+            return
+        values = self.driver.published_values
+        try:
+            if not values:
+                self._snapshot_export.reset(connected=True)
+            else:
+                self._snapshot_export.publish(values, self.driver.last_read_timestamp or time.time())
+            self._metric_snapshot_bytes.set(self._snapshot_export.used_size)
+        except Exception as e:
+            self.on_status(f"Snapshot export failed: {e}", False)
+
+    def _update_snapshot_export_connection(self):
+        """Mirror the connection state into the shared memory snapshot export, if enabled."""
+        if not self._snapshot_export:
+            return
+        connected = self.driver.is_connected()
+        if connected != self._snapshot_export_connected:
+            self._snapshot_export.set_connected(connected)
+            self._snapshot_export_connected = connected
+
+    def _thread_target(self):
+        """Entry point for the communication thread."""
+        self.driver.decode_executor = self._create_decode_executor()
+        try:
+            asyncio.run(self._update_plc_data())
+        finally:
+            if self.driver.decode_executor is not None:
+                self.driver.decode_executor.shutdown(cancel_futures=True)
+                self.driver.decode_executor = None
+
+    def _create_decode_executor(self):
+        """Create the pool cyclic responses are decoded in, or None to decode them inline."""
+        if self.out_of_process or self.decode_offload not in DECODE_OFFLOAD_MODES[1:]:
+            return None # The worker process already decodes off the Kit side
+        workers = max(1, int(self.decode_workers))
+        if self.decode_offload == 'thread':
+            return ThreadPoolExecutor(workers, thread_name_prefix="br_bridge_decode")
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(self.get_setting('WORKER_PYTHON', '') or _python_executable())
+        return ProcessPoolExecutor(workers, mp_context=context)
+
+    async def _update_plc_data(self):
+        """
+        Main loop for connecting, auto-reconnecting, reading data, and writing data to the PLC.
+        """
+        while self._running:
+
+            # Wait for the tick source to start the next cycle. Priority writes wake the loop early,
+            # and are sent in between cycles. Connection changes are handled right away, even without ticks.
+            step = self._scheduler.next_step()
+            if step == PRIORITY:
+                with self._tracer.span("priority writes"):
+                    await self._send_priority_writes()
+                continue
+            elif step == CONTROL:
+                await self._update_connection()
+                continue
+            elif step != CYCLE:
+                continue
+
+            self._update_snapshot_export_connection()
+
+            if not await self._update_connection():
+                continue
+
+            # Catch exceptions and report them in the status
+            cycle_start = time.perf_counter()
+            with self._tracer.span("cycle"):
+                try:
+                    if self.driver.is_connected():
+                        # One-shot requests go first, so awaiting scripts get their result within one round trip
+                        with self._tracer.span("requests"):
+                            await self._process_requests()
+
+                        try:
+                            await self._flush_write_queue()
+
+                        except ConnectionClosed as e:
+                            self.on_status(f"Connection Closed: {e}", False)
+
+                        except Exception as e:
+                            self.on_status(f"Error writing data to PLC: {e}", False)
+
+                        # Read data from the PLC
+                        try:
+                            with self._tracer.span("read"):
+                                self.data = await self.driver.read_data()
+                        except PLCDataParsingException as e:
+                            self.on_status(f"PLC read data prasing error: {e}", False)
+
+                        data, changed = self.data, self.driver.data_changed
+                        if self._write_overlay_enabled:
+                            with self._tracer.span("write overlay"):
+                                data, overlay_changed = self._apply_write_overlay(data)
+                            changed = changed or overlay_changed
+
+                        # Publish the data, unless nothing changed and only changes are published
+                        if changed or not self.publish_on_change:
+                            with self._tracer.span("publish"):
+                                self.snapshots.publish(data, self.driver.last_read_timestamp or time.time(),
+                                                       self.driver.flat_output, self.optimistic)
+                                self.on_data(data)
+
+                        if changed:
+                            with self._tracer.span("ui update"):
+                                self.on_data_changed(data)
+
+                        # The snapshot export only holds values read from the PLC
+                        if self.driver.data_changed:
+                            self._metric_snapshot_values.set(len(self.driver.published_values))
+                            with self._tracer.span("snapshot export"):
+                                self._publish_snapshot_export()
+
+                        self._calculate_statistics()
+
+                    else:
+                        # The connection was lost without an error, reconnect on the next cycle
+                        self._communication_initialized = False
+
+                except ConnectionClosedError as e:
+                    self.on_status(f"Connection Closed: {e}", False)
+                    self._communication_initialized = False
+
+                except LinkDeadException as e:
+                    self._link_down(e)
+
+                except ResponseTimeoutException as e:
+                    # The request stays in flight, the next cycle waits for its response
+                    self.on_status(f"{e}", False)
+
+                except Exception as e:
+                    self.on_status(f"Error: {e}", False)
+                    time.sleep(DATA_READ_FAIL_SLEEP_TIME_SECONDS)
+
+            self._record_cycle_metrics(time.perf_counter() - cycle_start)
+
+    async def _update_connection(self):
+        """
+        Disconnects if asked to, and connects if the communication is enabled but not initialized.
+
+        Returns:
+            bool: True if a cycle can run.
+
+        """
+        # Handle disconnect
+        if self._disconnect_command:
+            await self.driver.disconnect()
+            self._disconnect_command = False
+        if self._stopping:
+            return False
+
+        # Check if the communication is disabled
+        if not self._enable_communication:
+            self.on_status("Disabled", True)
+            return False
+
+        # Start the communication if it is and not initialized and enabled
+        if not self._communication_initialized:
+            # Attempt to connect
+            self.on_status("Connecting...", False)
+            try:
+                if await self.driver.connect():
+                    self._tracer.instant("connected")
+                    if self._has_connected:
+                        self._metric_reconnects.inc()
+                    self._has_connected = True
+                    self._communication_initialized = True
+                    self.on_status("Connected", False)
+                    self._last_cyclic_read_time = time.time()
+                    self.reset_worst_latency()
+            except WebsocketsConnectionException as e:
+                self.on_status(f"{e}", False)
+                time.sleep(DATA_READ_FAIL_SLEEP_TIME_SECONDS)
+                return False
+        return True
+
+    def _link_down(self, e):
+        """The PLC stopped answering without closing the connection. Reconnect on the next cycle, without waiting."""
+        self._tracer.instant("link down")
+        self.on_status(f"Link down: {e}", False)
+        self._communication_initialized = False
+
+    def _apply_write_overlay(self, data):
+        """
+        Drop the pending writes that the last read brought back or that timed out, and lay the others over the data.
+
+        Returns:
+            tuple: The data to publish, and whether the overlay changed since the last cycle.
+        """
+        overlay = self._write_overlay
+        with self.write_lock:
+            overlay.read_completed(self.driver.published_values, self.driver.last_read_timestamp, time.time())
+            data, self.optimistic = overlay.apply(data, self.driver.flat_output, self.driver.reads)
+            changed, overlay.changed = overlay.changed, False
+        return data, changed
+
+    def _record_cycle_metrics(self, duration):
+        """Count a cycle, and whether it overran the refresh period. Feeds the adaptive refresh rate."""
+        self._metric_cycles.inc()
+        self._metric_cycle_duration.observe(duration)
+        if self._tick_source_name != 'wall_clock':
+            return
+        if duration > self._current_period():
+            self._metric_overruns.inc()
+        if self._adaptive_refresh_rate:
+            adjustment = self._rate_controller.observe(duration,
+                                                       self.driver.last_round_trip_time,
+                                                       self.driver.last_parse_time)
+            if adjustment:
+                self._apply_refresh_period()
+
+    def _current_period(self):
+        """The refresh period in seconds, as set by the user or by the adaptive refresh rate."""
+        if self._adaptive_refresh_rate:
+            return self._rate_controller.period
+        return self._refresh_rate/1000
+
+    def _apply_refresh_period(self):
+        """Pass the current refresh period on to the worker, the metrics and the UI."""
+        period = self._current_period()
+        self._metric_refresh_period.set(period)
+        if self.out_of_process:
+            self.driver.refresh_rate = round(period * 1000)
+        self.on_refresh_period_changed(period)
+
+    ####################################
+    ####################################
+    # Statistics
+    ####################################
+    ####################################
+
+    def _calculate_statistics(self):
+        """
+        Calculate timing statistics for the read / write cycle.
+        """
+        self.last_cycle_time = time.time() - self._last_cyclic_read_time
+        self.average_latency = self.rolling_average(self.average_latency, self.last_cycle_time)
+        if self.last_cycle_time > self.worst_latency:
+            self.worst_latency = self.last_cycle_time
+
+        # Reset for next scan
+        self._last_cyclic_read_time = time.time()
+        self.on_statistics()
+
+    def rolling_average(self, average, new):
+        """Calculate a rolling average over a given number of samples."""
+        NUM_SAMPLES = 10
+        average -= average / NUM_SAMPLES
+        average += new / NUM_SAMPLES
+        return average
+
+    def reset_worst_latency(self):
+        self.worst_latency = 0
+
+def read_list_file(path):
+    """
+    Reads variable names from a file: a JSON list, or one name per line. Empty lines and lines starting with # are
+    skipped.
+    """
+    with open(path, encoding='utf-8') as file:
+        text = file.read()
+    if text.lstrip().startswith('['):
+        return [str(name) for name in json.loads(text)]
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith('#')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the B&R Bridge without Kit: read variables from a PLC's OMJSON server cyclically.")
+    parser.add_argument('--ip', help="IP address of the PLC. Overrides PLC_IP_ADDRESS in --settings, 127.0.0.1 by default.")
+    parser.add_argument('--port', type=int, help="port of the PLC's OMJSON server. Overrides PLC_PORT in --settings, 8000 by default.")
+    parser.add_argument('--refresh-rate', type=int, help="cyclic read period in ms. Overrides REFRESH_RATE in --settings, 20 by default.")
+    parser.add_argument('--read-list', action='append', default=[], help="file with the variables to read, one per line or a JSON list. Can be repeated.")
+    parser.add_argument('--settings', help="JSON file with further settings, by persistent setting name. {\"PUBLISH_ON_CHANGE\": true, ...}")
+    parser.add_argument('--duration', type=float, help="stop after this many seconds. Runs until interrupted by default.")
+    parser.add_argument('--print', action='store_true', dest='print_data', help="print every changed data frame as a JSON line")
+    args = parser.parse_args(argv)
+
+    settings = {}
+    if args.settings:
+        with open(args.settings, encoding='utf-8') as file:
+            settings.update(json.load(file))
+    for name, value in (('PLC_IP_ADDRESS', args.ip), ('PLC_PORT', args.port), ('REFRESH_RATE', args.refresh_rate)):
+        if value is not None:
+            settings[name] = value
+    settings['ENABLE_COMMUNICATION'] = True
+
+    engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+    for path in args.read_list:
+        for name in read_list_file(path):
+            engine.add_read(name)
+
+    last_status = [None]
+    def print_status(message, _reset):
+        if message != last_status[0]:
+            last_status[0] = message
+            print(message, file=sys.stderr, flush=True)
+    engine.on_status = print_status
+    if args.print_data:
+        engine.on_data_changed = lambda data: print(json.dumps(data, default=to_plain), flush=True)
+
+    stopped = threading.Event()
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    engine.start()
+    try:
+        stopped.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    engine.stop()
+    # Final counters and gauges, for scripts that run the engine for a fixed duration
+    print(json.dumps({name: value for name, value in engine.get_metrics().items() if not isinstance(value, dict)}),
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
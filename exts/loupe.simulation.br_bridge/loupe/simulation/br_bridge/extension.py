@@ -35,6 +35,7 @@ UIBuilder.
 This class sets up standard useful callback functions in UIBuilder:
     on_menu_callback: Called when extension is opened
     on_timeline_event: Called when timeline is stopped, paused, or played
+    on_physics_step: Called on every physics step
     on_stage_event: Called when stage is opened or closed
     cleanup: Called when resources such as physics subscriptions should be cleaned up
     build_ui: User function that creates the UI they want.
@@ -72,7 +73,11 @@ class TestExtension(omni.ext.IExt):
         self._stage_event_sub = None
         self._timeline = omni.timeline.get_timeline_interface()
 
+        # Physics steps can drive the bridge's communication cycle
+        self._subscribe_physics_step()
+
     def on_shutdown(self):
+        self._physx_subscription = None
         self._models = {}
         remove_menu_items(self._menu_items, EXTENSION_TITLE)
         if self._window:
@@ -126,10 +131,17 @@ class TestExtension(omni.ext.IExt):
     def _on_timeline_event(self, event):
         self.ui_builder.on_timeline_event(event)
 
+    def _subscribe_physics_step(self):
+        self._physx_subscription = self._physxIFace.subscribe_physics_step_events(self._on_physics_step)
+
+    def _on_physics_step(self, step):
+        self.ui_builder.on_physics_step(step)
+
     def _on_stage_event(self, event):
         if event.type == int(StageEventType.OPENED) or event.type == int(StageEventType.CLOSED):
             # stage was opened or closed, cleanup
             self._physx_subscription = None
+            self._subscribe_physics_step()
 
         self.ui_builder.on_stage_event(event)
 
@@ -0,0 +1,258 @@
+'''
+  File: **gateway.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+    Local fan-out gateway.
+    Shares one OMJSON connection to the PLC between many local clients. The gateway is a websocket server that
+    speaks the same read/write protocol as the PLC, so existing clients (including this extension) only need to
+    point at the gateway instead of the PLC.
+
+    Run it from a shell:
+        python -m loupe.simulation.br_bridge.gateway --plc-ip 192.168.0.10
+'''
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+import websockets.server
+from websockets.exceptions import ConnectionClosed
+
+from .websockets_driver import WebsocketsDriver, PLCDataParsingException, WebsocketsConnectionException
+
+DEFAULT_GATEWAY_PORT = 8001
+UPSTREAM_RETRY_TIME = 2 # in seconds
+FIRST_READ_TIMEOUT = 5 # in seconds
+
+def _ignore(*args):
+    pass
+
+class Gateway():
+    """
+    Multiplexes one PLC connection to many local clients.
+
+    The PLC is polled once per refresh period for the union of the variables all clients have read so far, and
+    client reads are answered from the latest poll. Variables a client reads for the first time are added to the
+    union, and the read is answered after the next poll. Writes are forwarded in the order they arrive, one at a time.
+    When the PLC connection is lost, all clients are disconnected, as if they were connected to the PLC directly.
+
+    Args:
+        plc_ip (str): IP address of the PLC.
+        plc_port (int): Port of the PLC's OMJSON server.
+        host (str): The address the gateway listens on.
+        port (int): The port the gateway listens on. 0 picks a free port.
+        refresh_rate (int): The period of the upstream poll, in ms.
+
+    Attributes:
+        on_status (Callable[[str, bool], None]): Called with status messages, e.g. upstream connection and parsing
+            errors, and whether the data is no longer valid. Same as BridgeEngine.on_status.
+        upstream (WebsocketsDriver): The connection to the PLC.
+        port (int): The port the gateway listens on, once started.
+        upstream_reads (int): Number of reads sent to the PLC.
+        upstream_writes (int): Number of writes sent to the PLC.
+        downstream_reads (int): Number of reads answered to clients.
+        downstream_writes (int): Number of writes received from clients.
+
+    """
+
+    def __init__(self, plc_ip, plc_port, host='127.0.0.1', port=DEFAULT_GATEWAY_PORT, refresh_rate=20):
+        self.upstream = WebsocketsDriver(plc_ip, plc_port)
+        self.host = host
+        self.port = port
+        self.refresh_rate = refresh_rate
+        self.on_status = _ignore
+
+        self.upstream_reads = 0
+        self.upstream_writes = 0
+        self.downstream_reads = 0
+        self.downstream_writes = 0
+
+        self._connected = False
+        self._values = {}
+        self._polled = set()
+        self._client_reads = {}
+        self._read_list_changed = False
+        self._writes = deque()
+        self._wake = None
+        self._cycle_done = None
+        self._server = None
+        self._poll_task = None
+
+    @property
+    def connected(self):
+        """Whether the gateway is connected to the PLC and accepting clients."""
+        return self._connected
+
+    @property
+    def clients(self):
+        """The number of connected clients."""
+        return len(self._client_reads)
+
+    def read_list(self):
+        """Returns the union of the variables read by all connected clients."""
+        names = {}
+        for reads in self._client_reads.values():
+            names.update(dict.fromkeys(reads))
+        return list(names)
+
+    async def start(self):
+        """Starts listening for clients and polling the PLC."""
+        self._wake = asyncio.Event()
+        self._cycle_done = asyncio.Event()
+        self._server = await websockets.server.serve(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._poll_task = asyncio.create_task(self._poll_upstream())
+
+    async def stop(self):
+        """Disconnects all clients and the PLC."""
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._connected = False
+        try:
+            await self.upstream.disconnect()
+        except WebsocketsConnectionException:
+            pass
+
+    async def serve_forever(self):
+        """Runs the gateway until the task is cancelled."""
+        await self.start()
+        try:
+            await asyncio.Future()
+        finally:
+            await self.stop()
+
+    async def _handle_client(self, websocket):
+        if not self._connected:
+            await websocket.close(1013, "PLC not connected")
+            return
+        self._client_reads[websocket] = set()
+        try:
+            async for message in websocket:
+                try:
+                    request = json.loads(message)
+                except ValueError:
+                    continue # e.g. the empty message clients send before closing
+                if request.get("type") == "read":
+                    response = await self._serve_read(websocket, request.get("data", []))
+                    await websocket.send(json.dumps(response))
+                elif request.get("type") == "write":
+                    self.downstream_writes += 1
+                    self._writes.append(dict(request.get("data", {})))
+                    self._wake.set()
+        except ConnectionClosed:
+            pass
+        finally:
+            del self._client_reads[websocket]
+
+    async def _serve_read(self, websocket, names):
+        self.downstream_reads += 1
+        reads = self._client_reads[websocket]
+        reads.update(names)
+        if any(name not in self._polled for name in names):
+            # Variables that haven't been polled yet are read right away
+            self._read_list_changed = True
+            cycle_done = self._cycle_done
+            self._wake.set()
+            try:
+                await asyncio.wait_for(cycle_done.wait(), FIRST_READ_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        values = self._values
+        return {"type": "readresponse", "data": [{name: values[name]} for name in names if name in values]}
+
+    async def _set_connected(self, connected):
+        if connected == self._connected:
+            return
+        self._connected = connected
+        if not connected:
+            self._values = {}
+            self._polled = set()
+            for websocket in list(self._client_reads):
+                await websocket.close(1011, "PLC connection lost")
+
+    async def _poll_upstream(self):
+        """Connects to the PLC, forwards writes as they arrive, and polls the union read list every refresh period."""
+        next_read = 0
+        while True:
+            if not self.upstream.is_connected():
+                await self._set_connected(False)
+                try:
+                    await self.upstream.connect()
+                except WebsocketsConnectionException as e:
+                    self.on_status(f"{e}", False)
+                    await asyncio.sleep(UPSTREAM_RETRY_TIME)
+                    continue
+                await self._set_connected(True)
+                next_read = 0
+
+            try:
+                while self._writes:
+                    await self.upstream.write_data(self._writes.popleft())
+                    self.upstream_writes += 1
+
+                if time.time() >= next_read or self._read_list_changed:
+                    next_read = time.time() + self.refresh_rate/1000
+                    self._read_list_changed = False
+                    names = self.read_list()
+                    self._values = await self.upstream.read_variables(names)
+                    self._polled = set(names)
+                    if names:
+                        self.upstream_reads += 1
+                    cycle_done, self._cycle_done = self._cycle_done, asyncio.Event()
+                    cycle_done.set()
+            except ConnectionClosed:
+                continue
+            except PLCDataParsingException as e:
+                self.on_status(f"PLC read data parsing error: {e}", False)
+                # Variables read for the first time may have caused the error. They are dropped, so the next poll
+                # recovers, and their reads are answered right away instead of after FIRST_READ_TIMEOUT. Clients add
+                # them again with their next read.
+                for reads in self._client_reads.values():
+                    reads.intersection_update(self._polled)
+                cycle_done, self._cycle_done = self._cycle_done, asyncio.Event()
+                cycle_done.set()
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, next_read - time.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share one connection to a B&R PLC's OMJSON server between many local clients.")
+    parser.add_argument('--plc-ip', required=True, help="IP address of the PLC")
+    parser.add_argument('--plc-port', type=int, default=8000, help="port of the PLC's OMJSON server")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on for clients")
+    parser.add_argument('--port', type=int, default=DEFAULT_GATEWAY_PORT, help="port to listen on for clients")
+    parser.add_argument('--refresh-rate', type=int, default=20, help="PLC poll period in ms")
+    args = parser.parse_args(argv)
+
+    gateway = Gateway(args.plc_ip, args.plc_port, host=args.host, port=args.port, refresh_rate=args.refresh_rate)
+    last_status = [None]
+    def print_status(message, _reset):
+        if message != last_status[0]:
+            last_status[0] = message
+            print(f"Gateway: {message}", file=sys.stderr, flush=True)
+    gateway.on_status = print_status
+    try:
+        asyncio.run(gateway.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
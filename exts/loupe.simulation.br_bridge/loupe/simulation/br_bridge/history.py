@@ -0,0 +1,171 @@
+'''
+  File: **history.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+from array import array
+from threading import Lock
+
+DEFAULT_HISTORY_MEMORY_BUDGET = 64 * 1024 * 1024 # in bytes
+BYTES_PER_SAMPLE = 2 * array('d').itemsize # one timestamp and one value
+
+class HistoryBudgetException(Exception):
+    pass
+
+class RingBuffer():
+    """
+    A fixed-capacity history of timestamped numeric values, backed by two preallocated arrays of doubles.
+
+    Attributes:
+        capacity (int): The maximum number of samples kept. Older samples are overwritten.
+
+    """
+
+    def __init__(self, capacity : int):
+        self.capacity = int(capacity)
+        self._timestamps = array('d', bytes(self.capacity * array('d').itemsize))
+        self._values = array('d', bytes(self.capacity * array('d').itemsize))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp : float, value : float):
+        """Adds a sample, overwriting the oldest one if the buffer is full."""
+        self._timestamps[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _slice(self, start : int, stop : int):
+        """Returns samples by logical index (0 is the oldest sample) as a pair of arrays."""
+        first = (self._next - self._count) % self.capacity
+        begin = (first + start) % self.capacity
+        end = begin + (stop - start)
+        if end <= self.capacity:
+            return self._timestamps[begin:end], self._values[begin:end]
+        end -= self.capacity
+        return self._timestamps[begin:] + self._timestamps[:end], self._values[begin:] + self._values[:end]
+
+    def _bisect(self, timestamp : float, after=False):
+        """Returns the logical index of the first sample at (or, if after is set, after) the timestamp."""
+        first = (self._next - self._count) % self.capacity
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            sample_time = self._timestamps[(first + middle) % self.capacity]
+            if sample_time < timestamp or (after and sample_time == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def last(self, n : int):
+        """Returns the newest n samples, oldest first, as a (timestamps, values) pair of arrays."""
+        n = max(0, min(int(n), self._count))
+        return self._slice(self._count - n, self._count)
+
+    def range(self, start_time : float, end_time : float):
+        """Returns the samples with start_time <= timestamp <= end_time as a (timestamps, values) pair of arrays."""
+        start = self._bisect(start_time)
+        stop = self._bisect(end_time, after=True)
+        return self._slice(start, max(start, stop))
+
+class HistoryStore():
+    """
+    An optional history of selected numeric PLC variables, with a memory budget shared by all variables.
+
+    Only variables that have been selected with track() are recorded. Booleans are recorded as 0.0 and 1.0,
+    and strings are ignored. All methods are safe to call from any thread.
+
+    Attributes:
+        memory_budget (int): The maximum number of bytes used by all ring buffers together.
+
+    """
+
+    def __init__(self, memory_budget=DEFAULT_HISTORY_MEMORY_BUDGET):
+        self.memory_budget = int(memory_budget)
+        self._buffers = {}
+        self._lock = Lock()
+
+    @property
+    def memory_used(self):
+        """The number of bytes used by all ring buffers together."""
+        return sum(buffer.capacity for buffer in self._buffers.values()) * BYTES_PER_SAMPLE
+
+    def track(self, plc_var : str, capacity : int):
+        """
+        Starts recording the history of a variable. Recorded samples are kept if it is already tracked with the
+        same capacity.
+
+        Args:
+            plc_var (str): The name of the variable. "Program:axis.position"
+            capacity (int): The number of samples to keep.
+
+        Raises:
+            HistoryBudgetException: If the buffer would exceed the memory budget.
+
+        """
+        capacity = int(capacity)
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        with self._lock:
+            existing = self._buffers.get(plc_var)
+            if existing is not None and existing.capacity == capacity:
+                return
+            existing_bytes = existing.capacity * BYTES_PER_SAMPLE if existing is not None else 0
+            if self.memory_used - existing_bytes + capacity * BYTES_PER_SAMPLE > self.memory_budget:
+                raise HistoryBudgetException(f"History of {plc_var} with {capacity} samples exceeds the memory budget of {self.memory_budget} bytes")
+            self._buffers[plc_var] = RingBuffer(capacity)
+
+    def untrack(self, plc_var : str):
+        """Stops recording the history of a variable and frees its buffer."""
+        with self._lock:
+            self._buffers.pop(plc_var, None)
+
+    def clear(self):
+        """Stops recording the history of all variables."""
+        with self._lock:
+            self._buffers = {}
+
+    def add(self, plc_var : str, timestamp : float, value):
+        """Records a sample, if the variable is tracked and the value is numeric."""
+        buffer = self._buffers.get(plc_var)
+        if buffer is None or not isinstance(value, (int, float)):
+            return
+        with self._lock:
+            buffer.append(timestamp, value)
+
+    def last(self, plc_var : str, n : int):
+        """
+        Returns the newest n samples of a variable, oldest first.
+
+        Returns:
+            tuple: (timestamps, values) as arrays of doubles. Both are empty if the variable is not tracked.
+
+        """
+        with self._lock:
+            buffer = self._buffers.get(plc_var)
+            if buffer is None:
+                return array('d'), array('d')
+            return buffer.last(n)
+
+    def range(self, plc_var : str, start_time : float, end_time : float):
+        """
+        Returns the samples of a variable between two times (inclusive), oldest first.
+
+        Returns:
+            tuple: (timestamps, values) as arrays of doubles. Both are empty if the variable is not tracked.
+
+        """
+        with self._lock:
+            buffer = self._buffers.get(plc_var)
+            if buffer is None:
+                return array('d'), array('d')
+            return buffer.range(start_time, end_time)
@@ -0,0 +1,231 @@
+'''
+  File: **metrics.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0) # in seconds
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class MetricsException(Exception):
+    pass
+
+class Counter():
+    """
+    A value that only goes up. inc() is a single attribute update, so counters can be left on in the hot path.
+    Counters are only updated from the communication thread, and read from any thread.
+    """
+
+    type_name = 'counter'
+
+    def __init__(self, name : str, help_text : str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+    def _samples(self):
+        yield self.name, self.value
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+
+    type_name = 'gauge'
+
+    def set(self, value):
+        self.value = value
+
+class Histogram():
+    """
+    Counts observations in buckets with fixed upper bounds, e.g. latencies.
+
+    Args:
+        buckets (tuple): The upper bounds of the buckets, in increasing order. A +Inf bucket is added.
+
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name : str, help_text : str, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value : float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q : float):
+        """
+        Estimates a quantile from the buckets, as the upper bound of the bucket it falls in.
+
+        Returns:
+            float: The estimate, or None if nothing was observed. inf if it falls in the +Inf bucket.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+    def _samples(self):
+        snapshot = self.snapshot()
+        for bound, cumulative in snapshot['buckets'].items():
+            yield f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative
+        yield self.name + '_sum', snapshot['sum']
+        yield self.name + '_count', snapshot['count']
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    elif isinstance(value, bool):
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class MetricsRegistry():
+    """
+    Named counters, gauges and histograms, exported as a dictionary or in the Prometheus text format.
+
+    Metrics are created once, and then updated through the returned object:
+
+        cycles = registry.counter('br_bridge_cycles_total', "Communication cycles")
+        cycles.inc()
+
+    Registering a name again returns the existing metric, so several components can share a registry.
+
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, cls, name, help_text, *args):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, *args)
+        elif type(metric) is not cls:
+            raise MetricsException(f"{name} is already registered as a {metric.type_name}")
+        return metric
+
+    def counter(self, name : str, help_text : str = ''):
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name : str, help_text : str = ''):
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name : str, help_text : str = '', buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram, name, help_text, buckets)
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+    def __contains__(self, name):
+        return name in self._metrics
+
+    def reset(self):
+        """Sets every metric back to zero."""
+        for metric in self._metrics.values():
+            if isinstance(metric, Histogram):
+                metric.counts = [0] * len(metric.counts)
+                metric.sum = 0.0
+                metric.count = 0
+            else:
+                metric.value = 0
+
+    def snapshot(self):
+        """
+        Returns the current values of all metrics.
+
+        Returns:
+            dict: Counter and gauge values, and {'count', 'sum', 'buckets'} for histograms, by name.
+            Histogram buckets map upper bounds to cumulative counts.
+        """
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def to_prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, metric in self._metrics.items():
+            if metric.help_text:
+                lines.append(f'# HELP {name} {metric.help_text}')
+            lines.append(f'# TYPE {name} {metric.type_name}')
+            for sample_name, value in metric._samples():
+                lines.append(f'{sample_name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+class MetricsServer():
+    """
+    Serves a registry in the Prometheus text format over HTTP, from a background thread.
+
+    Args:
+        registry (MetricsRegistry): The metrics to serve.
+        host (str): The address to listen on. Local only by default.
+        port (int): The port to listen on. 0 picks a free port, see the port attribute after start().
+
+    """
+
+    def __init__(self, registry : MetricsRegistry, host='127.0.0.1', port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args): # pylint: disable=W0622
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="br_bridge_metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = self._thread = None
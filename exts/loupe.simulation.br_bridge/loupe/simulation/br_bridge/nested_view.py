@@ -0,0 +1,250 @@
+'''
+  File: **nested_view.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import re
+import sys
+from collections.abc import Mapping, Sequence
+
+_PART_PATTERN = re.compile(r'([^\[\]]*)((?:\[-?\d+\])*)$')
+_INDEX_PATTERN = re.compile(r'\[(-?\d+)\]')
+
+def split_path(plc_var : str):
+    """
+    Splits a variable name into the keys of the nested data, the same way WebsocketsDriver builds it.
+
+    Returns:
+        list: Member names and array indices. "Program:axis[3].pos" -> ["Program", "axis", 3, "pos"]
+
+    """
+    keys = []
+    for part in re.split('[:.]', plc_var):
+        match = _PART_PATTERN.match(part)
+        if match is None:
+            keys.append(part)
+            continue
+        keys.append(match.group(1))
+        keys.extend(int(index) for index in _INDEX_PATTERN.findall(match.group(2)))
+    return keys
+
+def compile_path(plc_var : str):
+    """
+    Splits a variable name into the keys of the nested data, with interned member names, so that the keys of every
+    cycle's data are shared instead of allocated again.
+
+    Returns:
+        tuple: Member names and array indices. "Program:axis[3].pos" -> ("Program", "axis", 3, "pos")
+
+    """
+    return tuple(sys.intern(key) if isinstance(key, str) else key for key in split_path(plc_var))
+
+def insert_path(root : dict, keys : tuple, value):
+    """
+    Sets a value in the nested data, creating the dicts and lists on its path. Lists are extended with None up to the
+    index. A value in the way of the path, e.g. a scalar where a struct is expected, is replaced.
+
+    Returns:
+        dict: root
+    """
+    node = root
+    last = len(keys) - 1
+    for position in range(last):
+        key = keys[position]
+        wanted = list if type(keys[position + 1]) is int else dict
+        if type(key) is int:
+            if key >= len(node):
+                node.extend([None] * (key + 1 - len(node)))
+            child = node[key]
+        else:
+            child = node.get(key)
+        if not isinstance(child, wanted):
+            child = node[key] = wanted()
+        node = child
+    key = keys[last]
+    if type(key) is int and key >= len(node):
+        node.extend([None] * (key + 1 - len(node)))
+    node[key] = value
+    return root
+
+def replace_path(node, keys, value, copied):
+    """
+    Sets a value in nested data without modifying it: the dicts and lists on the path are copied, unless they were
+    copied already. A value in the way of the path is replaced, as in insert_path().
+
+    Args:
+        copied (set): The ids of the copies made so far, shared by every call on the same data.
+
+    Returns:
+        The copy of node.
+    """
+    key = keys[0]
+    wanted = list if type(key) is int else dict
+    if not isinstance(node, wanted):
+        node = wanted()
+        copied.add(id(node))
+    elif id(node) not in copied:
+        node = wanted(node)
+        copied.add(id(node))
+    if type(key) is int:
+        if key >= len(node):
+            node.extend([None] * (key + 1 - len(node)))
+        child = node[key]
+    else:
+        child = node.get(key)
+    node[key] = value if len(keys) == 1 else replace_path(child, keys[1:], value, copied)
+    return node
+
+class _ListNode(dict):
+    """An array in the shape: indices mapped to children."""
+
+    def __init__(self):
+        super().__init__()
+        self.length = 0
+
+class _MergedRanges():
+    """
+    A leaf in the shape for several read ranges of the same array. Their slots are merged into one list when read, as
+    in the nested data.
+
+    Args:
+        ranges (list): The slot, first and last index of every range. [(0, 0, 9), (1, 20, 29)]
+
+    """
+
+    __slots__ = ('ranges', 'length')
+
+    def __init__(self, ranges : list):
+        self.ranges = ranges
+        self.length = max(end for _, _, end in ranges) + 1
+
+    def merge(self, values : list):
+        array = [None] * self.length
+        for slot, start, end in self.ranges:
+            range_values = values[slot]
+            if range_values is not None:
+                array[start:end + 1] = range_values[start:end + 1]
+        return array
+
+def build_shape(slots : dict):
+    """
+    Builds the shape of the nested data from variable names, once per read list.
+
+    Args:
+        slots (dict): Variable names and their slots. {"Program:axis[3].pos": 0, ...} The leaf of an array with
+            several read ranges is a _MergedRanges instead of a slot.
+
+    Returns:
+        dict: Nested dicts (members) and _ListNodes (arrays), with slot numbers as leaves.
+
+    """
+    root = {}
+    for plc_var, slot in slots.items():
+        keys = compile_path(plc_var)
+        node = root
+        for key, next_key in zip(keys, keys[1:]):
+            child = node.get(key)
+            wanted = _ListNode if isinstance(next_key, int) else dict
+            if type(child) is not wanted:
+                # As when building the nested data, later variables replace conflicting ones
+                child = node[key] = wanted()
+            if isinstance(node, _ListNode):
+                node.length = max(node.length, key + 1)
+            node = child
+        node[keys[-1]] = slot
+        if isinstance(node, _ListNode):
+            node.length = max(node.length, keys[-1] + 1)
+    return root
+
+def _child(node, values, views, key):
+    child = node[key]
+    if type(child) is int:
+        return values[child]
+    if type(child) is _MergedRanges:
+        return child.merge(values)
+    view = views.get(key)
+    if view is None:
+        view = views[key] = ListView(child, values) if isinstance(child, _ListNode) else NestedView(child, values)
+    return view
+
+def _materialize(value):
+    return value.materialize() if isinstance(value, (NestedView, ListView)) else value
+
+class NestedView(Mapping):
+    """
+    A read-only view of flat slot values, shaped like the nested data of a DATA_READ event.
+
+    Sub-views are only created when they are accessed, and are cached for the lifetime of the view. A new view is
+    created for every cycle, so only the parts of the tree that are actually used get built.
+
+    Args:
+        node (dict): The shape of this level, see build_shape().
+        values (list): The slot values of one cycle.
+
+    """
+
+    def __init__(self, node : dict, values : list):
+        self._node = node
+        self._values = values
+        self._views = {}
+
+    def __getitem__(self, key):
+        return _child(self._node, self._values, self._views, key)
+
+    def __iter__(self):
+        return iter(self._node)
+
+    def __len__(self):
+        return len(self._node)
+
+    def __repr__(self):
+        return f"NestedView({self.materialize()!r})"
+
+    def materialize(self):
+        """Returns this level and everything below it as plain dicts and lists."""
+        return {key: _materialize(self[key]) for key in self._node}
+
+class ListView(Sequence):
+    """
+    A read-only view of an array in the nested data. Indices that were not read are None, as in the nested data.
+
+    Args:
+        node (_ListNode): The shape of this array, see build_shape().
+        values (list): The slot values of one cycle.
+
+    """
+
+    def __init__(self, node : _ListNode, values : list):
+        self._node = node
+        self._values = values
+        self._views = {}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        if index not in self._node:
+            return None
+        return _child(self._node, self._values, self._views, index)
+
+    def __len__(self):
+        return self._node.length
+
+    def __eq__(self, other):
+        if isinstance(other, (list, ListView)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ListView({self.materialize()!r})"
+
+    def materialize(self):
+        """Returns this array and everything below it as plain lists and dicts."""
+        return [_materialize(item) for item in self]
@@ -0,0 +1,322 @@
+'''
+  File: **plc_types.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import json
+import math
+import re
+
+class PLCTypeException(Exception):
+    pass
+
+INTEGER_RANGES = {
+    'SINT': (-2**7, 2**7 - 1),
+    'INT': (-2**15, 2**15 - 1),
+    'DINT': (-2**31, 2**31 - 1),
+    'LINT': (-2**63, 2**63 - 1),
+    'USINT': (0, 2**8 - 1),
+    'UINT': (0, 2**16 - 1),
+    'UDINT': (0, 2**32 - 1),
+    'ULINT': (0, 2**64 - 1),
+    'BYTE': (0, 2**8 - 1),
+    'WORD': (0, 2**16 - 1),
+    'DWORD': (0, 2**32 - 1),
+}
+REAL_MAX = 3.4028234663852886e38
+DEFAULT_STRING_LENGTH = 80
+
+_BOOL_STRINGS = {'true': True, 'false': False, '1': True, '0': False}
+_ARRAY_PATTERN = re.compile(r'ARRAY\s*\[\s*(-?\d+)\s*\.\.\s*(-?\d+)\s*\]\s*OF\s+(.+)$', re.IGNORECASE)
+_STRING_PATTERN = re.compile(r'W?STRING(?:\s*\[\s*(\d+)\s*\])?$', re.IGNORECASE)
+_ELEMENT_PATTERN = re.compile(r'(.*)\[(-?\d+)\]$')
+
+class TypeConverter():
+    """
+    Normalizes values read from the PLC, and validates and coerces values written to it, for one PLC type.
+
+    decode() is lenient: values that can't be converted are returned unchanged. encode() is strict: it raises a
+    PLCTypeException for values the PLC would reject.
+
+    Attributes:
+        type_name (str): The PLC type. "REAL", "STRING[80]", "ARRAY[0..9] OF DINT"
+
+    """
+
+    def __init__(self, type_name : str):
+        self.type_name = type_name
+
+    def decode(self, value):
+        return value
+
+    def encode(self, value):
+        return value
+
+    def _reject(self, value, reason="not a valid"):
+        raise PLCTypeException(f"{value!r} is {reason} {self.type_name}")
+
+class BoolConverter(TypeConverter):
+
+    def decode(self, value):
+        return bool(value) if isinstance(value, (int, float)) else value
+
+    def encode(self, value):
+        if isinstance(value, bool):
+            return value
+        elif isinstance(value, (int, float)) and value in (0, 1):
+            return bool(value)
+        elif isinstance(value, str) and value.strip().lower() in _BOOL_STRINGS:
+            return _BOOL_STRINGS[value.strip().lower()]
+        self._reject(value)
+
+class IntegerConverter(TypeConverter):
+    """
+    Attributes:
+        minimum (int): The smallest value of the type.
+        maximum (int): The largest value of the type.
+
+    """
+
+    def __init__(self, type_name, minimum, maximum):
+        super().__init__(type_name)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def decode(self, value):
+        return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+    def encode(self, value):
+        number = value
+        if isinstance(value, str):
+            try:
+                number = float(value) if '.' in value or 'e' in value.lower() else int(value)
+            except ValueError:
+                self._reject(value)
+        if isinstance(number, float):
+            if not number.is_integer():
+                self._reject(value)
+            number = int(number)
+        if not isinstance(number, int):
+            self._reject(value)
+        if not self.minimum <= number <= self.maximum:
+            self._reject(value, "out of range for")
+        return int(number)
+
+class RealConverter(TypeConverter):
+    """
+    Attributes:
+        maximum (float): The largest magnitude of the type.
+
+    """
+
+    def __init__(self, type_name, maximum):
+        super().__init__(type_name)
+        self.maximum = maximum
+
+    def decode(self, value):
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+    def encode(self, value):
+        if isinstance(value, bool):
+            self._reject(value)
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            self._reject(value)
+        if not math.isfinite(number):
+            self._reject(value)
+        if abs(number) > self.maximum:
+            self._reject(value, "out of range for")
+        return number
+
+class StringConverter(TypeConverter):
+    """
+    Attributes:
+        length (int): The maximum number of characters.
+
+    """
+
+    def __init__(self, type_name, length):
+        super().__init__(type_name)
+        self.length = length
+
+    def decode(self, value):
+        return value if value is None or isinstance(value, str) else str(value)
+
+    def encode(self, value):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            self._reject(value)
+        text = value if isinstance(value, str) else str(value)
+        if len(text) > self.length:
+            self._reject(value, "too long for")
+        return text
+
+class ArrayConverter(TypeConverter):
+    """
+    Attributes:
+        low (int): The lowest index.
+        high (int): The highest index.
+        element (TypeConverter): The converter of the elements.
+
+    """
+
+    def __init__(self, type_name, low, high, element):
+        super().__init__(type_name)
+        self.low = low
+        self.high = high
+        self.element = element
+
+    def decode(self, value):
+        if isinstance(value, list):
+            return [self.element.decode(item) for item in value]
+        return value
+
+    def encode(self, value):
+        if isinstance(value, str):
+            # e.g. typed into the dev tools as "[1, 2, 3]"
+            try:
+                value = json.loads(value)
+            except ValueError:
+                self._reject(value)
+        if not isinstance(value, (list, tuple)):
+            self._reject(value)
+        if len(value) != self.high - self.low + 1:
+            self._reject(value, f"not {self.high - self.low + 1} elements, as required for")
+        return [self.element.encode(item) for item in value]
+
+def compile_type(type_spec : str):
+    """
+    Compiles a PLC type into a converter.
+
+    Args:
+        type_spec (str): An IEC 61131-3 type. "BOOL", "DINT", "LREAL", "STRING[80]", "ARRAY[0..9] OF REAL"
+
+    Returns:
+        TypeConverter: The converter for the type.
+
+    Raises:
+        PLCTypeException: If the type is not supported.
+
+    """
+    type_name = ' '.join(str(type_spec).split())
+    upper = type_name.upper()
+    array_match = _ARRAY_PATTERN.match(type_name)
+    string_match = _STRING_PATTERN.match(type_name)
+    if array_match:
+        low, high = int(array_match.group(1)), int(array_match.group(2))
+        if high < low:
+            raise PLCTypeException(f"Invalid array bounds in {type_name}")
+        return ArrayConverter(type_name, low, high, compile_type(array_match.group(3)))
+    elif string_match:
+        return StringConverter(type_name, int(string_match.group(1) or DEFAULT_STRING_LENGTH))
+    elif upper == 'BOOL':
+        return BoolConverter(type_name)
+    elif upper in INTEGER_RANGES:
+        return IntegerConverter(type_name, *INTEGER_RANGES[upper])
+    elif upper == 'REAL':
+        return RealConverter(type_name, REAL_MAX)
+    elif upper == 'LREAL':
+        return RealConverter(type_name, float('inf'))
+    raise PLCTypeException(f"Unsupported PLC type {type_name}")
+
+class TypeSchema():
+    """
+    The PLC types of selected variables, compiled into converters.
+
+    Types are set for full variable names. Elements of a typed array ("Program:arr[3]") use the array's element type.
+    The converter of every variable is resolved once and cached, so the per-value cost is a single dictionary lookup.
+    Variables without a type are passed through unchanged.
+
+    """
+
+    def __init__(self):
+        self._types = {}
+        self._resolved = {}
+
+    def __bool__(self):
+        return bool(self._types)
+
+    def set_type(self, plc_var : str, type_spec : str):
+        """
+        Sets the type of a variable.
+
+        Args:
+            plc_var (str): The name of the variable. "Program:my_struct.my_var"
+            type_spec (str): The PLC type. "REAL", "STRING[80]", "ARRAY[0..9] OF DINT"
+
+        Raises:
+            PLCTypeException: If the type is not supported.
+
+        """
+        self._types[plc_var] = compile_type(type_spec)
+        self._resolved = {}
+
+    def set_types(self, types : dict):
+        """Sets the types of many variables. {"Program:my_var": "REAL", ...}"""
+        for plc_var, type_spec in types.items():
+            self.set_type(plc_var, type_spec)
+
+    def clear(self):
+        """Removes all types."""
+        self._types = {}
+        self._resolved = {}
+
+    def converter(self, plc_var : str):
+        """Returns the converter of a variable, or None if it has no type."""
+        try:
+            return self._resolved[plc_var]
+        except KeyError:
+            pass
+        converter = self._types.get(plc_var)
+        if converter is None:
+            element_match = _ELEMENT_PATTERN.match(plc_var)
+            if element_match:
+                parent = self.converter(element_match.group(1))
+                if isinstance(parent, ArrayConverter):
+                    converter = parent.element
+        self._resolved[plc_var] = converter
+        return converter
+
+    def decode(self, plc_var : str, value):
+        """Normalizes a value read from the PLC."""
+        converter = self.converter(plc_var)
+        return converter.decode(value) if converter else value
+
+    def encode(self, plc_var : str, value):
+        """
+        Validates and coerces a value to be written to the PLC.
+
+        Raises:
+            PLCTypeException: If the value is not valid for the variable's type.
+
+        """
+        converter = self.converter(plc_var)
+        if converter is None:
+            return value
+        try:
+            return converter.encode(value)
+        except PLCTypeException as e:
+            raise PLCTypeException(f"{plc_var}: {e}") from None
+
+    def encode_all(self, values : dict):
+        """
+        Validates and coerces values to be written to the PLC. Either all values are valid, or none are returned.
+
+        Raises:
+            PLCTypeException: Listing every invalid value.
+
+        """
+        encoded = {}
+        errors = []
+        for plc_var, value in values.items():
+            try:
+                encoded[plc_var] = self.encode(plc_var, value)
+            except PLCTypeException as e:
+                errors.append(str(e))
+        if errors:
+            raise PLCTypeException("; ".join(errors))
+        return encoded
@@ -0,0 +1,385 @@
+'''
+  File: **process_driver.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from collections import deque
+
+from websockets.exceptions import ConnectionClosed
+
+from .websockets_driver import WebsocketsDriver, PLCDataParsingException, WebsocketsConnectionException
+from .shared_snapshot import SharedSnapshotWriter, SharedSnapshotReader, DEFAULT_SEGMENT_SIZE
+from .metrics import Histogram
+
+WORKER_START_TIMEOUT = 10 # in seconds, includes connecting to the PLC
+WORKER_REPLY_TIMEOUT = 5 # in seconds
+WORKER_STOP_TIMEOUT = 2 # in seconds
+WORKER_METRICS_INTERVAL = 1 # in seconds
+
+# Metrics of the PLC connection, which only the worker's driver counts. They are forwarded to the driver in Kit.
+FORWARDED_METRICS = ('br_bridge_connects_total', 'br_bridge_messages_sent_total', 'br_bridge_messages_received_total',
+                     'br_bridge_bytes_sent_total', 'br_bridge_bytes_received_total', 'br_bridge_writes_total',
+                     'br_bridge_variables_written_total', 'br_bridge_read_latency_seconds',
+                     'br_bridge_write_latency_seconds')
+
+def _metric_state(metric):
+    if isinstance(metric, Histogram):
+        return (list(metric.counts), metric.sum, metric.count)
+    return metric.value
+
+def _python_executable():
+    """
+    Returns the Python interpreter to start the worker with.
+    Kit embeds Python, so sys.executable may be the Kit executable rather than an interpreter.
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for candidate in ('python.exe', 'python3', os.path.join('bin', 'python3'), os.path.join('bin', 'python')):
+        path = os.path.join(sys.prefix, candidate)
+        if os.path.isfile(path):
+            return path
+    return sys.executable
+
+def _worker_main(segment_name, commands, replies):
+    """Entry point of the worker process."""
+    asyncio.run(_run_worker(segment_name, commands, replies))
+
+async def _run_worker(segment_name, commands, replies):
+    """
+    Owns the PLC connection: runs the cyclic read at the refresh rate and publishes every frame to the shared
+    snapshot. Commands from Kit are handled as soon as they arrive, so writes and one-shot reads don't wait for the
+    next cyclic read.
+    """
+    driver = WebsocketsDriver()
+    snapshot = SharedSnapshotWriter(segment_name, create=False)
+    period = 0.02
+    next_cycle = time.time()
+    writes = {}
+    reads = deque()
+    was_connected = False
+    next_metrics = time.time()
+
+    try:
+        while True:
+            try:
+                command = commands.get(timeout=max(0.0, next_cycle - time.time()))
+            except queue.Empty:
+                command = None
+
+            if command is not None:
+                kind, args = command[0], command[1:]
+                if kind == 'stop':
+                    break
+                elif kind == 'connect':
+                    driver.ip, driver.port, period = args
+                    try:
+                        if driver.is_connected():
+                            # Close the old socket first, so reconnecting doesn't leak the PLC connection
+                            await driver.disconnect()
+                        await driver.connect()
+                        message = ''
+                    except WebsocketsConnectionException as e:
+                        message = str(e)
+                    # Publish the flag before replying, so Kit sees the connection as soon as connect() returns
+                    was_connected = driver.is_connected()
+                    snapshot.set_connected(was_connected)
+                    replies.put(('connected', was_connected, message))
+                    next_cycle = time.time()
+                elif kind == 'disconnect':
+                    try:
+                        await driver.disconnect()
+                    except WebsocketsConnectionException:
+                        pass
+                elif kind == 'add_read':
+                    driver.add_read(args[0])
+                elif kind == 'clear_read_list':
+                    driver.clear_read_list()
+                    snapshot.reset(connected=driver.is_connected())
+                elif kind == 'refresh_rate':
+                    period = args[0]
+                elif kind == 'write':
+                    writes.update(args[0])
+                elif kind == 'read_variables':
+                    reads.append(args)
+
+            if time.time() >= next_metrics:
+                next_metrics = time.time() + WORKER_METRICS_INTERVAL
+                replies.put(('metrics', {name: _metric_state(driver.metrics[name]) for name in FORWARDED_METRICS}))
+
+            connected = driver.is_connected()
+            if connected != was_connected:
+                snapshot.set_connected(connected)
+                was_connected = connected
+            if not connected:
+                while reads:
+                    replies.put(('read_variables', reads.popleft()[0], None, "Not connected"))
+                writes = {}
+                # Block on the command queue for a period instead of spinning until Kit connects
+                next_cycle = time.time() + period
+                continue
+
+            try:
+                while reads:
+                    request_id, plc_vars = reads.popleft()
+                    try:
+                        replies.put(('read_variables', request_id, await driver.read_variables(plc_vars), None))
+                    except PLCDataParsingException as e:
+                        replies.put(('read_variables', request_id, None, str(e)))
+                if writes:
+                    values, writes = writes, {}
+                    await driver.write_data(values)
+                if time.time() >= next_cycle:
+                    next_cycle = time.time() + period
+                    if driver._read_names: # pylint: disable=W0212
+                        request = driver._compile_request() # pylint: disable=W0212
+                        response, timestamp = await driver._request_read(request.names, request.payload_json) # pylint: disable=W0212
+                        if response["type"] == "readresponse":
+                            snapshot.publish({plc_var: value for var_dict in response["data"] for plc_var, value in var_dict.items()},
+                                             timestamp)
+            except ConnectionClosed:
+                pass # Reported through the connection flag, Kit reconnects
+            except Exception as e:
+                replies.put(('error', str(e)))
+    finally:
+        try:
+            await driver.disconnect()
+        except Exception:
+            pass
+        snapshot.set_connected(False)
+        snapshot.close()
+
+class ProcessWebsocketsDriver(WebsocketsDriver):
+    """
+    A websockets driver that keeps the PLC connection in a separate worker process, so that socket I/O and decoding
+    never compete with Kit for the GIL.
+
+    The worker runs the cyclic read at the refresh rate and publishes every frame into a shared memory snapshot.
+    read_data() only copies the latest frame out of shared memory. Writes and one-shot reads are sent to the worker
+    through a command queue. Deadbands, samples and history are applied on the Kit side, as with WebsocketsDriver.
+
+    The command queue is a multiprocessing.Queue, not a lock-free ring in shared memory. Commands are rare and small
+    next to the cyclic frames, and the worker blocks on the queue between cycles, so a write wakes it right away. A
+    ring in shared memory would have to be polled by the worker, trading latency for CPU. The frames, which are read
+    every cycle, are the only data that goes through shared memory.
+    The metrics of the PLC connection (messages, bytes, latencies) are counted by the worker and added to this
+    driver's metrics every WORKER_METRICS_INTERVAL.
+
+    Attributes:
+        refresh_rate (int): The worker's cyclic read period, in ms.
+        python_executable (str): The interpreter to start the worker with. Detected if None.
+
+    """
+
+    def __init__(self, ip=None, port=None, segment_size=DEFAULT_SEGMENT_SIZE, python_executable=None):
+        super().__init__(ip, port)
+        self.python_executable = python_executable
+        self._segment_size = segment_size
+        self._refresh_rate = 20
+        self._snapshot = None
+        self._reader = None
+        self._process = None
+        self._commands = None
+        self._replies = None
+        self._request_id = 0
+        self._worker_error = None
+        self._last_sequence = None
+        self._last_data = {}
+        self._worker_metrics = {}
+
+    @property
+    def refresh_rate(self):
+        return self._refresh_rate
+
+    @refresh_rate.setter
+    def refresh_rate(self, refresh_rate):
+        self._refresh_rate = refresh_rate
+        self._send('refresh_rate', refresh_rate/1000)
+
+    def _worker_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def _send(self, *command):
+        if self._worker_alive():
+            self._commands.put(command)
+
+    def _start_worker(self):
+        """Starts the worker process, replaying the read list."""
+        if self._snapshot is None:
+            self._snapshot = SharedSnapshotWriter(size=self._segment_size)
+            self._reader = SharedSnapshotReader(self._snapshot.name)
+
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(self.python_executable or _python_executable())
+        self._commands = context.Queue()
+        self._replies = context.Queue()
+        self._process = context.Process(target=_worker_main,
+                                        args=(self._snapshot.name, self._commands, self._replies),
+                                        name="br_bridge_worker",
+                                        daemon=True)
+        self._process.start()
+        self._worker_metrics = {}
+        for plc_var in self._read_names:
+            self._commands.put(('add_read', plc_var))
+
+    def stop_worker(self):
+        """Stops the worker process and removes the shared snapshot."""
+        if self._process is not None:
+            self._send('stop')
+            self._process.join(WORKER_STOP_TIMEOUT)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._snapshot is not None:
+            self._reader.close()
+            self._snapshot.close()
+            self._snapshot = self._reader = None
+
+    def _wait_reply(self, kind, request_id=None, timeout=WORKER_REPLY_TIMEOUT):
+        """
+        Waits for a reply from the worker. Only one request is waited for at a time, so replies of any other kind are
+        left over from requests that timed out, and are discarded. Errors are kept for the next read_data(), and
+        metrics are added to this driver's metrics.
+        """
+        deadline = time.time() + timeout
+        while True:
+            try:
+                reply = self._replies.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                return None
+            if reply[0] == kind and (request_id is None or reply[1] == request_id):
+                return reply[1:]
+            self._handle_report(reply)
+
+    def _drain_replies(self):
+        """Collects errors and metrics reported by the worker since the last read."""
+        while self._replies is not None:
+            try:
+                reply = self._replies.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_report(reply)
+
+    def _handle_report(self, reply):
+        if reply[0] == 'error':
+            self._worker_error = reply[1]
+        elif reply[0] == 'metrics':
+            self._add_worker_metrics(reply[1])
+
+    def _add_worker_metrics(self, states):
+        """Adds what the worker counted since its last report to this driver's metrics."""
+        for name, state in states.items():
+            metric = self.metrics[name]
+            previous = self._worker_metrics.get(name)
+            if isinstance(metric, Histogram):
+                counts, total, count = state
+                previous_counts, previous_total, previous_count = previous or ([0] * len(counts), 0.0, 0)
+                for index, bucket_count in enumerate(counts):
+                    metric.counts[index] += bucket_count - previous_counts[index]
+                metric.sum += total - previous_total
+                metric.count += count - previous_count
+            else:
+                metric.inc(state - (previous or 0))
+        self._worker_metrics = states
+
+    def add_read(self, plc_var : str, deadband=None, relative_deadband=None):
+        if plc_var not in self._read_names:
+            self._send('add_read', plc_var)
+        super().add_read(plc_var, deadband, relative_deadband)
+
+    def clear_read_list(self):
+        super().clear_read_list()
+        self._last_sequence = None
+        self._send('clear_read_list')
+
+    async def write_data(self, data : dict):
+        """Queues data to be written by the worker. Doesn't wait for the PLC."""
+        if not self._worker_alive():
+            raise ConnectionClosed(None, None)
+        if self.types:
+            data = self.types.encode_all(data)
+        self._commands.put(('write', dict(data)))
+
+    async def read_data(self):
+        """
+        Returns the latest frame published by the worker.
+        If the worker hasn't published a new frame since the last call, the previous result is returned unchanged.
+        """
+        if not self._read_names:
+            return await super().read_data()
+
+        self._drain_replies()
+        if self._worker_error is not None:
+            error, self._worker_error = self._worker_error, None
+            raise PLCDataParsingException(error)
+
+        frame = self._reader.read()
+        if frame.sequence == self._last_sequence or not frame.values:
+            self.data_changed = False
+        else:
+            self._last_sequence = frame.sequence
+            self.last_read_timestamp = frame.timestamp
+            self._last_data = self._parse_plc_response({"type": "readresponse", "data": [frame.values]}, frame.timestamp)
+
+        if self.read_groups:
+            # Triggered groups are read through the worker, like one-shot reads
+            return await self._read_triggered_groups(self._last_data)
+        return self._last_data
+
+    async def read_variables(self, plc_vars : list):
+        if not plc_vars:
+            return {}
+        self._request_id += 1
+        self._send('read_variables', self._request_id, list(plc_vars))
+        reply = self._wait_reply('read_variables', self._request_id) if self._worker_alive() else None
+        if reply is None:
+            raise PLCDataParsingException("No reply from the communication worker")
+        _, result, error = reply
+        if error is not None:
+            raise PLCDataParsingException(error)
+        if self.types:
+            return {plc_var: self.types.decode(plc_var, value) for plc_var, value in result.items()}
+        return result
+
+    async def connect(self):
+        """
+        Starts the worker if it isn't running, and has it connect to the target device.
+
+        Returns True if connection was succesful, False otherwise.
+
+        """
+        self._published_values = {}
+        self._last_sequence = None
+        if not self._worker_alive():
+            self._start_worker()
+        self._commands.put(('connect', self.ip, self.port, self._refresh_rate/1000))
+        reply = self._wait_reply('connected', timeout=WORKER_START_TIMEOUT)
+        if reply is None:
+            raise WebsocketsConnectionException("Communication worker did not start")
+        connected, message = reply
+        if message:
+            raise WebsocketsConnectionException(message)
+        return connected
+
+    async def disconnect(self):
+        """Has the worker disconnect from the target device. The worker keeps running."""
+        self._send('disconnect')
+
+    def is_connected(self):
+        """
+        Returns the connection state, as published by the worker.
+
+        Returns:
+            bool: True if the worker is running and connected, False otherwise.
+
+        """
+        return self._worker_alive() and self._reader.connected
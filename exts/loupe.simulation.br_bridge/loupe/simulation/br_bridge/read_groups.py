@@ -0,0 +1,77 @@
+'''
+  File: **read_groups.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+MISSING = object()
+
+class ReadGroup():
+    """
+    Variables that are read once when a trigger changes, instead of every cycle. The trigger is a variable in the
+    cyclic read list. Without a predicate, the group is read whenever the trigger's value changes. With a predicate,
+    it's read whenever the predicate becomes true for the trigger's value. Either way, it's also read the first time
+    the trigger is read, and optionally whenever it hasn't been read for a fallback period.
+
+    Args:
+        name (str): The name of the group.
+        variables (list): The variables of the group. Read ranges are allowed. ["Program:recipe", ...]
+        trigger (str): The trigger variable. "Program:recipeLoaded"
+        predicate (Callable[[any], bool]): Optional, the group is read when this becomes true for the trigger's value.
+        fallback_period (float): Optional, the group is read at least this often, in seconds.
+
+    Attributes:
+        pending (bool): True if the group was triggered, until it's read.
+        last_read_time (float): The time the group was last read, or None.
+
+    """
+
+    def __init__(self, name : str, variables : list, trigger : str, predicate=None, fallback_period=None):
+        self.name = name
+        self.variables = list(dict.fromkeys(variables))
+        self.trigger = trigger
+        self.predicate = predicate
+        self.fallback_period = fallback_period
+        self.pending = False
+        self.last_read_time = None
+        self._last_trigger = MISSING
+        self._matched = False
+
+    def update(self, trigger_value, now : float):
+        """
+        Evaluates the trigger after a cyclic read.
+
+        Args:
+            trigger_value (any): The trigger's value, or MISSING if it wasn't read.
+            now (float): The current time.
+
+        Returns:
+            bool: True if the group is due to be read.
+
+        """
+        if trigger_value is not MISSING:
+            if self.predicate is None:
+                if trigger_value != self._last_trigger:
+                    self.pending = True
+            else:
+                matched = bool(self.predicate(trigger_value))
+                if matched and not self._matched:
+                    self.pending = True
+                self._matched = matched
+            self._last_trigger = trigger_value
+        if self.fallback_period is not None and (self.last_read_time is None
+                                                 or now - self.last_read_time >= self.fallback_period):
+            self.pending = True
+        return self.pending
+
+    def read_completed(self, now : float):
+        self.pending = False
+        self.last_read_time = now
+
+    def reset(self):
+        """Forgets the trigger's value, so the group is read again once the trigger is read, e.g. after reconnecting."""
+        self._last_trigger = MISSING
+        self._matched = False
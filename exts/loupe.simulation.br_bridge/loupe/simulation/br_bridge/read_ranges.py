@@ -0,0 +1,115 @@
+'''
+  File: **read_ranges.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import re
+
+_RANGE_PATTERN = re.compile(r'^(.+)\[(\d+)\.\.(\d+)\]$')
+
+def parse_range(plc_var : str):
+    """
+    Parses a read range, an array variable with an inclusive index range as its last index.
+
+    Args:
+        plc_var (str): A variable name. "Program:buf[0..999]"
+
+    Returns:
+        ReadRange: The range, or None if plc_var isn't a range.
+
+    Raises:
+        ValueError: If the end of the range is before its start.
+
+    """
+    match = _RANGE_PATTERN.match(plc_var)
+    if match is None:
+        return None
+    start, end = int(match.group(2)), int(match.group(3))
+    if end < start:
+        raise ValueError(f"Invalid range {plc_var}, the end is before the start")
+    return ReadRange(plc_var, match.group(1), start, end)
+
+def expand_ranges(plc_vars : list):
+    """
+    Replaces read ranges in a list of variable names by the names of their elements.
+
+    Returns:
+        tuple: The expanded names, and the ReadRanges found.
+
+    """
+    names = []
+    read_ranges = []
+    for plc_var in plc_vars:
+        read_range = parse_range(plc_var)
+        if read_range is None:
+            names.append(plc_var)
+        else:
+            names.extend(read_range.element_names)
+            read_ranges.append(read_range)
+    return names, read_ranges
+
+class ReadRange():
+    """
+    A contiguous range of array elements, read as one entry of the read list.
+
+    The element names are built once. Values are decoded into a preallocated list that is indexed like the PLC array:
+    values[i] is element i, and the indices below the start of the range are None.
+
+    Args:
+        name (str): The name of the range. "Program:buf[10..19]"
+        base (str): The name of the array. "Program:buf"
+        start (int): The first index.
+        end (int): The last index, included.
+
+    Attributes:
+        element_names (list): The names of the elements, in order. ["Program:buf[10]", ...]
+        values (list): The values of the last read.
+
+    """
+
+    def __init__(self, name : str, base : str, start : int, end : int):
+        self.name = name
+        self.base = base
+        self.start = start
+        self.end = end
+        self.element_names = [f"{base}[{index}]" for index in range(start, end + 1)]
+        self.values = [None] * (end + 1)
+
+    def __len__(self):
+        return self.end - self.start + 1
+
+    def clear(self):
+        self.values[self.start:] = [None] * len(self)
+
+    def store(self, var_dicts : list, types=None):
+        """
+        Stores the values of a read response that lists the elements in order, one per dict.
+
+        Raises:
+            KeyError: If the response doesn't list the elements in order.
+
+        """
+        names = self.element_names
+        if types:
+            self.values[self.start:] = [types.decode(name, var_dict[name]) for var_dict, name in zip(var_dicts, names)]
+        else:
+            self.values[self.start:] = [var_dict[name] for var_dict, name in zip(var_dicts, names)]
+
+    def store_array(self, array : list, types=None):
+        """
+        Stores the values from a whole array, as read by its name.
+
+        Raises:
+            ValueError: If the array is too short for the range.
+
+        """
+        elements = array[self.start:self.end + 1]
+        if len(elements) != len(self):
+            raise ValueError(f"{self.base} has {len(array)} elements, {self.name} is out of bounds")
+        if types:
+            elements = [types.decode(name, value) for name, value in zip(self.element_names, elements)]
+        self.values[self.start:] = elements
@@ -0,0 +1,104 @@
+'''
+  File: **samples.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+from collections import deque
+
+DEFAULT_SAMPLE_DEPTH = 4
+
+class SampleStore():
+    """
+    Keeps the last few timestamped samples of every numeric PLC variable, and estimates values in between.
+
+    Samples are added by the communication thread and queried from any other thread. Each buffer is a bounded deque,
+    so adding a sample never allocates more than the sample tuple itself.
+
+    Attributes:
+        depth (int): The number of samples kept per variable.
+
+    """
+
+    def __init__(self, depth=DEFAULT_SAMPLE_DEPTH):
+        self.depth = max(2, int(depth))
+        self._buffers = {}
+
+    def add(self, plc_var : str, timestamp : float, value):
+        """
+        Adds a sample for a variable. Values that are not numeric are ignored.
+
+        Args:
+            plc_var (str): The name of the variable. "Program:axis.position"
+            timestamp (float): The time the value was valid at, in seconds since the epoch.
+            value (any): The value read from the PLC.
+
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return
+        try:
+            buffer = self._buffers[plc_var]
+        except KeyError:
+            buffer = self._buffers[plc_var] = deque(maxlen=self.depth)
+        buffer.append((timestamp, value))
+
+    def clear(self):
+        """Removes all samples."""
+        self._buffers = {}
+
+    def get_samples(self, plc_var : str):
+        """
+        Returns the samples of a variable, oldest first.
+
+        Returns:
+            list: A list of (timestamp, value) tuples. Empty if no samples are available.
+
+        """
+        buffer = self._buffers.get(plc_var)
+        if buffer is None:
+            return []
+        return list(buffer)
+
+    def interpolate(self, plc_var : str, timestamp : float, max_extrapolation : float = None):
+        """
+        Estimates the value of a variable at any time.
+
+        Between two samples the value is linearly interpolated. After the newest sample it is linearly extrapolated
+        from the two newest samples, for at most max_extrapolation seconds. Before the oldest sample, the oldest
+        value is returned.
+
+        Args:
+            plc_var (str): The name of the variable. "Program:axis.position"
+            timestamp (float): The time to estimate the value at, in seconds since the epoch.
+            max_extrapolation (float): Seconds past the newest sample to extrapolate for. Defaults to the interval
+                between the two newest samples.
+
+        Returns:
+            float: The estimated value, or None if no samples are available.
+
+        """
+        samples = self.get_samples(plc_var)
+        if not samples:
+            return None
+
+        if len(samples) == 1 or timestamp <= samples[0][0]:
+            return samples[0][1]
+
+        for (t0, v0), (t1, v1) in zip(samples, samples[1:]):
+            if timestamp <= t1:
+                return _lerp(t0, v0, t1, v1, timestamp)
+
+        # Past the newest sample, extrapolate from the two newest samples
+        (t0, v0), (t1, v1) = samples[-2], samples[-1]
+        if max_extrapolation is None:
+            max_extrapolation = t1 - t0
+        timestamp = min(timestamp, t1 + max_extrapolation)
+        return _lerp(t0, v0, t1, v1, timestamp)
+
+def _lerp(t0, v0, t1, v1, timestamp):
+    if t1 == t0:
+        return v1
+    return v0 + (v1 - v0) * (timestamp - t0) / (t1 - t0)
@@ -0,0 +1,435 @@
+'''
+  File: **shared_snapshot.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+    Shared memory snapshot of flat PLC values.
+
+    A single writer publishes the latest values into a shared memory segment, and any number of readers in other
+    processes map the segment and read the latest frame without sockets or serialization.
+
+    Layout (little-endian):
+        Header, HEADER_SIZE bytes:
+            magic (4s), format version (I), sequence (Q), schema version (I), flags (I), slot count (I),
+            schema size (I), values offset (I), values size (I), timestamp (d)
+        Schema table, at HEADER_SIZE: UTF-8 JSON with the names, types, offsets, capacities and struct format of all
+            slots.
+        Values, at values offset: one fixed-size slot per variable, packed with the struct format from the schema.
+            Strings are truncated to the string capacity. Values stored as JSON text, e.g. structs and arrays, get a
+            slot sized to fit them, which grows with the value.
+
+    The sequence number is a seqlock: it is odd while the writer is updating the segment, and changes with every
+    frame. Readers retry until they have copied a frame with the same even sequence number before and after.
+
+    This module only depends on the Python standard library, so external consumers can import it (or a copy of it)
+    without Kit.
+'''
+
+import json
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+MAGIC = b'BRSS'
+FORMAT_VERSION = 2
+HEADER_FORMAT = '<4sIQIIIIIId'
+HEADER_SIZE = 64
+SEQUENCE_OFFSET = 8
+SEQUENCE_FORMAT = '<Q'
+FLAGS_OFFSET = 20
+FLAGS_FORMAT = '<I'
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024 # in bytes
+DEFAULT_STRING_CAPACITY = 256 # in bytes, longer strings are truncated
+
+FLAG_CONNECTED = 1
+
+# Slot types and their struct format codes. Values that are not basic types are stored as JSON text, which is never
+# truncated: the slot grows instead.
+SLOT_BOOL = 'b'
+SLOT_INT = 'i'
+SLOT_FLOAT = 'f'
+SLOT_STRING = 's'
+SLOT_JSON = 'j'
+
+class SharedSnapshotException(Exception):
+    pass
+
+def _slot_type(value):
+    if isinstance(value, bool):
+        return SLOT_BOOL
+    elif isinstance(value, int):
+        return SLOT_INT
+    elif isinstance(value, float):
+        return SLOT_FLOAT
+    elif isinstance(value, str):
+        return SLOT_STRING
+    return SLOT_JSON
+
+def _slot_format(slot_type, capacity):
+    return {SLOT_BOOL: '?', SLOT_INT: 'q', SLOT_FLOAT: 'd'}.get(slot_type, f'{capacity}s')
+
+def _json_capacity(size, string_capacity):
+    """The capacity of a JSON slot for an encoded value of this size, with room to grow before the next relayout."""
+    capacity = string_capacity
+    while capacity < size:
+        capacity *= 2
+    return capacity
+
+def _attach(name : str):
+    """Attach to an existing segment, without making this process responsible for unlinking it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if sys.platform == 'win32':
+        return shared_memory.SharedMemory(name=name)
+    # Older versions register every attached segment with the resource tracker, which would unlink it when this
+    # process exits, or when the creator already unregistered it from a shared tracker
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class SharedSnapshotWriter():
+    """
+    Publishes flat PLC values into a shared memory segment.
+
+    The slot layout is derived from the values themselves, and only changes when variables are added, or when a
+    value no longer fits its slot type. Variables missing from a frame keep their last value.
+
+    Args:
+        name (str): Name of the segment. A unique name is generated if None.
+        size (int): Size of the segment in bytes, when it is created.
+        create (bool): Create the segment, or attach to one created by another process.
+        string_capacity (int): Bytes reserved for every string value, and at least for every JSON value.
+
+    """
+
+    def __init__(self, name=None, size=DEFAULT_SEGMENT_SIZE, create=True, string_capacity=DEFAULT_STRING_CAPACITY):
+        if create:
+            self._segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._segment = _attach(name)
+        self._owner = create
+        self.string_capacity = string_capacity
+        self._sequence = 0
+        self._schema_version = 0
+        self._names = []
+        self._types = []
+        self._capacities = []
+        self._slots = {}
+        self._values = []
+        self._struct = struct.Struct('<')
+        self._schema = b''
+        self._schema_dirty = False
+        self._values_offset = HEADER_SIZE
+        self._last_timestamp = 0.0
+        self._write_header(0.0, 0)
+
+    @property
+    def name(self):
+        return self._segment.name
+
+    @property
+    def used_size(self):
+        """The bytes of the segment used by the header, the schema and the values."""
+        return self._values_offset + self._struct.size
+
+    def reset(self, connected=False):
+        """Removes all slots, for example when the read list was cleared."""
+        self._relayout([], [], [])
+        self._slots, self._values = {}, []
+        self.publish({}, 0.0, connected=connected)
+
+    def _relayout(self, names, types, capacities):
+        formats = []
+        offsets = []
+        offset = 0
+        for slot_type, capacity in zip(types, capacities):
+            slot_format = _slot_format(slot_type, capacity)
+            offsets.append(offset)
+            offset += struct.calcsize('<' + slot_format)
+            formats.append(slot_format)
+        slot_struct = struct.Struct('<' + ''.join(formats))
+
+        schema = json.dumps({'names': names,
+                             'types': ''.join(types),
+                             'offsets': offsets,
+                             'capacities': capacities,
+                             'format': slot_struct.format,
+                             'string_capacity': self.string_capacity}).encode('utf-8')
+        values_offset = HEADER_SIZE + len(schema)
+        values_offset += -values_offset % 8
+        if values_offset + slot_struct.size > self._segment.size:
+            raise SharedSnapshotException(f"Snapshot of {len(names)} variables does not fit in the shared memory segment of {self._segment.size} bytes")
+
+        self._names = names
+        self._types = types
+        self._capacities = capacities
+        self._struct = slot_struct
+        self._schema = schema
+        self._values_offset = values_offset
+        self._schema_version += 1
+        self._schema_dirty = True
+
+    def _encode(self, slot_type, value):
+        if slot_type == SLOT_FLOAT:
+            return float(value)
+        elif slot_type == SLOT_STRING:
+            return value.encode('utf-8')[:self.string_capacity]
+        elif slot_type == SLOT_JSON:
+            return json.dumps(value).encode('utf-8')
+        return value
+
+    def _fits(self, slot_type, value):
+        value_type = _slot_type(value)
+        return value_type == slot_type or (slot_type == SLOT_FLOAT and value_type == SLOT_INT)
+
+    def publish(self, values : dict, timestamp : float, connected=True):
+        """
+        Publishes a frame.
+
+        Args:
+            values (dict): Flat variable names and values. {"Program:my_struct.my_var": 1.5, ...}
+            timestamp (float): The time the values were valid at.
+            connected (bool): Whether the source of the values is connected to the PLC.
+
+        Raises:
+            SharedSnapshotException: If the values don't fit in the segment. Nothing is published.
+
+        """
+        names, types, capacities = self._names, self._types, self._capacities
+        encoded = {}
+        for plc_var, value in values.items():
+            index = self._slots.get(plc_var, len(names))
+            slot_type = _slot_type(value)
+            if index < len(names) and self._fits(types[index], value):
+                slot_type = types[index]
+            encoded[plc_var] = data = self._encode(slot_type, value)
+            capacity = _json_capacity(len(data), self.string_capacity) if slot_type == SLOT_JSON else self.string_capacity
+            if index == len(names):
+                if names is self._names:
+                    names, types, capacities = list(names), list(types), list(capacities)
+                names.append(plc_var)
+                types.append(slot_type)
+                capacities.append(capacity)
+            elif slot_type != types[index] or capacity > capacities[index]:
+                # The value changed type, e.g. an integer turned out to be a float, or outgrew its JSON slot
+                if names is self._names:
+                    names, types, capacities = list(names), list(types), list(capacities)
+                types[index] = slot_type
+                capacities[index] = max(capacity, capacities[index]) if slot_type == SLOT_JSON else capacity
+        if names is not self._names:
+            self._relayout(names, types, capacities)
+            for index in range(len(self._values), len(names)):
+                self._slots[names[index]] = index
+                self._values.append(None)
+
+        for plc_var, data in encoded.items():
+            self._values[self._slots[plc_var]] = data
+
+        packed = [value if value is not None else _EMPTY[slot_type] for value, slot_type in zip(self._values, self._types)]
+
+        buffer = self._segment.buf
+        self._set_sequence(self._sequence + 1) # odd: writing
+        if self._schema_dirty:
+            buffer[HEADER_SIZE:HEADER_SIZE + len(self._schema)] = self._schema
+            self._schema_dirty = False
+        self._struct.pack_into(buffer, self._values_offset, *packed)
+        self._write_header(timestamp, FLAG_CONNECTED if connected else 0)
+        self._set_sequence(self._sequence + 1) # even: done
+
+    def set_connected(self, connected : bool):
+        """Updates the connection flag without publishing new values."""
+        self._set_sequence(self._sequence + 1)
+        self._write_header(self._last_timestamp, FLAG_CONNECTED if connected else 0)
+        self._set_sequence(self._sequence + 1)
+
+    def _set_sequence(self, sequence):
+        self._sequence = sequence
+        struct.pack_into(SEQUENCE_FORMAT, self._segment.buf, SEQUENCE_OFFSET, sequence)
+
+    def _write_header(self, timestamp, flags):
+        self._last_timestamp = timestamp
+        struct.pack_into(HEADER_FORMAT, self._segment.buf, 0, MAGIC, FORMAT_VERSION, self._sequence,
+                         self._schema_version, flags, len(self._names), len(self._schema),
+                         self._values_offset, self._struct.size, timestamp)
+
+    def close(self):
+        """Closes the segment, and removes it if this writer created it."""
+        self._segment.close()
+        if self._owner:
+            self._segment.unlink()
+
+_EMPTY = {SLOT_BOOL: False, SLOT_INT: 0, SLOT_FLOAT: 0.0, SLOT_STRING: b'', SLOT_JSON: b'null'}
+
+class SnapshotFrame():
+    """
+    A consistent copy of one frame of a shared snapshot.
+
+    Attributes:
+        sequence (int): Changes with every frame.
+        timestamp (float): The time the values were valid at.
+        connected (bool): Whether the writer was connected to the PLC.
+        values (dict): Flat variable names and values.
+
+    """
+
+    def __init__(self, sequence, timestamp, connected, values):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.connected = connected
+        self.values = values
+
+class SharedSnapshotReader():
+    """
+    Reads the latest frame of a shared snapshot published by a SharedSnapshotWriter, in this or another process.
+
+    Args:
+        name (str): Name of the segment.
+
+    """
+
+    def __init__(self, name : str):
+        self._segment = _attach(name)
+        self._schema_version = None
+        self._names = []
+        self._types = ''
+        self._offsets = []
+        self._capacities = []
+        self._struct = None
+        self._values_offset = HEADER_SIZE
+        self._layout = None
+        magic, format_version = struct.unpack_from('<4sI', self._segment.buf, 0)
+        if magic != MAGIC:
+            self._segment.close()
+            raise SharedSnapshotException(f"Shared memory segment {name} is not a B&R Bridge snapshot")
+        if format_version != FORMAT_VERSION:
+            self._segment.close()
+            raise SharedSnapshotException(f"Shared memory segment {name} has format version {format_version}, expected {FORMAT_VERSION}")
+
+    @property
+    def sequence(self):
+        """The sequence number of the latest frame. Cheap to poll for new frames."""
+        return struct.unpack_from(SEQUENCE_FORMAT, self._segment.buf, SEQUENCE_OFFSET)[0]
+
+    @property
+    def connected(self):
+        """Whether the writer is connected to the PLC. Cheap to poll."""
+        return bool(struct.unpack_from(FLAGS_FORMAT, self._segment.buf, FLAGS_OFFSET)[0] & FLAG_CONNECTED)
+
+    def read(self, timeout=1.0):
+        """
+        Returns a consistent copy of the latest frame.
+
+        Args:
+            timeout (float): Seconds to keep retrying while the writer is updating the segment.
+
+        Raises:
+            SharedSnapshotException: If no consistent frame could be read within the timeout.
+
+        """
+        buffer = self._segment.buf
+        deadline = time.time() + timeout
+        while True:
+            (_, _, sequence, schema_version, flags, slot_count,
+             schema_size, values_offset, _, timestamp) = struct.unpack_from(HEADER_FORMAT, buffer, 0)
+            if not sequence % 2:
+                try:
+                    if schema_version != self._schema_version:
+                        schema = json.loads(bytes(buffer[HEADER_SIZE:HEADER_SIZE + schema_size]).decode('utf-8')) if slot_count else {}
+                        names = schema.get('names', [])
+                        types = schema.get('types', '')
+                        slot_struct = struct.Struct(schema.get('format', '<'))
+                    else:
+                        schema = None
+                        names, types, slot_struct = self._names, self._types, self._struct
+                    raw_values = slot_struct.unpack_from(buffer, values_offset) if names else ()
+                except (ValueError, struct.error):
+                    # Torn by a relayout in progress: JSON, UTF-8 and struct errors are retried like a sequence mismatch
+                    sequence = None
+                if sequence is not None and struct.unpack_from(SEQUENCE_FORMAT, buffer, SEQUENCE_OFFSET)[0] == sequence:
+                    if schema is not None:
+                        self._schema_version, self._names, self._types, self._struct = schema_version, names, types, slot_struct
+                        self._offsets = schema.get('offsets', [])
+                        self._capacities = schema.get('capacities', [])
+                        self._values_offset = values_offset
+                        self._layout = None
+                    values = {name: self._decode(slot_type, value) for name, slot_type, value in zip(names, types, raw_values)}
+                    return SnapshotFrame(sequence, timestamp, bool(flags & FLAG_CONNECTED), values)
+            if time.time() > deadline:
+                raise SharedSnapshotException("Timed out reading a consistent snapshot frame")
+            time.sleep(0)
+
+    def read_value(self, name : str, timeout=1.0):
+        """
+        Returns the latest value of a single variable, without copying the rest of the frame.
+
+        Args:
+            name (str): The flat variable name. "Program:my_struct.my_var"
+            timeout (float): Seconds to keep retrying while the writer is updating the segment.
+
+        Raises:
+            KeyError: If the variable is not in the snapshot.
+            SharedSnapshotException: If no consistent value could be read within the timeout.
+
+        """
+        buffer = self._segment.buf
+        deadline = time.time() + timeout
+        while True:
+            sequence, schema_version = struct.unpack_from('<QI', buffer, SEQUENCE_OFFSET)
+            if schema_version != self._schema_version:
+                # Load the new schema
+                self.read(max(0.0, deadline - time.time()))
+                continue
+            if not sequence % 2:
+                if self._layout is None:
+                    self._layout = {slot_name: (struct.Struct('<' + _slot_format(slot_type, capacity)), offset, slot_type)
+                                    for slot_name, slot_type, offset, capacity
+                                    in zip(self._names, self._types, self._offsets, self._capacities)}
+                slot_struct, offset, slot_type = self._layout[name]
+                try:
+                    value = slot_struct.unpack_from(buffer, self._values_offset + offset)[0]
+                except struct.error:
+                    pass # Torn by a relayout in progress, retry
+                else:
+                    if struct.unpack_from(SEQUENCE_FORMAT, buffer, SEQUENCE_OFFSET)[0] == sequence:
+                        return self._decode(slot_type, value)
+            if time.time() > deadline:
+                raise SharedSnapshotException("Timed out reading a consistent snapshot value")
+            time.sleep(0)
+
+    def wait_for_frame(self, sequence=None, timeout=1.0, poll_interval=0.001):
+        """
+        Waits for a frame newer than the given sequence number, and returns it.
+
+        Args:
+            sequence (int): The sequence number of the last frame the caller has seen. None returns the latest frame.
+            timeout (float): The maximum number of seconds to wait.
+            poll_interval (float): Seconds between checks of the sequence number.
+
+        Returns:
+            SnapshotFrame: The new frame, or None if no new frame was published within the timeout.
+
+        """
+        deadline = time.time() + timeout
+        while sequence is not None and self.sequence == sequence:
+            if time.time() > deadline:
+                return None
+            time.sleep(poll_interval)
+        return self.read(max(0.0, deadline - time.time()))
+
+    @staticmethod
+    def _decode(slot_type, value):
+        if slot_type == SLOT_STRING:
+            return value.rstrip(b'\0').decode('utf-8', errors='ignore')
+        elif slot_type == SLOT_JSON:
+            return json.loads(value.rstrip(b'\0').decode('utf-8', errors='ignore') or 'null')
+        return value
+
+    def close(self):
+        self._segment.close()
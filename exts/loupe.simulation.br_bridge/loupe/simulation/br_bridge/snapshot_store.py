@@ -0,0 +1,120 @@
+'''
+  File: **snapshot_store.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+from collections import deque
+from threading import Lock
+
+from .nested_view import compile_path
+
+DEFAULT_SNAPSHOT_STORE_DEPTH = 4
+
+class Snapshot():
+    """
+    The data of a published cycle. The data is shared with every reader, and must not be modified.
+
+    Attributes:
+        sequence (int): Increases by one with every published cycle, starting at 1.
+        timestamp (float): The time the values were valid at.
+        data (dict): The published data, nested, flat or compact, as passed to on_data.
+        flat (bool): True if the data is keyed by the full variable name.
+        optimistic (tuple): The variables showing a written value that wasn't read back yet.
+
+    """
+
+    __slots__ = ('sequence', 'timestamp', 'data', 'flat', 'optimistic')
+
+    def __init__(self, sequence, timestamp, data, flat, optimistic):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.data = data
+        self.flat = flat
+        self.optimistic = optimistic
+
+    def get(self, name : str):
+        """
+        Returns the value of a variable, or of a whole struct or array, without copying.
+
+        Args:
+            name (str): A variable name, or the path of a struct or array in the nested data. "Program:axis[3]"
+
+        Returns:
+            any: The value, or None if it isn't in the snapshot.
+
+        """
+        if self.flat:
+            return self.data.get(name)
+        node = self.data
+        for key in compile_path(name):
+            try:
+                node = node[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return node
+
+    def slice(self, names : list):
+        """Returns the values of several variables, structs or arrays. {"Program:axis[3]": {...}, ...}"""
+        return {name: self.get(name) for name in names}
+
+class SnapshotStore():
+    """
+    Keeps the last few published snapshots, so readers can fetch the snapshot an event refers to by its sequence
+    number, or just the values they need, instead of receiving a copy of all the data with every event.
+    Thread-safe: the engine publishes from the communication thread, readers fetch from any thread.
+
+    Args:
+        depth (int): The number of snapshots kept. Older snapshots are dropped.
+
+    """
+
+    def __init__(self, depth=DEFAULT_SNAPSHOT_STORE_DEPTH):
+        self._snapshots = deque(maxlen=max(1, depth))
+        self._sequence = 0
+        self._lock = Lock()
+
+    def publish(self, data, timestamp : float, flat : bool = False, optimistic=()):
+        """
+        Stores the data of a published cycle, without copying it.
+
+        Returns:
+            Snapshot: The new snapshot.
+
+        """
+        with self._lock:
+            self._sequence += 1
+            snapshot = Snapshot(self._sequence, timestamp, data, flat, tuple(optimistic))
+            self._snapshots.append(snapshot)
+        return snapshot
+
+    def latest(self):
+        """Returns the latest snapshot, or None if nothing was published yet."""
+        with self._lock:
+            return self._snapshots[-1] if self._snapshots else None
+
+    def get(self, sequence : int = None):
+        """
+        Returns a snapshot by sequence number, or the latest one.
+
+        Returns:
+            Snapshot: The snapshot, or None if it was dropped already or hasn't been published yet.
+
+        """
+        with self._lock:
+            if not self._snapshots:
+                return None
+            if sequence is None:
+                return self._snapshots[-1]
+            index = sequence - self._snapshots[0].sequence
+            if 0 <= index < len(self._snapshots):
+                return self._snapshots[index]
+            return None
+
+    def clear(self):
+        """Drops all snapshots. Sequence numbers keep increasing."""
+        with self._lock:
+            self._snapshots.clear()
@@ -1 +1,29 @@
-from .tests import *
+import sys
+
+# The tests run in Kit. Outside of Kit, e.g. for the soak harness, only the Kit-independent modules are imported.
+if "carb" in sys.modules:
+    from .tests import *
+    from .test_deadband import *
+    from .test_samples import *
+    from .test_history import *
+    from .test_one_shot_reads import *
+    from .benchmarks import *
+    from .test_tick_source import *
+    from .test_shared_snapshot import *
+    from .test_gateway import *
+    from .test_plc_types import *
+    from .test_flat_output import *
+    from .test_nested_view import *
+    from .test_tracing import *
+    from .test_metrics import *
+    from .test_adaptive_rate import *
+    from .test_engine import *
+    from .test_soak import *
+    from .test_read_ranges import *
+    from .test_decode_offload import *
+    from .test_compact_snapshot import *
+    from .test_heartbeat import *
+    from .test_write_overlay import *
+    from .test_snapshot_store import *
+    from .test_read_groups import *
+    from .test_ui_builder import *
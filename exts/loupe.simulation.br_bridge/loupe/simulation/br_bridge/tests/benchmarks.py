@@ -0,0 +1,185 @@
+"""
+Benchmarks for the bridge's hot paths. Results are printed to the test log, not asserted: they depend on the machine
+and its load, so only the correctness of the benchmarked code fails a test.
+"""
+
+import time
+import tracemalloc
+
+import carb.events
+import omni.kit.test
+from loupe.simulation.br_bridge.BrBridge import Manager, EVENT_TYPE_DATA_WRITE_REQ
+from loupe.simulation.br_bridge.ui_builder import UIBuilder
+from loupe.simulation.br_bridge.engine import BridgeEngine
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+
+class WriteQueueHolder():
+    """Receives write events like UIBuilder does, into an engine whose communication thread isn't started."""
+
+    def __init__(self):
+        self._engine = BridgeEngine()
+
+    @property
+    def write_queue(self):
+        return self._engine.write_queue
+
+    @write_queue.setter
+    def write_queue(self, write_queue):
+        self._engine.write_queue = write_queue
+
+    on_write_req_event = UIBuilder.on_write_req_event
+
+
+class TestWriteDispatchBenchmark(omni.kit.test.AsyncTestCase):
+    """Compares writing many variables one event at a time against a single batched event."""
+
+    NUM_VARIABLES = 500
+    NUM_ROUNDS = 5
+
+    # Run before every test
+    async def setUp(self):
+        # Use a private event stream, so the running bridge doesn't send these writes to a PLC
+        self.event_stream = carb.events.get_events_interface().create_event_stream()
+        self.holder = WriteQueueHolder()
+        self.subscription = self.event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_WRITE_REQ,
+                                                                                  self.holder.on_write_req_event)
+        self.manager = Manager()
+        self.manager._event_stream = self.event_stream # pylint: disable=W0212
+        self.values = {f"Program:setpoints[{i}]": i * 0.5 for i in range(self.NUM_VARIABLES)}
+
+    async def tearDown(self):
+        self.subscription.unsubscribe()
+
+    def _time(self, function):
+        best = float('inf')
+        for _ in range(self.NUM_ROUNDS):
+            self.holder.write_queue = {}
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_write_dispatch(self):
+        def single_writes():
+            for name, value in self.values.items():
+                self.manager.write_variable(name, value)
+
+        def batched_write():
+            self.manager.write_variables(self.values)
+
+        single_time = self._time(single_writes)
+        self.assertEqual(self.holder.write_queue, self.values)
+        batched_time = self._time(batched_write)
+        self.assertEqual(self.holder.write_queue, self.values)
+
+        print(f"Writing {self.NUM_VARIABLES} variables: "
+              f"write_variable() {single_time * 1000:.2f} ms, "
+              f"write_variables() {batched_time * 1000:.2f} ms, "
+              f"{single_time / batched_time:.1f}x faster")
+
+
+class TestAccessorBenchmark(omni.kit.test.AsyncTestCase):
+    """Compares walking the nested data against a precompiled accessor, for one value out of a large read."""
+
+    NUM_VARIABLES = 1000
+    NUM_LOOKUPS = 100000
+
+    def test_accessor_lookup(self):
+        driver = WebsocketsDriver()
+        names = [f"Program:axes[{i}].position" for i in range(self.NUM_VARIABLES)]
+        for name in names:
+            driver.add_read(name)
+        data = driver._parse_plc_response({"type": "readresponse", "data": [{name: 1.0} for name in names]}) # pylint: disable=W0212
+        position = driver.accessor(names[500])
+
+        start = time.perf_counter()
+        for _ in range(self.NUM_LOOKUPS):
+            data["Program"]["axes"][500]["position"]
+        nested_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(self.NUM_LOOKUPS):
+            position()
+        accessor_time = time.perf_counter() - start
+
+        print(f"{self.NUM_LOOKUPS} lookups: nested {nested_time * 1000:.2f} ms, accessor {accessor_time * 1000:.2f} ms")
+        self.assertEqual(position(), 1.0)
+
+        driver.flat_output = True
+        start = time.perf_counter()
+        driver._parse_plc_response({"type": "readresponse", "data": [{name: 2.0} for name in names]}) # pylint: disable=W0212
+        flat_time = time.perf_counter() - start
+        driver.flat_output = False
+        start = time.perf_counter()
+        driver._parse_plc_response({"type": "readresponse", "data": [{name: 3.0} for name in names]}) # pylint: disable=W0212
+        nested_parse_time = time.perf_counter() - start
+        print(f"Parsing {self.NUM_VARIABLES} variables: nested {nested_parse_time * 1000:.2f} ms, flat {flat_time * 1000:.2f} ms")
+
+
+class TestReadRangeBenchmark(omni.kit.test.AsyncTestCase):
+    """Compares parsing a large array read element by element against the same elements read as one range."""
+
+    NUM_ELEMENTS = 1000
+    NUM_ROUNDS = 5
+
+    def _time_parse(self, driver, response):
+        best = float('inf')
+        for _ in range(self.NUM_ROUNDS):
+            start = time.perf_counter()
+            driver._parse_plc_response(response) # pylint: disable=W0212
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_read_range_parse(self):
+        names = [f"Program:buf[{i}]" for i in range(self.NUM_ELEMENTS)]
+        response = {"type": "readresponse", "data": [{name: float(i)} for i, name in enumerate(names)]}
+
+        element_driver = WebsocketsDriver()
+        for name in names:
+            element_driver.add_read(name)
+        element_time = self._time_parse(element_driver, response)
+
+        range_driver = WebsocketsDriver()
+        range_driver.add_read(f"Program:buf[0..{self.NUM_ELEMENTS - 1}]")
+        range_time = self._time_parse(range_driver, response)
+
+        self.assertEqual(range_driver.data_view()["Program"]["buf"][500], 500.0)
+        print(f"Parsing {self.NUM_ELEMENTS} array elements: one by one {element_time * 1000:.2f} ms, "
+              f"as a range {range_time * 1000:.2f} ms, {element_time / range_time:.1f}x faster")
+
+
+class TestSnapshotMemoryBenchmark(omni.kit.test.AsyncTestCase):
+    """Compares the memory kept by nested dict snapshots against compact snapshots, for a large array of structs."""
+
+    NUM_STRUCTS = 1000
+    MEMBERS = ("position", "velocity", "torque", "enabled", "error", "state")
+    NUM_SNAPSHOTS = 10
+
+    def _retained_bytes(self, driver, response):
+        """Bytes still allocated after keeping NUM_SNAPSHOTS outputs of read_data()."""
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            snapshots = [driver._parse_plc_response(response) for _ in range(self.NUM_SNAPSHOTS)] # pylint: disable=W0212
+            retained = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(snapshots), self.NUM_SNAPSHOTS)
+        return retained
+
+    def test_snapshot_memory(self):
+        names = [f"Program:axes[{i}].{member}" for i in range(self.NUM_STRUCTS) for member in self.MEMBERS]
+        response = {"type": "readresponse", "data": [{name: 1.0} for name in names]}
+        driver = WebsocketsDriver()
+        for name in names:
+            driver.add_read(name)
+        driver._parse_plc_response(response) # pylint: disable=W0212
+
+        nested_bytes = self._retained_bytes(driver, response)
+        driver.compact_output = True
+        driver._parse_plc_response(response) # pylint: disable=W0212
+        compact_bytes = self._retained_bytes(driver, response)
+
+        print(f"{self.NUM_SNAPSHOTS} snapshots of {self.NUM_STRUCTS} structs: "
+              f"nested {nested_bytes / 1024:.0f} KiB, compact {compact_bytes / 1024:.0f} KiB, "
+              f"{nested_bytes / compact_bytes:.1f}x smaller")
@@ -0,0 +1,52 @@
+'''
+  File: **fake_connection.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+    A stand-in for the websocket connection of WebsocketsDriver, for tests that don't need the mock OMJSON server.
+'''
+
+import asyncio
+import json
+
+class FakeConnection():
+    """
+    Stands in for a websocket connection. Every read request is answered with a canned response, or from a dictionary
+    of PLC values. Sent messages are recorded, and responses are queued when the request is sent, so requests can be
+    pipelined like on a real connection.
+
+    Args:
+        response (dict): Optional, the response to every read request.
+        values (dict): Optional, the PLC values read requests are answered from, by variable name.
+
+    Attributes:
+        sent (list): The decoded messages sent, in order.
+        responses (list): The response frames not received yet. Tests can queue extra frames, e.g. write responses.
+
+    """
+
+    def __init__(self, response=None, values=None):
+        self.response = response
+        self.values = values
+        self.sent = []
+        self.responses = []
+        self.open = True
+
+    def respond(self, request : dict):
+        """Returns the response frame to a read request."""
+        if self.values is None:
+            return json.dumps(self.response)
+        return json.dumps({"type": "readresponse",
+                           "data": [{name: self.values[name]} for name in request["data"] if name in self.values]})
+
+    async def send(self, message):
+        request = json.loads(message)
+        self.sent.append(request)
+        if request["type"] == "read":
+            self.responses.append(self.respond(request))
+
+    async def recv(self):
+        await asyncio.sleep(0)
+        return self.responses.pop(0)
@@ -21,14 +21,34 @@ import asyncio
 import json
 
 from websockets.server import serve
+from websockets.exceptions import ConnectionClosedError
 
 # Populate this list of dictionaries with the variables you want to mock
 mock_plc_data = [{"TestProg:counter": 0}]
 
 INITIAL_VALUE_NEW_READ_VAR = 0
 
+# Simulated link faults. While silent, read requests are received but never answered and the connection stays open,
+# like a link that dropped without closing. A response delay (in seconds) makes every read response late.
+mock_faults = {"silent": False, "response_delay": 0}
+
+# The number of OMJSON close messages (empty messages) received, counted across connections
+mock_closes = [0]
+
 async def mock_omjson_plc(websocket):
+    try:
+        await _serve_messages(websocket)
+    except ConnectionClosedError:
+        pass # The client dropped the connection without closing it, e.g. after declaring the link dead
+
+
+async def _serve_messages(websocket):
     async for message in websocket:
+        if message == '':
+            # OMJSON clients send an empty message before closing the connection
+            mock_closes[0] += 1
+            continue
+
         response = {
                 "type": "readresponse",
                 "data": []
@@ -44,9 +64,14 @@ async def mock_omjson_plc(websocket):
                         response["data"].append(plc_var_dict)
                         # increment the value of the variable every time it's read, just so it changes
                         plc_var_dict[plc_var] = int(plc_var_dict[plc_var]) + 1
-                    else:
-                        print('not in dict')
-            
+                        break
+                else:
+                    print('not in dict')
+
+            if mock_faults["silent"]:
+                continue
+            if mock_faults["response_delay"]:
+                await asyncio.sleep(mock_faults["response_delay"])
             await websocket.send(json.dumps(response))
 
         elif message_dict['type'] == "write":
@@ -54,12 +79,14 @@ async def mock_omjson_plc(websocket):
                 for plc_var_dict in mock_plc_data:
                     if plc_write_var in plc_var_dict.keys():
                         plc_var_dict[plc_write_var] = message_dict["data"][plc_write_var]
-                    else:
-                        print('write failed, not in dict')
+                        break
+                else:
+                    print('write failed, not in dict')
 
 
-async def main():
-    async with serve(mock_omjson_plc, "localhost", 8000):
+async def main(host="localhost", port=8000):
+    async with serve(mock_omjson_plc, host, port):
         await asyncio.Future()
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
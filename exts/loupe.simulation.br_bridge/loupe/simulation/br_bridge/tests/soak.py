@@ -0,0 +1,274 @@
+'''
+  File: **soak.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+    Soak test harness.
+    Drives the bridge engine against the mock OMJSON server for a long time, with churn: reconnects, read list
+    changes and write bursts. Samples the resident memory, the number of objects by type and the read latency
+    percentiles, and fails when any of them grows faster than the configured slopes.
+
+    Run it from a shell, outside of Kit:
+        python -m loupe.simulation.br_bridge.tests.soak --duration 14400
+'''
+
+import argparse
+import asyncio
+import gc
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from websockets.server import serve
+
+from ..engine import BridgeEngine
+from .mock_server import mock_omjson_plc, mock_plc_data
+
+NUM_VARIABLES = 200
+TRACKED_TYPES = 10 # the most common object types of every sample are tracked from then on
+DEFAULT_MAX_RSS_SLOPE = 16 * 1024 * 1024 # bytes per hour
+DEFAULT_MAX_OBJECT_SLOPE = 10000 # objects of one type per hour
+DEFAULT_MAX_LATENCY_SLOPE = 0.005 # seconds of p95 read latency per hour
+WARMUP_FRACTION = 0.2 # samples in the first part of the run are ignored, while caches fill up
+
+def slope(xs, ys):
+    """Returns the least squares slope of ys over xs, or 0.0 if there are fewer than two distinct xs."""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+def percentile(values, q):
+    """Returns the q-th percentile (0..100) of values, by the nearest rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
+
+def rss_bytes():
+    """Returns the resident memory of this process, or None if it can't be measured on this platform."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil # pylint: disable=C0415
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+def object_counts():
+    """Returns the number of live objects tracked by the garbage collector, by type name."""
+    gc.collect()
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+class SoakHarness():
+    """
+    Runs the bridge engine against an in-process mock OMJSON server, with churn, and records drift.
+
+    Args:
+        duration (float): How long to run, in seconds.
+        sample_interval (float): Seconds between memory and latency samples.
+        reconnect_interval (float): Seconds between forced reconnects.
+        read_list_interval (float): Seconds between read list changes.
+        write_interval (float): Seconds between write bursts.
+        refresh_rate (int): The engine's refresh rate, in ms.
+        max_rss_slope (float): The largest allowed growth of the resident memory, in bytes per hour.
+        max_object_slope (float): The largest allowed growth of the objects of any tracked type, per hour.
+        max_latency_slope (float): The largest allowed growth of the p95 read latency, in seconds per hour.
+
+    Attributes:
+        samples (list): One dict per sample: {'time', 'rss', 'objects', 'p50', 'p95', 'p99', 'reads'}
+
+    """
+
+    def __init__(self, duration=3600.0, sample_interval=10.0, reconnect_interval=60.0, read_list_interval=5.0,
+                 write_interval=1.0, refresh_rate=10, max_rss_slope=DEFAULT_MAX_RSS_SLOPE,
+                 max_object_slope=DEFAULT_MAX_OBJECT_SLOPE, max_latency_slope=DEFAULT_MAX_LATENCY_SLOPE, seed=0):
+        self.duration = duration
+        self.sample_interval = sample_interval
+        self.reconnect_interval = reconnect_interval
+        self.read_list_interval = read_list_interval
+        self.write_interval = write_interval
+        self.refresh_rate = refresh_rate
+        self.max_rss_slope = max_rss_slope
+        self.max_object_slope = max_object_slope
+        self.max_latency_slope = max_latency_slope
+        self.samples = []
+        self._random = random.Random(seed)
+        self._names = [f"Soak:values[{i}]" for i in range(NUM_VARIABLES)]
+        self._latencies = []
+        self._latency_lock = threading.Lock()
+        self._tracked_types = {}
+
+    def _record_latency(self):
+        latency = self._engine.driver.last_round_trip_time
+        if latency is not None:
+            with self._latency_lock:
+                self._latencies.append(latency)
+
+    def _change_read_list(self):
+        self._engine.clear_read_list()
+        for name in self._random.sample(self._names, self._random.randint(1, len(self._names))):
+            self._engine.add_read(name)
+
+    def _write_burst(self):
+        names = self._random.sample(self._names, self._random.randint(1, 50))
+        self._engine.queue_writes({name: self._random.randint(0, 1000) for name in names},
+                                  priority=self._random.random() < 0.5)
+
+    def _sample(self, start):
+        with self._latency_lock:
+            latencies, self._latencies = self._latencies, []
+        counts = object_counts()
+        # A type that leaks becomes one of the most common later in the run, so the union of every sample's most
+        # common types is tracked, not just those of the first sample
+        self._tracked_types.update(dict.fromkeys(name for name, _ in counts.most_common(TRACKED_TYPES)))
+        self.samples.append({'time': time.time() - start,
+                             'rss': rss_bytes(),
+                             'objects': {name: counts.get(name, 0) for name in self._tracked_types},
+                             'p50': percentile(latencies, 50),
+                             'p95': percentile(latencies, 95),
+                             'p99': percentile(latencies, 99),
+                             'reads': len(latencies)})
+
+    def _serve_mock_plc(self, started):
+        async def serve_until_stopped():
+            self._server_loop = asyncio.get_running_loop()
+            self._server_stopped = asyncio.Event()
+            async with serve(mock_omjson_plc, "127.0.0.1", 0) as server:
+                self._server_port = server.sockets[0].getsockname()[1]
+                started.set()
+                await self._server_stopped.wait()
+        asyncio.run(serve_until_stopped())
+
+    def run(self):
+        """
+        Runs the soak test.
+
+        Returns:
+            list: The failures, as messages. Empty if nothing grew faster than allowed.
+        """
+        saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{name: 0} for name in self._names]
+        started = threading.Event()
+        server_thread = threading.Thread(target=self._serve_mock_plc, args=(started,), daemon=True)
+        server_thread.start()
+        started.wait()
+
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self._server_port,
+                    'REFRESH_RATE': self.refresh_rate,
+                    'ENABLE_COMMUNICATION': True}
+        self._engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        self._engine.on_statistics = self._record_latency
+        self._change_read_list()
+        self._engine.start()
+
+        start = now = time.time()
+        next_sample = start + self.sample_interval
+        next_reconnect = start + self.reconnect_interval
+        next_read_list = start + self.read_list_interval
+        next_write = start + self.write_interval
+        try:
+            while now - start < self.duration:
+                if now >= next_write:
+                    self._write_burst()
+                    next_write += self.write_interval
+                if now >= next_read_list:
+                    self._change_read_list()
+                    next_read_list += self.read_list_interval
+                if now >= next_reconnect:
+                    self._engine.reconnect()
+                    next_reconnect += self.reconnect_interval
+                if now >= next_sample:
+                    self._sample(start)
+                    next_sample += self.sample_interval
+                time.sleep(max(0.0, min(next_write, next_read_list, next_reconnect, next_sample) - time.time()))
+                now = time.time()
+        finally:
+            self._engine.stop()
+            self._server_loop.call_soon_threadsafe(self._server_stopped.set)
+            server_thread.join()
+            mock_plc_data[:] = saved_plc_data
+        return self.check()
+
+    def check(self):
+        """
+        Fits a line through the samples after the warm-up, and compares the slopes with the limits.
+
+        Returns:
+            list: The failures, as messages.
+        """
+        samples = self.samples[int(len(self.samples) * WARMUP_FRACTION):]
+        failures = []
+        if len(samples) < 3:
+            return ["Not enough samples to detect drift, run longer or sample more often"]
+        hours = [sample['time'] / 3600 for sample in samples]
+
+        if all(sample['rss'] is not None for sample in samples):
+            rss_slope = slope(hours, [sample['rss'] for sample in samples])
+            if rss_slope > self.max_rss_slope:
+                failures.append(f"Resident memory grows by {rss_slope / 1024 / 1024:.1f} MiB/h")
+        for name in dict.fromkeys(name for sample in samples for name in sample['objects']):
+            # Types are tracked from the sample they first became one of the most common in
+            tracked = [(hour, sample['objects'][name]) for hour, sample in zip(hours, samples) if name in sample['objects']]
+            if len(tracked) < 3:
+                continue
+            object_slope = slope([hour for hour, _ in tracked], [count for _, count in tracked])
+            if object_slope > self.max_object_slope:
+                failures.append(f"{name} objects grow by {object_slope:.0f}/h")
+        timed = [(hour, sample['p95']) for hour, sample in zip(hours, samples) if sample['p95'] is not None]
+        latency_slope = slope([hour for hour, _ in timed], [p95 for _, p95 in timed])
+        if latency_slope > self.max_latency_slope:
+            failures.append(f"p95 read latency grows by {latency_slope * 1000:.2f} ms/h")
+        return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak the bridge engine against the mock OMJSON server, and fail on memory or latency drift.")
+    parser.add_argument('--duration', type=float, default=3600, help="seconds to run")
+    parser.add_argument('--sample-interval', type=float, default=10, help="seconds between samples")
+    parser.add_argument('--reconnect-interval', type=float, default=60, help="seconds between forced reconnects")
+    parser.add_argument('--read-list-interval', type=float, default=5, help="seconds between read list changes")
+    parser.add_argument('--write-interval', type=float, default=1, help="seconds between write bursts")
+    parser.add_argument('--refresh-rate', type=int, default=10, help="cyclic read period in ms")
+    parser.add_argument('--max-rss-slope', type=float, default=DEFAULT_MAX_RSS_SLOPE / 1024 / 1024, help="allowed memory growth in MiB per hour")
+    parser.add_argument('--max-object-slope', type=float, default=DEFAULT_MAX_OBJECT_SLOPE, help="allowed growth of the objects of one type per hour")
+    parser.add_argument('--max-latency-slope', type=float, default=DEFAULT_MAX_LATENCY_SLOPE * 1000, help="allowed p95 latency growth in ms per hour")
+    parser.add_argument('--report', help="JSON file to write the samples to")
+    args = parser.parse_args(argv)
+
+    harness = SoakHarness(duration=args.duration,
+                          sample_interval=args.sample_interval,
+                          reconnect_interval=args.reconnect_interval,
+                          read_list_interval=args.read_list_interval,
+                          write_interval=args.write_interval,
+                          refresh_rate=args.refresh_rate,
+                          max_rss_slope=args.max_rss_slope * 1024 * 1024,
+                          max_object_slope=args.max_object_slope,
+                          max_latency_slope=args.max_latency_slope / 1000)
+    failures = harness.run()
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            json.dump({'samples': harness.samples, 'failures': failures}, file, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if not failures:
+        print(f"Passed, {len(harness.samples)} samples", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Test the adaptive refresh rate controller
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.adaptive_rate import AdaptiveRateController
+
+class TestAdaptiveRateController(omni.kit.test.AsyncTestCase):
+    """Tests for tuning the refresh period from measured cycle costs."""
+
+    # Run before every test
+    async def setUp(self):
+        self.controller = AdaptiveRateController(0.010, 1.0, target_utilization=0.5, adjust_interval=5, clock=lambda: 0.0)
+
+    def run_cycles(self, busy_time, n):
+        for _ in range(n):
+            self.controller.observe(busy_time, round_trip_time=busy_time * 0.8, parse_time=busy_time * 0.1)
+
+    def test_converges_to_target_utilization(self):
+        self.run_cycles(0.030, 200)
+        self.assertAlmostEqual(self.controller.period, 0.060, delta=0.006)
+        # Once settled, the period is left alone
+        count = len(self.controller.adjustments)
+        self.run_cycles(0.030, 50)
+        self.assertEqual(len(self.controller.adjustments), count)
+
+    def test_steps_are_limited(self):
+        adjustment = None
+        while adjustment is None:
+            adjustment = self.controller.observe(0.2)
+        self.assertEqual(adjustment['previous'], 0.010)
+        self.assertAlmostEqual(adjustment['period'], 0.0125)
+        self.assertEqual(adjustment['reason'], 'overrun')
+        self.assertEqual(adjustment['overruns'], 5)
+
+    def test_bounds(self):
+        self.run_cycles(2.0, 500)
+        self.assertEqual(self.controller.period, 1.0)
+        self.run_cycles(0.0001, 500)
+        self.assertEqual(self.controller.period, 0.010)
+        self.controller.set_bounds(0.050, 0.5)
+        self.assertEqual(self.controller.period, 0.050)
+
+    def test_speeds_up_when_costs_drop(self):
+        self.run_cycles(0.100, 200)
+        slow = self.controller.period
+        self.run_cycles(0.010, 200)
+        self.assertLess(self.controller.period, slow)
+        self.assertEqual(self.controller.adjustments[-1]['reason'], 'utilization below target')
+        self.assertIsNotNone(self.controller.adjustments[-1]['round_trip_time'])
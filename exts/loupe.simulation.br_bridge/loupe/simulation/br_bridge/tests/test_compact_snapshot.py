@@ -0,0 +1,83 @@
+"""
+Test interned paths and compact snapshots
+"""
+
+import json
+
+import omni.kit.test
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.compact_snapshot import Record, to_plain
+from loupe.simulation.br_bridge.nested_view import compile_path, insert_path
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+NAMES = [f"Program:axes[{i}].{member}" for i in range(3) for member in ("pos", "vel")] + ["Program:flag"]
+
+class TestCompactSnapshot(omni.kit.test.AsyncTestCase):
+    """Tests for interned paths and compact output."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = FakeConnection({"type": "readresponse",
+                                                  "data": [{name: i} for i, name in enumerate(NAMES)]})
+        for name in NAMES:
+            self.driver.add_read(name)
+
+    async def test_compile_path(self):
+        self.assertEqual(compile_path("Program:axis[3].pos"), ("Program", "axis", 3, "pos"))
+        self.assertEqual(compile_path("Program:m[1][2]"), ("Program", "m", 1, 2))
+        self.assertIs(compile_path("Program:axis[3].pos")[3], compile_path("Program:axis[4].pos")[3])
+        self.assertEqual(insert_path({"a": 1}, ("a", 2, "b"), 5), {"a": [None, None, {"b": 5}]})
+
+    async def test_nested_keys_are_shared(self):
+        """The nested data of every cycle uses the same key strings."""
+        first = await self.driver.read_data()
+        second = await self.driver.read_data()
+        first_key = next(iter(first["Program"]["axes"][0]))
+        second_key = next(iter(second["Program"]["axes"][1]))
+        self.assertIs(first_key, second_key)
+
+    async def test_compact_matches_nested(self):
+        nested = await self.driver.read_data()
+        self.driver.compact_output = True
+        compact = await self.driver.read_data()
+        self.assertIsInstance(compact, Record)
+        self.assertIsInstance(compact["Program"]["axes"][2], Record)
+        self.assertEqual(compact["Program"]["axes"][2]["vel"], 5)
+        self.assertEqual(to_plain(compact), nested)
+        self.assertEqual(compact, nested)
+        self.assertEqual(json.loads(json.dumps(compact, default=to_plain)), nested)
+
+    async def test_struct_types_share_key_tables(self):
+        self.driver.compact_output = True
+        compact = await self.driver.read_data()
+        axes = compact["Program"]["axes"]
+        self.assertIs(axes[0]._table, axes[1]._table)
+        self.assertEqual(self.driver._compact_builder.table_count, 3) # root, Program, axes elements
+        with self.assertRaises(KeyError):
+            axes[0]["missing"]
+
+    async def test_flat_output_wins(self):
+        self.driver.compact_output = True
+        self.driver.flat_output = True
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program:flag"], 6)
+
+    async def test_read_list_change(self):
+        self.driver.compact_output = True
+        await self.driver.read_data()
+        self.driver.clear_read_list()
+        self.driver.add_read("Program:flag")
+        data = await self.driver.read_data()
+        self.assertEqual(list(data["Program"]), ["flag"])
+
+    async def test_ranges(self):
+        self.driver.clear_read_list()
+        self.driver.add_read("Program:axes[0..1]")
+        self.driver._connection.response = {"type": "readresponse",
+                                            "data": [{"Program:axes[0]": 1}, {"Program:axes[1]": 2}]}
+        self.driver.compact_output = True
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["axes"], [1, 2])
@@ -0,0 +1,89 @@
+"""
+Test deadband filtering of numeric PLC values
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.deadband import DeadbandFilter
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+
+# pylint: disable=W0212
+
+class TestDeadbandFilter(omni.kit.test.AsyncTestCase):
+    """Tests for the deadband filter."""
+
+    # Run before every test
+    async def setUp(self):
+        self.filter = DeadbandFilter()
+
+    def test_no_deadband_passes_through(self):
+        """Variables without a deadband are always passed through."""
+        for value in [1.0, 1.0001, 1.0002]:
+            self.assertEqual(self.filter.filter("Program:real", value), value)
+
+    def test_absolute_deadband(self):
+        """Changes smaller than the absolute deadband publish the last published value."""
+        self.filter.set_deadband("Program:real", absolute=0.1)
+        self.assertEqual(self.filter.filter("Program:real", 1.0), 1.0)
+        self.assertEqual(self.filter.filter("Program:real", 1.05), 1.0)
+        self.assertEqual(self.filter.filter("Program:real", 1.09), 1.0)
+        self.assertEqual(self.filter.filter("Program:real", 1.2), 1.2)
+        self.assertEqual(self.filter.filter("Program:real", 1.15), 1.2)
+
+    def test_no_drift(self):
+        """Many small changes in one direction are published once they add up to the deadband."""
+        self.filter.set_deadband("Program:real", absolute=0.1)
+        published = [self.filter.filter("Program:real", value) for value in [1.0, 1.04, 1.08, 1.12, 1.16]]
+        self.assertEqual(published, [1.0, 1.0, 1.0, 1.12, 1.12])
+
+    def test_relative_deadband(self):
+        """Changes smaller than a fraction of the last published value are suppressed."""
+        self.filter.set_deadband("Program:lreal", relative=0.01)
+        self.assertEqual(self.filter.filter("Program:lreal", 1000.0), 1000.0)
+        self.assertEqual(self.filter.filter("Program:lreal", 1009.0), 1000.0)
+        self.assertEqual(self.filter.filter("Program:lreal", 1011.0), 1011.0)
+
+    def test_pattern_deadband(self):
+        """Patterns match array brackets literally and apply to all matching variables."""
+        self.filter.set_deadband("Program:axis[*].pos", absolute=1)
+        self.filter.filter("Program:axis[3].pos", 10.0)
+        self.assertEqual(self.filter.filter("Program:axis[3].pos", 10.5), 10.0)
+        self.filter.filter("Program:axisX.pos", 10.0)
+        self.assertEqual(self.filter.filter("Program:axisX.pos", 10.5), 10.5)
+
+    def test_exact_name_overrides_pattern(self):
+        """A deadband for an exact name takes precedence over a pattern."""
+        self.filter.set_deadband("Program:*", absolute=1)
+        self.filter.set_deadband("Program:real", absolute=0)
+        self.filter.filter("Program:real", 10.0)
+        self.assertEqual(self.filter.filter("Program:real", 10.5), 10.5)
+
+    def test_non_numeric_values_pass_through(self):
+        """Booleans and strings are never suppressed."""
+        self.filter.set_deadband("Program:*", absolute=10)
+        self.filter.filter("Program:bool", False)
+        self.assertEqual(self.filter.filter("Program:bool", True), True)
+        self.filter.filter("Program:string", "a")
+        self.assertEqual(self.filter.filter("Program:string", "b"), "b")
+
+
+class TestDriverChangeDetection(omni.kit.test.AsyncTestCase):
+    """Tests for change detection in the driver's response parsing."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+
+    def _response(self, value):
+        return {"type": "readresponse", "data": [{"Program:real": value}]}
+
+    def test_suppressed_change_is_not_a_change(self):
+        """A change inside the deadband does not flag the data as changed."""
+        self.driver.add_read("Program:real", deadband=0.5)
+        output = self.driver._parse_plc_response(self._response(1.0))
+        self.assertTrue(self.driver.data_changed)
+        output = self.driver._parse_plc_response(self._response(1.2))
+        self.assertFalse(self.driver.data_changed)
+        self.assertEqual(output, {"Program": {"real": 1.0}})
+        output = self.driver._parse_plc_response(self._response(2.0))
+        self.assertTrue(self.driver.data_changed)
+        self.assertEqual(output, {"Program": {"real": 2.0}})
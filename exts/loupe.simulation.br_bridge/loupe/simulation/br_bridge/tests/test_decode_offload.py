@@ -0,0 +1,141 @@
+"""
+Test decoding and parsing cyclic responses off the communication loop
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import omni.kit.test
+from websockets.server import serve
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver, decode_response, PLCDataParsingException
+from loupe.simulation.br_bridge.engine import BridgeEngine
+from loupe.simulation.br_bridge.tests.mock_server import mock_omjson_plc, mock_plc_data
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class CounterConnection(FakeConnection):
+    """Answers every read with the next value of a counter, or with a frame that isn't JSON when corrupt is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.counter = 0
+        self.corrupt = False
+
+    def respond(self, request):
+        self.counter += 1
+        if self.corrupt:
+            return "not json"
+        return json.dumps({"type": "readresponse", "data": [{"Program:counter": self.counter}]})
+
+
+class TestDecodeOffload(omni.kit.test.AsyncTestCase):
+    """Tests for the pipelined read of WebsocketsDriver."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = CounterConnection()
+        self.driver.add_read("Program:counter")
+
+    async def tearDown(self):
+        if self.driver.decode_executor is not None:
+            self.driver.decode_executor.shutdown()
+
+    async def test_decode_response(self):
+        self.assertEqual(decode_response('{"type": "readresponse", "data": []}')["data"], [])
+        with self.assertRaises(PLCDataParsingException):
+            decode_response('{"type": "readresponse"}')
+        with self.assertRaises(ValueError):
+            decode_response('not json')
+
+    async def test_results_in_order(self):
+        """Every read returns the previous frame, starting with the last data."""
+        self.driver.decode_executor = ThreadPoolExecutor(2)
+        data = await self.driver.read_data()
+        self.assertEqual(data, {})
+        self.assertFalse(self.driver.data_changed)
+        for expected in range(1, 6):
+            data = await self.driver.read_data()
+            self.assertEqual(data["Program"]["counter"], expected)
+            self.assertTrue(self.driver.data_changed)
+        self.assertEqual(self.driver._connection.counter, 6)
+
+    async def test_parsed_on_loop_thread(self):
+        """Only the decoding is offloaded, the driver state is updated on the event loop thread."""
+        self.driver.decode_executor = ThreadPoolExecutor(2)
+        parse_threads = []
+        parse = self.driver._parse_plc_response
+        def record_thread(response, timestamp=None):
+            parse_threads.append(threading.get_ident())
+            return parse(response, timestamp)
+        self.driver._parse_plc_response = record_thread
+        for _ in range(3):
+            await self.driver.read_data()
+        self.assertEqual(parse_threads, [threading.get_ident()] * 2)
+
+    async def test_process_pool(self):
+        self.driver.decode_executor = ProcessPoolExecutor(1)
+        await self.driver.read_data()
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["counter"], 1)
+
+    async def test_decode_error(self):
+        """A frame that can't be decoded is reported by the next read, which still sends its request."""
+        self.driver.decode_executor = ThreadPoolExecutor(1)
+        await self.driver.read_data()
+        self.driver._connection.corrupt = True
+        await self.driver.read_data()
+        self.driver._connection.corrupt = False
+        with self.assertRaises(ValueError):
+            await self.driver.read_data()
+        self.assertEqual(self.driver.metrics.snapshot()['br_bridge_parse_errors_total'], 1)
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["counter"], 3)
+
+    async def test_read_list_change_drops_pending_frame(self):
+        self.driver.decode_executor = ThreadPoolExecutor(1)
+        await self.driver.read_data()
+        self.driver.clear_read_list()
+        self.driver.add_read("Program:counter")
+        data = await self.driver.read_data()
+        self.assertFalse(self.driver.data_changed)
+        self.assertEqual(data, {})
+
+
+class TestEngineDecodeOffload(omni.kit.test.AsyncTestCase):
+    """Tests for the engine with offloaded decoding, with the mock OMJSON server as the PLC."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self.plc.sockets[0].getsockname()[1],
+                    'REFRESH_RATE': 10,
+                    'ENABLE_COMMUNICATION': True,
+                    'DECODE_OFFLOAD': 'thread',
+                    'DECODE_WORKERS': 2}
+        self.engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        self.published = []
+        self.engine.on_data = lambda data: self.published.append(data.get("TestProg", {}).get("counter"))
+
+    async def tearDown(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.engine.stop)
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def test_published_in_order(self):
+        self.engine.add_read("TestProg:counter")
+        self.engine.start()
+        deadline = asyncio.get_running_loop().time() + 5.0
+        while len([value for value in self.published if value is not None]) < 10:
+            self.assertLess(asyncio.get_running_loop().time(), deadline, "Timed out")
+            await asyncio.sleep(0.01)
+        self.assertIsNotNone(self.engine.driver.decode_executor)
+        values = [value for value in self.published if value is not None]
+        self.assertEqual(values, sorted(values))
@@ -0,0 +1,125 @@
+"""
+Test the Kit-independent bridge engine, with the mock OMJSON server as the PLC
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import uuid
+
+import omni.kit.test
+from websockets.server import serve
+from loupe.simulation.br_bridge.engine import BridgeEngine, read_list_file
+from loupe.simulation.br_bridge.shared_snapshot import SharedSnapshotReader
+from loupe.simulation.br_bridge.tests.mock_server import mock_omjson_plc, mock_plc_data, mock_closes
+
+class TestBridgeEngine(omni.kit.test.AsyncTestCase):
+    """Tests for the communication loop, running in its own thread."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}, {"TestProg:setpoint": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self.plc.sockets[0].getsockname()[1],
+                    'REFRESH_RATE': 10,
+                    'ENABLE_COMMUNICATION': True}
+        self.engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        self.published = []
+        self.statuses = []
+        self.engine.on_data = self.published.append
+        self.engine.on_status = lambda message, reset: self.statuses.append(message)
+
+    # Run after every test
+    async def tearDown(self):
+        # The engine disconnects from its own thread, the mock server needs this loop to answer
+        await asyncio.get_running_loop().run_in_executor(None, self.engine.stop)
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def _wait_for(self, condition, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            self.assertLess(asyncio.get_running_loop().time(), deadline, "Timed out")
+            await asyncio.sleep(0.01)
+
+    async def test_cyclic_read(self):
+        self.engine.add_read("TestProg:counter")
+        self.engine.start()
+        await self._wait_for(lambda: len(self.published) >= 3)
+        self.assertIn("Connected", self.statuses)
+        self.assertIn("counter", self.published[-1]["TestProg"])
+        self.assertGreaterEqual(self.engine.get_metrics()['br_bridge_cycles_total'], 3)
+
+    async def test_writes_and_requests(self):
+        self.engine.start()
+        self.engine.queue_write("TestProg:setpoint", 5)
+        await self._wait_for(lambda: mock_plc_data[1]["TestProg:setpoint"] == 5)
+        values = await asyncio.wrap_future(self.engine.submit_write({"TestProg:setpoint": 7}))
+        self.assertIn("TestProg:setpoint", values)
+        self.assertEqual(mock_plc_data[1]["TestProg:setpoint"], 8) # the mock server increments on read
+
+    async def test_stop_without_ticks(self):
+        """With an external tick source, the engine connects and stops nicely without any tick."""
+        self.engine.tick_source_name = 'external'
+        closes = mock_closes[0]
+        self.engine.start()
+        await self._wait_for(self.engine.driver.is_connected)
+        self.assertEqual(self.engine.get_metrics()['br_bridge_cycles_total'], 0)
+        await asyncio.get_running_loop().run_in_executor(None, self.engine.stop)
+        self.assertFalse(self.engine.driver.is_connected())
+        self.assertEqual(mock_closes[0], closes + 1, "The OMJSON close message was sent")
+
+    async def test_snapshot_export_of_range(self):
+        """Read ranges are exported whole, however long their JSON text is."""
+        mock_plc_data.extend({f"TestProg:buf[{i}]": 1000 + i} for i in range(100))
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self.plc.sockets[0].getsockname()[1],
+                    'REFRESH_RATE': 10,
+                    'ENABLE_COMMUNICATION': True,
+                    'SNAPSHOT_EXPORT_NAME': f"br_bridge_test_{uuid.uuid4().hex[:8]}"}
+        engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        engine.add_read("TestProg:buf[0..99]")
+        engine.start()
+        try:
+            reader = SharedSnapshotReader(settings['SNAPSHOT_EXPORT_NAME'])
+            await self._wait_for(lambda: "TestProg:buf[0..99]" in reader.read().values)
+            values = reader.read().values["TestProg:buf[0..99]"]
+            self.assertEqual(len(values), 100)
+            self.assertTrue(all(isinstance(value, int) and value > 1000 for value in values))
+            reader.close()
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, engine.stop)
+
+    async def test_setup_errors_are_reported(self):
+        """Settings that can't be applied are reported through on_status when the engine starts."""
+        with socket.socket() as busy:
+            busy.bind(("127.0.0.1", 0))
+            busy.listen()
+            settings = {'METRICS_PORT': busy.getsockname()[1],
+                        'SNAPSHOT_EXPORT_NAME': "/invalid/name",
+                        'TYPE_SCHEMA_FILE': os.path.join(tempfile.mkdtemp(), "missing.json")}
+            engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        statuses = []
+        engine.on_status = lambda message, reset: statuses.append(message)
+        engine.start()
+        await asyncio.get_running_loop().run_in_executor(None, engine.stop)
+        self.assertTrue(statuses[0].startswith(f"Type schema {settings['TYPE_SCHEMA_FILE']} could not be loaded"))
+        self.assertTrue(statuses[1].startswith(f"Metrics endpoint on port {settings['METRICS_PORT']} failed"))
+        self.assertTrue(statuses[2].startswith("Snapshot export /invalid/name failed"))
+        engine.load_type_schema(settings['TYPE_SCHEMA_FILE'])
+        self.assertEqual(statuses[-1], statuses[0], "Reported right away once started")
+
+    def test_read_list_file(self):
+        directory = tempfile.mkdtemp()
+        text_path = os.path.join(directory, "variables.txt")
+        with open(text_path, 'w', encoding='utf-8') as file:
+            file.write("# cyclic reads\nProgram:a\n\nProgram:b[0]\n")
+        json_path = os.path.join(directory, "variables.json")
+        with open(json_path, 'w', encoding='utf-8') as file:
+            file.write('["Program:c"]')
+        self.assertEqual(read_list_file(text_path), ["Program:a", "Program:b[0]"])
+        self.assertEqual(read_list_file(json_path), ["Program:c"])
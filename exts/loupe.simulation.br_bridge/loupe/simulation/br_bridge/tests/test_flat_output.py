@@ -0,0 +1,57 @@
+"""
+Test the flat output mode and precompiled accessors
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestFlatOutput(omni.kit.test.AsyncTestCase):
+    """Tests for flat output and accessors."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = FakeConnection({"type": "readresponse",
+                                                  "data": [{"Program:axis[3].pos": 1.5}, {"Program:flag": True}]})
+        self.driver.add_read("Program:axis[3].pos")
+        self.driver.add_read("Program:flag")
+
+    async def test_nested_by_default(self):
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["axis"][3]["pos"], 1.5)
+
+    async def test_flat_output(self):
+        """Flat output is keyed by the full variable name."""
+        self.driver.flat_output = True
+        data = await self.driver.read_data()
+        self.assertEqual(data, {"Program:axis[3].pos": 1.5, "Program:flag": True})
+
+    async def test_accessor(self):
+        """Accessors return the latest value, in both output modes."""
+        position = self.driver.accessor("Program:axis[3].pos")
+        self.assertIsNone(position())
+        await self.driver.read_data()
+        self.assertEqual(position(), 1.5)
+
+        self.driver.flat_output = True
+        self.driver._connection.response = {"type": "readresponse", "data": [{"Program:axis[3].pos": 2.5}]}
+        await self.driver.read_data()
+        self.assertEqual(position(), 2.5)
+
+    async def test_accessor_adds_read(self):
+        self.driver.accessor("Program:other")
+        self.assertIn("Program:other", self.driver._read_names)
+
+    async def test_accessor_survives_clear(self):
+        """Slots are kept when the read list is cleared, so accessors stay valid."""
+        flag = self.driver.accessor("Program:flag")
+        await self.driver.read_data()
+        self.assertTrue(flag())
+        self.driver.clear_read_list()
+        self.assertIsNone(flag())
+        self.driver.add_read("Program:flag")
+        await self.driver.read_data()
+        self.assertTrue(flag())
@@ -0,0 +1,126 @@
+"""
+Test the local fan-out gateway, with the mock OMJSON server as the PLC and websockets drivers as clients
+"""
+
+import asyncio
+
+import omni.kit.test
+from websockets.server import serve
+from loupe.simulation.br_bridge.gateway import Gateway, FIRST_READ_TIMEOUT
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver, PLCDataParsingException
+from loupe.simulation.br_bridge.tests.mock_server import mock_omjson_plc, mock_plc_data
+
+# pylint: disable=W0212
+
+NUM_CLIENTS = 20
+READS_PER_CLIENT = 10
+
+class TestGateway(omni.kit.test.AsyncTestCase):
+    """Tests for sharing one PLC connection between many clients."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}, {"TestProg:setpoint": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        self.gateway = Gateway("127.0.0.1", self.plc.sockets[0].getsockname()[1], port=0, refresh_rate=20)
+        await self.gateway.start()
+        await self._wait_for(lambda: self.gateway.connected)
+        self.clients = []
+
+    # Run after every test
+    async def tearDown(self):
+        # Close without the PLC disconnect handshake, which waits for the PLC
+        await asyncio.gather(*(client._connection.close() for client in self.clients))
+        await self.gateway.stop()
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def _wait_for(self, condition, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            self.assertLess(asyncio.get_running_loop().time(), deadline, "Timed out")
+            await asyncio.sleep(0.01)
+
+    async def _connect_client(self):
+        client = WebsocketsDriver("127.0.0.1", self.gateway.port)
+        self.assertTrue(await client.connect())
+        self.clients.append(client)
+        return client
+
+    async def test_fan_out(self):
+        """Many clients are served from a single upstream poll per refresh period."""
+        clients = [await self._connect_client() for _ in range(NUM_CLIENTS)]
+
+        async def poll(client):
+            for _ in range(READS_PER_CLIENT):
+                values = await client.read_variables(["TestProg:counter"])
+                self.assertIsInstance(values["TestProg:counter"], int)
+
+        await asyncio.gather(*(poll(client) for client in clients))
+        self.assertEqual(self.gateway.downstream_reads, NUM_CLIENTS * READS_PER_CLIENT)
+        self.assertLess(self.gateway.upstream_reads, self.gateway.downstream_reads / 4)
+
+    async def test_cyclic_read(self):
+        """The cyclic read of a websockets driver works through the gateway."""
+        client = await self._connect_client()
+        client.add_read("TestProg:counter")
+        data = await client.read_data()
+        self.assertIn("counter", data["TestProg"])
+
+    async def test_union_read_list(self):
+        """The upstream read list is the union of all clients' reads, and shrinks when clients leave."""
+        first = await self._connect_client()
+        second = await self._connect_client()
+        await first.read_variables(["TestProg:counter"])
+        await second.read_variables(["TestProg:setpoint"])
+        self.assertEqual(sorted(self.gateway.read_list()), ["TestProg:counter", "TestProg:setpoint"])
+
+        await second._connection.close()
+        await self._wait_for(lambda: self.gateway.clients == 1)
+        self.assertEqual(self.gateway.read_list(), ["TestProg:counter"])
+
+    async def test_first_read_waits_for_poll(self):
+        """A variable read for the first time is answered with a fresh value, not an empty response."""
+        client = await self._connect_client()
+        await client.read_variables(["TestProg:counter"])
+        values = await client.read_variables(["TestProg:setpoint"])
+        self.assertIn("TestProg:setpoint", values)
+
+    async def test_parse_error_fails_first_read(self):
+        """A first read that breaks the upstream poll is answered right away, reported, and dropped from the poll."""
+        statuses = []
+        self.gateway.on_status = lambda message, reset: statuses.append(message)
+        read_variables = self.gateway.upstream.read_variables
+        async def fail_on_bad_variable(names):
+            if "TestProg:bad" in names:
+                raise PLCDataParsingException("bad variable")
+            return await read_variables(names)
+        self.gateway.upstream.read_variables = fail_on_bad_variable
+
+        client = await self._connect_client()
+        start = asyncio.get_running_loop().time()
+        self.assertEqual(await client.read_variables(["TestProg:bad"]), {})
+        self.assertLess(asyncio.get_running_loop().time() - start, FIRST_READ_TIMEOUT / 2)
+        self.assertEqual(statuses, ["PLC read data parsing error: bad variable"])
+        self.assertIn("TestProg:counter", await client.read_variables(["TestProg:counter"]))
+        self.assertEqual(self.gateway.read_list(), ["TestProg:counter"])
+
+    async def test_writes_are_forwarded(self):
+        """Writes from every client reach the PLC, in order."""
+        first = await self._connect_client()
+        second = await self._connect_client()
+        await first.write_data({"TestProg:setpoint": 1})
+        await second.write_data({"TestProg:setpoint": 2})
+        await self._wait_for(lambda: self.gateway.upstream_writes == 2)
+        await self._wait_for(lambda: mock_plc_data[1]["TestProg:setpoint"] == 2)
+
+    async def test_upstream_loss_disconnects_clients(self):
+        """Clients are disconnected when the PLC connection is lost."""
+        client = await self._connect_client()
+        await client.read_variables(["TestProg:counter"])
+        self.plc.close()
+        await self.plc.wait_closed()
+        await self._wait_for(lambda: not self.gateway.connected)
+        await self._wait_for(lambda: not client.is_connected())
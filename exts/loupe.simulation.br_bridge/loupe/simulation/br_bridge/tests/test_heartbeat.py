@@ -0,0 +1,140 @@
+"""
+Test response deadlines and dead link detection
+"""
+
+import asyncio
+
+import omni.kit.test
+from websockets.server import serve
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver, ResponseTimeoutException, LinkDeadException
+from loupe.simulation.br_bridge.engine import BridgeEngine
+from loupe.simulation.br_bridge.tests.mock_server import mock_omjson_plc, mock_plc_data, mock_faults
+
+# pylint: disable=W0212
+
+class TestResponseDeadline(omni.kit.test.AsyncTestCase):
+    """Tests for the response deadline of WebsocketsDriver, with the mock OMJSON server as the PLC."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}, {"TestProg:other": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=self.plc.sockets[0].getsockname()[1])
+        self.driver.response_timeout = 0.1
+        self.driver.max_missed_responses = 3
+        await self.driver.connect()
+
+    async def tearDown(self):
+        mock_faults.update(silent=False, response_delay=0)
+        self.driver._reset_in_flight()
+        if self.driver.is_connected():
+            await self.driver._connection.close()
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def test_silent_drop(self):
+        """The link is declared dead after max_missed_responses timeouts, and the connection is dropped."""
+        self.driver.add_read("TestProg:counter")
+        await self.driver.read_data()
+        mock_faults["silent"] = True
+        for _ in range(2):
+            with self.assertRaises(ResponseTimeoutException) as context:
+                await self.driver.read_data()
+            self.assertNotIsInstance(context.exception, LinkDeadException)
+        with self.assertRaises(LinkDeadException):
+            await self.driver.read_data()
+        await asyncio.sleep(0.1)
+        self.assertFalse(self.driver.is_connected())
+        metrics = self.driver.metrics.snapshot()
+        self.assertEqual(metrics['br_bridge_response_timeouts_total'], 3)
+        self.assertEqual(metrics['br_bridge_dead_links_total'], 1)
+
+        mock_faults["silent"] = False
+        await self.driver.connect()
+        data = await self.driver.read_data()
+        self.assertIn("counter", data["TestProg"])
+
+    async def test_late_response_keeps_order(self):
+        """A late response answers its own request: the next read waits for it instead of sending another request."""
+        self.driver.add_read("TestProg:counter")
+        mock_faults["response_delay"] = 0.15
+        with self.assertRaises(ResponseTimeoutException):
+            await self.driver.read_data()
+        mock_faults["response_delay"] = 0
+        # The mock server answers with the value after its increment
+        data = await self.driver.read_data()
+        self.assertEqual(data["TestProg"]["counter"], 1)
+        data = await self.driver.read_data()
+        self.assertEqual(data["TestProg"]["counter"], 2)
+        self.assertEqual(self.driver._missed_responses, 0)
+
+    async def test_late_response_of_other_request(self):
+        """A one-shot read receives the late cyclic response first, and only gets its own response."""
+        self.driver.add_read("TestProg:counter")
+        mock_faults["response_delay"] = 0.15
+        with self.assertRaises(ResponseTimeoutException):
+            await self.driver.read_data()
+        mock_faults["response_delay"] = 0
+        values = await self.driver.read_variables(["TestProg:other"])
+        self.assertEqual(values, {"TestProg:other": 1})
+
+    async def test_heartbeat_with_empty_read_list(self):
+        self.driver.heartbeat_interval = 0
+        await self.driver.read_data()
+        self.assertEqual(self.driver.metrics.snapshot()['br_bridge_messages_received_total'], 1)
+        mock_faults["silent"] = True
+        with self.assertRaises(ResponseTimeoutException):
+            await self.driver.read_data()
+
+    async def test_no_deadline(self):
+        """Without a response timeout, an empty read list sends nothing."""
+        self.driver.response_timeout = None
+        self.driver.heartbeat_interval = 0
+        await self.driver.read_data()
+        self.assertEqual(self.driver.metrics.snapshot()['br_bridge_messages_sent_total'], 0)
+
+
+class TestEngineHeartbeat(omni.kit.test.AsyncTestCase):
+    """Tests for reconnecting the engine after a silent drop."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self.plc.sockets[0].getsockname()[1],
+                    'REFRESH_RATE': 10,
+                    'ENABLE_COMMUNICATION': True,
+                    'RESPONSE_TIMEOUT': 50,
+                    'MAX_MISSED_RESPONSES': 2}
+        self.engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        self.statuses = []
+        self.engine.on_status = lambda message, reset: self.statuses.append(message)
+
+    async def tearDown(self):
+        mock_faults.update(silent=False, response_delay=0)
+        await asyncio.get_running_loop().run_in_executor(None, self.engine.stop)
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def wait_for(self, condition, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            self.assertLess(asyncio.get_running_loop().time(), deadline, "Timed out")
+            await asyncio.sleep(0.01)
+
+    async def test_reconnects_after_silent_drop(self):
+        self.engine.add_read("TestProg:counter")
+        self.engine.start()
+        await self.wait_for(lambda: "Connected" in self.statuses)
+        mock_faults["silent"] = True
+        await self.wait_for(lambda: any(status.startswith("Link down") for status in self.statuses))
+        mock_faults["silent"] = False
+        await self.wait_for(lambda: self.engine.get_metrics()['br_bridge_reconnects_total'] >= 1)
+        received = self.engine.get_metrics()['br_bridge_messages_received_total']
+        await self.wait_for(lambda: self.engine.get_metrics()['br_bridge_messages_received_total'] > received + 2)
+        self.assertGreaterEqual(self.engine.get_metrics()['br_bridge_dead_links_total'], 1)
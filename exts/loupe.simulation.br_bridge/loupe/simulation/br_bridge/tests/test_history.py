@@ -0,0 +1,82 @@
+"""
+Test the bounded history of numeric PLC values
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.history import HistoryStore, HistoryBudgetException, RingBuffer, BYTES_PER_SAMPLE
+
+class TestRingBuffer(omni.kit.test.AsyncTestCase):
+    """Tests for the ring buffer."""
+
+    # Run before every test
+    async def setUp(self):
+        self.buffer = RingBuffer(4)
+
+    def test_empty(self):
+        """An empty buffer returns empty arrays."""
+        timestamps, values = self.buffer.last(3)
+        self.assertEqual(list(timestamps), [])
+        self.assertEqual(list(values), [])
+
+    def test_last_before_wrap(self):
+        """The newest samples are returned oldest first."""
+        for i in range(3):
+            self.buffer.append(float(i), i * 10.0)
+        timestamps, values = self.buffer.last(2)
+        self.assertEqual(list(timestamps), [1.0, 2.0])
+        self.assertEqual(list(values), [10.0, 20.0])
+
+    def test_last_after_wrap(self):
+        """Old samples are overwritten once the buffer is full."""
+        for i in range(6):
+            self.buffer.append(float(i), i * 10.0)
+        self.assertEqual(len(self.buffer), 4)
+        timestamps, values = self.buffer.last(10)
+        self.assertEqual(list(timestamps), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(list(values), [20.0, 30.0, 40.0, 50.0])
+        self.assertEqual(timestamps.typecode, 'd')
+
+    def test_range(self):
+        """Range queries are inclusive on both ends, across the wrap point."""
+        for i in range(6):
+            self.buffer.append(float(i), i * 10.0)
+        timestamps, values = self.buffer.range(3.0, 5.0)
+        self.assertEqual(list(timestamps), [3.0, 4.0, 5.0])
+        self.assertEqual(list(values), [30.0, 40.0, 50.0])
+        timestamps, _ = self.buffer.range(2.5, 3.5)
+        self.assertEqual(list(timestamps), [3.0])
+        timestamps, _ = self.buffer.range(6.0, 7.0)
+        self.assertEqual(list(timestamps), [])
+
+
+class TestHistoryStore(omni.kit.test.AsyncTestCase):
+    """Tests for the history store."""
+
+    # Run before every test
+    async def setUp(self):
+        self.history = HistoryStore(memory_budget=100 * BYTES_PER_SAMPLE)
+
+    def test_only_tracked_variables_are_recorded(self):
+        """Variables that aren't tracked are not recorded."""
+        self.history.track("Program:real", 10)
+        self.history.add("Program:real", 1.0, 1.5)
+        self.history.add("Program:other", 1.0, 1.5)
+        self.assertEqual(list(self.history.last("Program:real", 10)[1]), [1.5])
+        self.assertEqual(list(self.history.last("Program:other", 10)[1]), [])
+
+    def test_booleans_and_strings(self):
+        """Booleans are recorded as numbers, strings are ignored."""
+        self.history.track("Program:bool", 10)
+        self.history.add("Program:bool", 1.0, True)
+        self.history.add("Program:bool", 2.0, "a")
+        self.assertEqual(list(self.history.last("Program:bool", 10)[1]), [1.0])
+
+    def test_memory_budget(self):
+        """Tracking more samples than the budget allows raises an exception."""
+        self.history.track("Program:a", 60)
+        with self.assertRaises(HistoryBudgetException):
+            self.history.track("Program:b", 60)
+        self.history.track("Program:a", 100)
+        self.assertEqual(self.history.memory_used, 100 * BYTES_PER_SAMPLE)
+        self.history.untrack("Program:a")
+        self.history.track("Program:b", 60)
@@ -0,0 +1,115 @@
+"""
+Test the metrics registry, its Prometheus export and the driver's counters
+"""
+
+import urllib.request
+
+import omni.kit.test
+from loupe.simulation.br_bridge.metrics import MetricsRegistry, MetricsServer, MetricsException
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.process_driver import ProcessWebsocketsDriver, FORWARDED_METRICS, _metric_state
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestMetricsRegistry(omni.kit.test.AsyncTestCase):
+    """Tests for counters, gauges and histograms."""
+
+    # Run before every test
+    async def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counters_and_gauges(self):
+        cycles = self.registry.counter('cycles_total', "Cycles")
+        cycles.inc()
+        cycles.inc(2)
+        self.registry.gauge('size').set(5)
+        self.assertIs(self.registry.counter('cycles_total'), cycles)
+        self.assertEqual(self.registry.snapshot(), {'cycles_total': 3, 'size': 5})
+        with self.assertRaises(MetricsException):
+            self.registry.gauge('cycles_total')
+
+    def test_histogram(self):
+        latency = self.registry.histogram('latency_seconds', buckets=(0.01, 0.1))
+        for value in (0.005, 0.05, 0.05, 1.0):
+            latency.observe(value)
+        snapshot = self.registry.snapshot()['latency_seconds']
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['buckets'], {0.01: 1, 0.1: 3, float('inf'): 4})
+        self.assertEqual(latency.quantile(0.5), 0.1)
+        self.assertEqual(latency.quantile(1.0), float('inf'))
+
+    def test_prometheus_text(self):
+        self.registry.counter('cycles_total', "Cycles").inc()
+        self.registry.histogram('latency_seconds', buckets=(0.01,)).observe(0.5)
+        text = self.registry.to_prometheus()
+        self.assertIn("# HELP cycles_total Cycles\n# TYPE cycles_total counter\ncycles_total 1\n", text)
+        self.assertIn('latency_seconds_bucket{le="0.01"} 0\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn("latency_seconds_count 1\n", text)
+
+    def test_server(self):
+        self.registry.counter('cycles_total').inc()
+        server = MetricsServer(self.registry, port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+                self.assertIn("cycles_total 1", response.read().decode())
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+        finally:
+            server.stop()
+
+
+class TestDriverMetrics(omni.kit.test.AsyncTestCase):
+    """Tests for the metrics counted by the websockets driver."""
+
+    async def test_reads_and_writes_are_counted(self):
+        driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        driver._connection = FakeConnection({"type": "readresponse", "data": [{"Program:counter": 1}]})
+        driver.add_read("Program:counter")
+        await driver.read_data()
+        await driver.write_data({"Program:a": 1, "Program:b": 2})
+        metrics = driver.metrics.snapshot()
+        self.assertEqual(metrics['br_bridge_read_list_size'], 1)
+        self.assertEqual(metrics['br_bridge_messages_sent_total'], 2)
+        self.assertEqual(metrics['br_bridge_messages_received_total'], 1)
+        self.assertGreater(metrics['br_bridge_bytes_received_total'], 0)
+        self.assertEqual(metrics['br_bridge_writes_total'], 1)
+        self.assertEqual(metrics['br_bridge_variables_written_total'], 2)
+        self.assertEqual(metrics['br_bridge_read_latency_seconds']['count'], 1)
+
+    async def test_parse_errors_are_counted(self):
+        driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        driver._connection = FakeConnection({"type": "readresponse"})
+        driver.add_read("Program:counter")
+        with self.assertRaises(Exception):
+            await driver.read_data()
+        self.assertEqual(driver.metrics['br_bridge_parse_errors_total'].value, 1)
+
+    async def test_worker_metrics_are_forwarded(self):
+        """The out-of-process driver adds what its worker counted since the last report."""
+        worker = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        worker._connection = FakeConnection({"type": "readresponse", "data": [{"Program:counter": 1}]})
+        worker.add_read("Program:counter")
+        driver = ProcessWebsocketsDriver(ip='127.0.0.1', port=8000)
+
+        def report():
+            driver._handle_report(('metrics', {name: _metric_state(worker.metrics[name]) for name in FORWARDED_METRICS}))
+
+        await worker.read_data()
+        report()
+        await worker.read_data()
+        await worker.write_data({"Program:a": 1})
+        report()
+        metrics = driver.metrics.snapshot()
+        self.assertEqual(metrics['br_bridge_messages_sent_total'], 3)
+        self.assertEqual(metrics['br_bridge_bytes_received_total'], worker.metrics['br_bridge_bytes_received_total'].value)
+        self.assertEqual(metrics['br_bridge_read_latency_seconds'], worker.metrics['br_bridge_read_latency_seconds'].snapshot())
+        self.assertEqual(metrics['br_bridge_writes_total'], 1)
+
+        driver.metrics.reset()
+        await worker.read_data()
+        report()
+        metrics = driver.metrics.snapshot()
+        self.assertEqual(metrics['br_bridge_messages_received_total'], 1)
+        self.assertEqual(metrics['br_bridge_read_latency_seconds']['count'], 1)
@@ -0,0 +1,80 @@
+"""
+Test the lazy nested view over flat slot values
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.nested_view import split_path, build_shape, NestedView
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+VALUES = {
+    "Program:counter": 1,
+    "Program:my_struct.my_var": 2.5,
+    "Program:my_struct.text": "hello",
+    "Program:axes[0].pos": 10.0,
+    "Program:axes[2].pos": 12.0,
+    "Program:axes[2].enabled": True,
+    "Program:flags[1]": False,
+    "Other:value": 7,
+}
+
+class TestSplitPath(omni.kit.test.AsyncTestCase):
+    """Tests for splitting variable names into keys."""
+
+    def test_split_path(self):
+        self.assertEqual(split_path("Program:axis[3].pos"), ["Program", "axis", 3, "pos"])
+        self.assertEqual(split_path("Program:var"), ["Program", "var"])
+        self.assertEqual(split_path("Program:grid[1][2]"), ["Program", "grid", 1, 2])
+
+
+class TestNestedView(omni.kit.test.AsyncTestCase):
+    """Tests for the view, compared against the nested data built by the driver."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = FakeConnection({"type": "readresponse",
+                                                  "data": [{name: value} for name, value in VALUES.items()]})
+        for name in VALUES:
+            self.driver.add_read(name)
+
+    async def test_same_shape_as_nested_data(self):
+        data = await self.driver.read_data()
+        view = self.driver.data_view()
+        self.assertEqual(view.materialize(), data)
+        self.assertEqual(view, data)
+        self.assertEqual(view["Program"]["axes"][2]["pos"], 12.0)
+        self.assertIsNone(view["Program"]["axes"][1])
+        self.assertEqual(len(view["Program"]["axes"]), 3)
+        self.assertEqual(view["Program"]["flags"][-1], False)
+        self.assertEqual(sorted(view["Program"]["my_struct"]), ["my_var", "text"])
+
+    async def test_sub_views_are_cached_until_next_read(self):
+        await self.driver.read_data()
+        view = self.driver.data_view()
+        self.assertIs(self.driver.data_view(), view)
+        self.assertIs(view["Program"]["my_struct"], view["Program"]["my_struct"])
+        self.assertEqual(view._views.keys(), {"Program"})
+
+        self.driver._connection.response = {"type": "readresponse", "data": [{"Program:counter": 2}]}
+        await self.driver.read_data()
+        new_view = self.driver.data_view()
+        self.assertIsNot(new_view, view)
+        self.assertEqual(new_view["Program"]["counter"], 2)
+        # Views of earlier cycles keep their values
+        self.assertEqual(view["Program"]["counter"], 1)
+
+    async def test_read_list_changes(self):
+        await self.driver.read_data()
+        self.driver.add_read("Program:new")
+        self.assertIn("new", self.driver.data_view()["Program"])
+        self.driver.clear_read_list()
+        self.assertEqual(len(self.driver.data_view()), 0)
+
+    def test_missing_keys(self):
+        view = NestedView(build_shape({"Program:a": 0}), [1])
+        with self.assertRaises(KeyError):
+            view["Program"]["b"]
+        self.assertEqual(view.get("Other"), None)
@@ -0,0 +1,52 @@
+"""
+Test one-shot reads, which back the awaitable Manager.read() and Manager.write()
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver, PLCDataParsingException
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestReadVariables(omni.kit.test.AsyncTestCase):
+    """Tests for one-shot reads."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+
+    async def test_read_variables(self):
+        """Requested variables are returned as a flat dictionary."""
+        self.driver._connection = FakeConnection({"type": "readresponse", "data": [{"Program:a": 1}, {"Program:s.b": "x"}]})
+        values = await self.driver.read_variables(["Program:a", "Program:s.b"])
+        self.assertEqual(values, {"Program:a": 1, "Program:s.b": "x"})
+        self.assertEqual(self.driver._connection.sent, [{"type": "read", "data": ["Program:a", "Program:s.b"]}])
+
+    async def test_read_variables_does_not_publish(self):
+        """One-shot reads don't touch the cyclic read list or the published values."""
+        self.driver._connection = FakeConnection({"type": "readresponse", "data": [{"Program:a": 1}]})
+        await self.driver.read_variables(["Program:a"])
+        self.assertEqual(self.driver._read_names, [])
+        self.assertEqual(self.driver.samples.get_samples("Program:a"), [])
+
+    async def test_read_nothing(self):
+        """Reading no variables doesn't send a request."""
+        self.driver._connection = FakeConnection({"type": "readresponse", "data": []})
+        self.assertEqual(await self.driver.read_variables([]), {})
+        self.assertEqual(self.driver._connection.sent, [])
+
+    async def test_unexpected_response(self):
+        """A response that isn't a read response raises a parsing exception."""
+        self.driver._connection = FakeConnection({"type": "error", "data": []})
+        with self.assertRaises(PLCDataParsingException):
+            await self.driver.read_variables(["Program:a"])
+
+    async def test_write_responses_are_skipped(self):
+        """Write responses received while waiting for the read response, e.g. after a confirmed write, are skipped."""
+        self.driver._connection = FakeConnection({"type": "readresponse", "data": [{"Program:a": 1}]})
+        self.driver._connection.responses.append('{"type": "writeresponse", "data": []}')
+        self.assertEqual(await self.driver.read_variables(["Program:a"]), {"Program:a": 1})
+        self.driver.response_timeout = 1.0
+        self.driver._connection.responses.append('{"type": "writeresponse", "data": []}')
+        self.assertEqual(await self.driver.read_variables(["Program:a"]), {"Program:a": 1})
+        self.assertEqual(self.driver._connection.responses, [])
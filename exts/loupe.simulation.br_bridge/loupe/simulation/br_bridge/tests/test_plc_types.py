@@ -0,0 +1,118 @@
+"""
+Test PLC type converters, which normalize read values and validate written values
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.plc_types import TypeSchema, PLCTypeException, compile_type
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestTypeConverters(omni.kit.test.AsyncTestCase):
+    """Tests for the converters of single types."""
+
+    def test_bool(self):
+        converter = compile_type("BOOL")
+        self.assertIs(converter.decode(1), True)
+        self.assertIs(converter.encode("true"), True)
+        self.assertIs(converter.encode(0), False)
+        with self.assertRaises(PLCTypeException):
+            converter.encode("maybe")
+
+    def test_integers(self):
+        converter = compile_type("INT")
+        self.assertEqual(converter.decode(3.0), 3)
+        self.assertEqual(converter.encode("42"), 42)
+        self.assertEqual(converter.encode(7.0), 7)
+        with self.assertRaises(PLCTypeException):
+            converter.encode(1.5)
+        with self.assertRaises(PLCTypeException):
+            converter.encode(40000)
+        with self.assertRaises(PLCTypeException):
+            compile_type("USINT").encode(-1)
+        self.assertEqual(compile_type("dint").encode(-2**31), -2**31)
+
+    def test_reals(self):
+        converter = compile_type("REAL")
+        self.assertIsInstance(converter.decode(1), float)
+        self.assertEqual(converter.encode("2.5"), 2.5)
+        with self.assertRaises(PLCTypeException):
+            converter.encode(1e39)
+        with self.assertRaises(PLCTypeException):
+            converter.encode(float('nan'))
+        self.assertEqual(compile_type("LREAL").encode(1e39), 1e39)
+
+    def test_strings(self):
+        converter = compile_type("STRING[5]")
+        self.assertEqual(converter.decode(12), "12")
+        self.assertEqual(converter.encode(12), "12")
+        with self.assertRaises(PLCTypeException):
+            converter.encode("too long")
+        self.assertEqual(compile_type("STRING").length, 80)
+
+    def test_arrays(self):
+        converter = compile_type("ARRAY[0..2] OF REAL")
+        self.assertEqual(converter.decode([1, 2, 3]), [1.0, 2.0, 3.0])
+        self.assertEqual(converter.encode("[1, 2, 3]"), [1.0, 2.0, 3.0])
+        with self.assertRaises(PLCTypeException):
+            converter.encode([1, 2])
+
+    def test_unsupported_type(self):
+        with self.assertRaises(PLCTypeException):
+            compile_type("MyStruct")
+
+
+class TestTypeSchema(omni.kit.test.AsyncTestCase):
+    """Tests for per-variable types."""
+
+    # Run before every test
+    async def setUp(self):
+        self.schema = TypeSchema()
+        self.schema.set_types({"Program:speed": "REAL", "Program:counts": "ARRAY[0..9] OF DINT"})
+
+    def test_untyped_variables_pass_through(self):
+        self.assertEqual(self.schema.encode("Program:other", "text"), "text")
+        self.assertEqual(self.schema.decode("Program:other", 1), 1)
+
+    def test_array_elements(self):
+        """Elements of a typed array use the element type."""
+        self.assertEqual(self.schema.encode("Program:counts[3]", "5"), 5)
+        self.assertIsInstance(self.schema.decode("Program:counts[3]", 5.0), int)
+
+    def test_encode_all(self):
+        """Invalid values are all reported, and nothing is returned."""
+        self.assertEqual(self.schema.encode_all({"Program:speed": "1.5"}), {"Program:speed": 1.5})
+        with self.assertRaises(PLCTypeException) as context:
+            self.schema.encode_all({"Program:speed": "fast", "Program:counts[0]": 0.5, "Program:other": 1})
+        self.assertIn("Program:speed", str(context.exception))
+        self.assertIn("Program:counts[0]", str(context.exception))
+
+
+class TestTypedDriver(omni.kit.test.AsyncTestCase):
+    """Tests for typed reads and writes in the websockets driver."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver.types.set_types({"Program:speed": "REAL", "Program:count": "DINT"})
+
+    async def test_reads_are_normalized(self):
+        self.driver._connection = FakeConnection({"type": "readresponse", "data": [{"Program:speed": 1}, {"Program:count": 2}]})
+        self.driver.add_read("Program:speed")
+        self.driver.add_read("Program:count")
+        data = await self.driver.read_data()
+        self.assertIsInstance(data["Program"]["speed"], float)
+        values = await self.driver.read_variables(["Program:speed"])
+        self.assertIsInstance(values["Program:speed"], float)
+
+    async def test_writes_are_coerced(self):
+        self.driver._connection = FakeConnection({})
+        await self.driver.write_data({"Program:speed": "2.5", "Program:count": "3"})
+        self.assertEqual(self.driver._connection.sent, [{"type": "write", "data": {"Program:speed": 2.5, "Program:count": 3}}])
+
+    async def test_invalid_writes_are_not_sent(self):
+        self.driver._connection = FakeConnection({})
+        with self.assertRaises(PLCTypeException):
+            await self.driver.write_data({"Program:speed": 2.5, "Program:count": "three"})
+        self.assertEqual(self.driver._connection.sent, [])
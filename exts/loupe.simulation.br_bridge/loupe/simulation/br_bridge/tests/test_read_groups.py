@@ -0,0 +1,118 @@
+"""
+Test read groups, which are read when a trigger fires instead of every cycle
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.read_groups import ReadGroup, MISSING
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestReadGroup(omni.kit.test.AsyncTestCase):
+    """Tests for the trigger logic of ReadGroup."""
+
+    async def test_on_change(self):
+        group = ReadGroup("recipe", ["Program:recipe"], "Program:loaded")
+        self.assertFalse(group.update(MISSING, now=0))
+        self.assertTrue(group.update(False, now=0), "First value")
+        group.read_completed(now=0)
+        self.assertFalse(group.update(False, now=1))
+        self.assertTrue(group.update(True, now=2))
+        self.assertTrue(group.update(True, now=3), "Pending until read")
+        group.read_completed(now=3)
+        self.assertTrue(group.update(False, now=4))
+
+    async def test_predicate(self):
+        group = ReadGroup("recipe", ["Program:recipe"], "Program:state", predicate=lambda value: value == 3)
+        self.assertFalse(group.update(1, now=0))
+        self.assertTrue(group.update(3, now=1))
+        group.read_completed(now=1)
+        self.assertFalse(group.update(3, now=2), "Only when the predicate becomes true")
+        self.assertFalse(group.update(2, now=3))
+        self.assertTrue(group.update(3, now=4))
+
+    async def test_fallback_period(self):
+        group = ReadGroup("recipe", ["Program:recipe"], "Program:state", predicate=bool, fallback_period=10)
+        self.assertTrue(group.update(0, now=0), "Never read")
+        group.read_completed(now=0)
+        self.assertFalse(group.update(0, now=9))
+        self.assertTrue(group.update(0, now=10))
+
+
+class TestDriverReadGroups(omni.kit.test.AsyncTestCase):
+    """Tests for read groups in WebsocketsDriver."""
+
+    # Run before every test
+    async def setUp(self):
+        self.values = {"Program:loaded": False, "Program:counter": 1,
+                       "Program:recipe.speed": 2.5, "Program:recipe.name": "a",
+                       "Program:steps[0]": 10, "Program:steps[1]": 11}
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = FakeConnection(values=self.values)
+        self.driver.add_read("Program:counter")
+        self.driver.add_read_group("recipe", ["Program:recipe.speed", "Program:recipe.name", "Program:steps[0..1]"],
+                                   trigger="Program:loaded")
+
+    async def test_read_when_triggered(self):
+        requests = self.driver._connection.sent
+        data = await self.driver.read_data()
+        self.assertEqual(requests[0]["data"], ["Program:counter", "Program:loaded"])
+        self.assertEqual(len(requests), 2, "The first value of the trigger fires")
+        self.assertEqual(data["Program"]["recipe"], {"speed": 2.5, "name": "a"})
+        self.assertEqual(data["Program"]["steps"], [10, 11])
+
+        self.values["Program:recipe.speed"] = 3.0
+        data = await self.driver.read_data()
+        self.assertEqual(len(requests), 3, "Only the cyclic read")
+        self.assertEqual(data["Program"]["recipe"]["speed"], 2.5, "The last values stay in the data")
+        self.assertFalse(self.driver.data_changed)
+
+        self.values["Program:loaded"] = True
+        data = await self.driver.read_data()
+        self.assertEqual(len(requests), 5)
+        self.assertEqual(data["Program"]["recipe"]["speed"], 3.0)
+        self.assertEqual(self.driver.published_values["Program:recipe.speed"], 3.0)
+        self.assertEqual(self.driver.metrics.snapshot()['br_bridge_group_reads_total'], 2)
+
+    async def test_flat_and_compact(self):
+        self.driver.flat_output = True
+        await self.driver.read_data()
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program:recipe.name"], "a")
+        self.assertEqual(data["Program:steps[0..1]"], [10, 11])
+
+        self.driver.flat_output = False
+        self.driver.compact_output = True
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["recipe"]["name"], "a")
+        self.assertEqual(self.driver.data_view()["Program"]["steps"], [10, 11])
+
+    async def test_reconnect_reads_again(self):
+        await self.driver.read_data()
+        self.driver.read_groups["recipe"].reset()
+        await self.driver.read_data()
+        self.assertEqual(len(self.driver._connection.sent), 4)
+
+    async def test_remove_and_clear(self):
+        self.driver.remove_read_group("recipe")
+        data = await self.driver.read_data()
+        self.assertEqual(len(self.driver._connection.sent), 1)
+        self.assertNotIn("recipe", data["Program"])
+        self.driver.add_read_group("recipe", ["Program:recipe.name"], trigger="Program:loaded")
+        self.driver.clear_read_list()
+        self.assertEqual(self.driver.read_groups, {})
+
+    async def test_data_is_not_modified(self):
+        """Group values are added to a copy, so data that was published already stays as it was."""
+        await self.driver.read_data()
+        data = {"Program": {"counter": 1}}
+        merged = await self.driver._read_triggered_groups(data)
+        self.assertEqual(data, {"Program": {"counter": 1}})
+        self.assertEqual(merged["Program"]["recipe"], {"speed": 2.5, "name": "a"})
+
+        self.driver.flat_output = True
+        data = {"Program:counter": 1}
+        merged = await self.driver._read_triggered_groups(data)
+        self.assertEqual(data, {"Program:counter": 1})
+        self.assertEqual(merged["Program:recipe.name"], "a")
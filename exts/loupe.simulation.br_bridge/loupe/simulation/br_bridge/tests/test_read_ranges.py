@@ -0,0 +1,116 @@
+"""
+Test read ranges of array elements
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.read_ranges import parse_range, expand_ranges
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestReadRanges(omni.kit.test.AsyncTestCase):
+    """Tests for range registration, requests and decoding."""
+
+    # Run before every test
+    async def setUp(self):
+        self.values = {f"Program:buf[{i}]": i * 10 for i in range(20)}
+        self.values["Program:buf"] = [i * 10 for i in range(20)]
+        self.values["Program:flag"] = True
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = FakeConnection(values=self.values)
+
+    async def test_parse_range(self):
+        read_range = parse_range("Program:s.buf[2..5]")
+        self.assertEqual((read_range.base, read_range.start, read_range.end, len(read_range)), ("Program:s.buf", 2, 5, 4))
+        self.assertEqual(read_range.element_names[0], "Program:s.buf[2]")
+        self.assertIsNone(parse_range("Program:buf[2]"))
+        with self.assertRaises(ValueError):
+            parse_range("Program:buf[5..2]")
+        names, read_ranges = expand_ranges(["Program:flag", "Program:buf[0..1]"])
+        self.assertEqual(names, ["Program:flag", "Program:buf[0]", "Program:buf[1]"])
+        self.assertEqual(len(read_ranges), 1)
+
+    async def test_range_is_one_entry(self):
+        self.driver.add_read("Program:buf[0..9]")
+        self.driver.add_read("Program:flag")
+        self.assertEqual(self.driver._read_names, ["Program:buf[0..9]", "Program:flag"])
+        data = await self.driver.read_data()
+        self.assertEqual(self.driver._connection.sent[-1]["data"][0], "Program:flag")
+        self.assertEqual(len(self.driver._connection.sent[-1]["data"]), 11)
+        self.assertEqual(data["Program"]["buf"], [i * 10 for i in range(10)])
+        self.assertTrue(data["Program"]["flag"])
+
+    async def test_range_indexed_like_plc_array(self):
+        self.driver.add_read("Program:buf[5..7]")
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["buf"], [None] * 5 + [50, 60, 70])
+
+        self.driver.flat_output = True
+        data = await self.driver.read_data()
+        self.assertEqual(data, {"Program:buf[5..7]": [None] * 5 + [50, 60, 70]})
+
+    async def test_range_requests(self):
+        """With range requests, the array is requested by name and sliced."""
+        self.driver.range_requests = True
+        self.driver.add_read("Program:buf[2..4]")
+        self.driver.add_read("Program:buf[10..11]")
+        data = await self.driver.read_data()
+        self.assertEqual(self.driver._connection.sent[-1]["data"], ["Program:buf"])
+        self.assertEqual(data["Program"]["buf"][2:5], [20, 30, 40])
+        self.assertEqual(self.driver.published_values["Program:buf[10..11]"][10:], [100, 110])
+
+    async def test_missing_elements(self):
+        """Elements missing from the response are None."""
+        del self.values["Program:buf[1]"]
+        self.driver.add_read("Program:buf[0..2]")
+        data = await self.driver.read_data()
+        self.assertEqual(data["Program"]["buf"], [0, None, 20])
+
+    async def test_published_values_are_copies(self):
+        self.driver.add_read("Program:buf[0..1]")
+        first = await self.driver.read_data()
+        self.values["Program:buf[0]"] = 5
+        second = await self.driver.read_data()
+        self.assertEqual(first["Program"]["buf"], [0, 10])
+        self.assertEqual(second["Program"]["buf"], [5, 10])
+        self.assertTrue(self.driver.data_changed)
+        await self.driver.read_data()
+        self.assertFalse(self.driver.data_changed)
+
+    async def test_accessor_and_view(self):
+        values = self.driver.accessor("Program:buf[0..2]")
+        await self.driver.read_data()
+        self.assertEqual(values(), [0, 10, 20])
+        self.assertEqual(self.driver.data_view()["Program"]["buf"], [0, 10, 20])
+
+    async def test_types(self):
+        self.driver.types.set_type("Program:buf", "ARRAY[0..19] OF REAL")
+        self.driver.add_read("Program:buf[0..1]")
+        data = await self.driver.read_data()
+        self.assertIsInstance(data["Program"]["buf"][1], float)
+
+    async def test_read_variables(self):
+        values = await self.driver.read_variables(["Program:buf[1..2]", "Program:flag"])
+        self.assertEqual(values, {"Program:buf[1..2]": [None, 10, 20], "Program:flag": True})
+
+    async def test_merged_frame(self):
+        """Frames from the communication worker hold every value in one dict."""
+        self.driver.add_read("Program:buf[0..2]")
+        self.driver.add_read("Program:flag")
+        data = self.driver._parse_plc_response({"type": "readresponse", "data": [
+            {"Program:flag": False, "Program:buf[0]": 1, "Program:buf[1]": 2, "Program:buf[2]": 3}]})
+        self.assertEqual(data["Program"]["buf"], [1, 2, 3])
+        self.assertFalse(data["Program"]["flag"])
+
+    async def test_two_ranges_of_one_array(self):
+        """Ranges of the same array are merged in the view and the compact snapshot, as in the nested output."""
+        self.driver.add_read("Program:buf[1..2]")
+        self.driver.add_read("Program:buf[5..6]")
+        self.driver.add_read("Program:flag")
+        data = await self.driver.read_data()
+        merged = [None, 10, 20, None, None, 50, 60]
+        self.assertEqual(data["Program"]["buf"], merged)
+        self.assertEqual(self.driver.data_view()["Program"]["buf"], merged)
+        self.assertEqual(self.driver.data_view()["Program"].materialize(), {"buf": merged, "flag": True})
+        self.assertEqual(self.driver.compact_snapshot()["Program"]["buf"], merged)
@@ -0,0 +1,63 @@
+"""
+Test timestamped samples and interpolation of numeric PLC values
+"""
+
+import omni.kit.test
+from loupe.simulation.br_bridge.samples import SampleStore
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+
+# pylint: disable=W0212
+
+class TestSampleStore(omni.kit.test.AsyncTestCase):
+    """Tests for the sample store."""
+
+    # Run before every test
+    async def setUp(self):
+        self.samples = SampleStore(depth=3)
+
+    def test_no_samples(self):
+        """Unknown variables have no samples and no value."""
+        self.assertEqual(self.samples.get_samples("Program:real"), [])
+        self.assertIsNone(self.samples.interpolate("Program:real", 10.0))
+
+    def test_depth_is_bounded(self):
+        """Only the newest samples are kept."""
+        for i in range(5):
+            self.samples.add("Program:real", float(i), i * 10.0)
+        self.assertEqual(self.samples.get_samples("Program:real"), [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0)])
+
+    def test_non_numeric_values_are_ignored(self):
+        """Booleans and strings are not sampled."""
+        self.samples.add("Program:bool", 1.0, True)
+        self.samples.add("Program:string", 1.0, "a")
+        self.assertEqual(self.samples.get_samples("Program:bool"), [])
+        self.assertEqual(self.samples.get_samples("Program:string"), [])
+
+    def test_interpolate(self):
+        """Values between samples are linearly interpolated."""
+        self.samples.add("Program:real", 1.0, 10.0)
+        self.samples.add("Program:real", 2.0, 20.0)
+        self.samples.add("Program:real", 3.0, 0.0)
+        self.assertAlmostEqual(self.samples.interpolate("Program:real", 1.5), 15.0)
+        self.assertAlmostEqual(self.samples.interpolate("Program:real", 2.25), 15.0)
+        self.assertAlmostEqual(self.samples.interpolate("Program:real", 0.5), 10.0)
+
+    def test_extrapolate(self):
+        """Values past the newest sample are extrapolated, for a limited time."""
+        self.samples.add("Program:real", 1.0, 10.0)
+        self.samples.add("Program:real", 2.0, 20.0)
+        self.assertAlmostEqual(self.samples.interpolate("Program:real", 2.5), 25.0)
+        self.assertAlmostEqual(self.samples.interpolate("Program:real", 10.0), 30.0)
+        self.assertAlmostEqual(self.samples.interpolate("Program:real", 10.0, max_extrapolation=2.0), 40.0)
+
+    def test_single_sample(self):
+        """A single sample is returned as is."""
+        self.samples.add("Program:real", 1.0, 10.0)
+        self.assertEqual(self.samples.interpolate("Program:real", 5.0), 10.0)
+
+    def test_driver_samples_responses(self):
+        """The driver samples numeric values of timestamped responses."""
+        driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        driver._parse_plc_response({"type": "readresponse", "data": [{"Program:real": 1.5}, {"Program:string": "a"}]}, 100.0)
+        self.assertEqual(driver.samples.get_samples("Program:real"), [(100.0, 1.5)])
+        self.assertEqual(driver.samples.get_samples("Program:string"), [])
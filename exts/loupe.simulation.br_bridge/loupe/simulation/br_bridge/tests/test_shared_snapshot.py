@@ -0,0 +1,163 @@
+"""
+Test the shared memory snapshot used by the out-of-process worker and the snapshot export
+"""
+
+import struct
+import uuid
+
+import omni.kit.test
+from loupe.simulation.br_bridge.shared_snapshot import SharedSnapshotWriter, SharedSnapshotReader, SharedSnapshotException
+
+class TestSharedSnapshot(omni.kit.test.AsyncTestCase):
+    """Tests for publishing and reading snapshot frames."""
+
+    # Run before every test
+    async def setUp(self):
+        self.writer = SharedSnapshotWriter(size=64 * 1024, string_capacity=16)
+        self.reader = SharedSnapshotReader(self.writer.name)
+
+    # Run after every test
+    async def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def test_empty(self):
+        """A new snapshot has no values and is not connected."""
+        frame = self.reader.read()
+        self.assertEqual(frame.values, {})
+        self.assertFalse(frame.connected)
+
+    def test_publish_and_read(self):
+        """Values of every basic type are read back as published."""
+        values = {"Program:bool": True, "Program:int": -3, "Program:real": 1.5, "Program:string": "hello", "Program:json": [1, 2]}
+        self.writer.publish(values, 100.0)
+        frame = self.reader.read()
+        self.assertEqual(frame.values, values)
+        self.assertEqual(frame.timestamp, 100.0)
+        self.assertTrue(frame.connected)
+        self.assertTrue(self.reader.connected)
+
+    def test_sequence_changes(self):
+        """Every frame has a new, even sequence number."""
+        self.writer.publish({"Program:int": 1}, 1.0)
+        first = self.reader.sequence
+        self.writer.publish({"Program:int": 2}, 2.0)
+        self.assertNotEqual(self.reader.sequence, first)
+        self.assertEqual(self.reader.sequence % 2, 0)
+        self.assertEqual(self.reader.read().values, {"Program:int": 2})
+
+    def test_missing_values_are_kept(self):
+        """Variables missing from a frame keep their last value, and new variables get a slot."""
+        self.writer.publish({"Program:a": 1, "Program:b": 2}, 1.0)
+        self.writer.publish({"Program:b": 3, "Program:c": 4}, 2.0)
+        self.assertEqual(self.reader.read().values, {"Program:a": 1, "Program:b": 3, "Program:c": 4})
+
+    def test_type_change(self):
+        """Integers fit float slots, and other type changes widen the slot."""
+        self.writer.publish({"Program:real": 1.5, "Program:value": 1}, 1.0)
+        self.writer.publish({"Program:real": 2, "Program:value": "text"}, 2.0)
+        values = self.reader.read().values
+        self.assertEqual(values["Program:real"], 2.0)
+        self.assertIsInstance(values["Program:real"], float)
+        self.assertEqual(values["Program:value"], "text")
+
+    def test_long_strings_are_truncated(self):
+        """Strings longer than the string capacity are truncated."""
+        self.writer.publish({"Program:string": "x" * 100}, 1.0)
+        self.assertEqual(self.reader.read().values["Program:string"], "x" * 16)
+
+    def test_reset(self):
+        """Reset removes all slots."""
+        self.writer.publish({"Program:a": 1}, 1.0)
+        self.writer.reset()
+        frame = self.reader.read()
+        self.assertEqual(frame.values, {})
+        self.assertFalse(frame.connected)
+
+    def test_connected_flag(self):
+        """The connection flag can be updated without publishing values."""
+        self.writer.publish({"Program:a": 1}, 1.0)
+        self.writer.set_connected(False)
+        self.assertFalse(self.reader.connected)
+        frame = self.reader.read()
+        self.assertFalse(frame.connected)
+        self.assertEqual(frame.values, {"Program:a": 1})
+
+    def test_json_values_are_not_truncated(self):
+        """Structs and arrays get a slot that fits their JSON text, and the slot grows with the value."""
+        values = {"Program:buf[0..99]": [i * 0.5 for i in range(100)], "Program:x": 1}
+        self.writer.publish(values, 1.0)
+        self.assertEqual(self.reader.read().values, values)
+        self.writer.publish({"Program:buf[0..99]": [i * 1.25 for i in range(300)]}, 2.0)
+        self.assertEqual(self.reader.read_value("Program:buf[0..99]"), [i * 1.25 for i in range(300)])
+        self.assertEqual(self.reader.read_value("Program:x"), 1)
+        self.writer.publish({"Program:buf[0..99]": [1]}, 3.0)
+        self.assertEqual(self.reader.read().values["Program:buf[0..99]"], [1])
+
+    def test_too_many_values(self):
+        """Frames that don't fit the segment are rejected."""
+        with self.assertRaises(SharedSnapshotException):
+            self.writer.publish({f"Program:var{i}": "text" for i in range(10000)}, 1.0)
+
+    def test_read_value(self):
+        """Single values are read without the rest of the frame, and follow schema changes."""
+        self.writer.publish({"Program:a": 1, "Program:b": "text"}, 1.0)
+        self.assertEqual(self.reader.read_value("Program:b"), "text")
+        self.writer.publish({"Program:c": 2.5}, 2.0)
+        self.assertEqual(self.reader.read_value("Program:c"), 2.5)
+        self.assertEqual(self.reader.read_value("Program:a"), 1)
+        with self.assertRaises(KeyError):
+            self.reader.read_value("Program:missing")
+
+    def test_torn_schema_is_retried(self):
+        """A schema overwritten by a relayout in progress is retried until the timeout, not raised as a decode error."""
+        self.writer.publish({"Program:a": 1}, 1.0)
+        buffer = self.writer._segment.buf
+        struct.pack_into('<I', buffer, 16, struct.unpack_from('<I', buffer, 16)[0] + 1)
+        buffer[64:68] = b'\xff{"n'
+        with self.assertRaises(SharedSnapshotException):
+            self.reader.read(timeout=0.01)
+        with self.assertRaises(SharedSnapshotException):
+            self.reader.read_value("Program:a", timeout=0.01)
+        self.writer.reset(connected=True)
+        self.writer.publish({"Program:a": 2}, 2.0)
+        self.assertEqual(self.reader.read_value("Program:a"), 2)
+
+    def test_wait_for_frame(self):
+        """Waiting returns the next frame, or None if nothing new was published."""
+        self.writer.publish({"Program:a": 1}, 1.0)
+        sequence = self.reader.read().sequence
+        self.assertIsNone(self.reader.wait_for_frame(sequence, timeout=0.01))
+        self.writer.publish({"Program:a": 2}, 2.0)
+        frame = self.reader.wait_for_frame(sequence, timeout=0.01)
+        self.assertEqual(frame.values, {"Program:a": 2})
+
+class TestSharedSnapshotExport(omni.kit.test.AsyncTestCase):
+    """Tests for named snapshots read by external consumers."""
+
+    # Run before every test
+    async def setUp(self):
+        self.name = "br_bridge_test_" + uuid.uuid4().hex[:8]
+        self.writer = SharedSnapshotWriter(name=self.name, size=4096)
+
+    # Run after every test
+    async def tearDown(self):
+        self.writer.close()
+
+    def test_named_segment(self):
+        """Readers attach to a snapshot by name."""
+        self.writer.publish({"Program:a": 1}, 1.0)
+        reader = SharedSnapshotReader(self.name)
+        self.assertEqual(reader.read().values, {"Program:a": 1})
+        reader.close()
+
+    def test_name_in_use(self):
+        """A second writer can't take over a name that is in use."""
+        with self.assertRaises(FileExistsError):
+            SharedSnapshotWriter(name=self.name, size=4096)
+
+    def test_format_version_mismatch(self):
+        """Readers refuse segments written in another format version."""
+        struct.pack_into('<I', self.writer._segment.buf, 4, 99)
+        with self.assertRaises(SharedSnapshotException):
+            SharedSnapshotReader(self.name)
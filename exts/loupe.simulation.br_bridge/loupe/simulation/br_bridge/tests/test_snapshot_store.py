@@ -0,0 +1,92 @@
+"""
+Test the store of published snapshots, which backs handle-based DATA_READ events
+"""
+
+import asyncio
+
+import omni.kit.test
+from websockets.server import serve
+from loupe.simulation.br_bridge.snapshot_store import SnapshotStore
+from loupe.simulation.br_bridge.compact_snapshot import CompactBuilder
+from loupe.simulation.br_bridge.nested_view import build_shape
+from loupe.simulation.br_bridge.engine import BridgeEngine
+from loupe.simulation.br_bridge.tests.mock_server import mock_omjson_plc, mock_plc_data
+
+class TestSnapshotStore(omni.kit.test.AsyncTestCase):
+    """Tests for SnapshotStore."""
+
+    # Run before every test
+    async def setUp(self):
+        self.store = SnapshotStore(depth=2)
+
+    async def test_sequence_and_depth(self):
+        self.assertIsNone(self.store.latest())
+        self.assertIsNone(self.store.get())
+        for value in range(3):
+            snapshot = self.store.publish({"value": value}, timestamp=float(value))
+        self.assertEqual(snapshot.sequence, 3)
+        self.assertIs(self.store.latest(), snapshot)
+        self.assertEqual(self.store.get(2).data, {"value": 1})
+        self.assertIsNone(self.store.get(1), "Dropped")
+        self.assertIsNone(self.store.get(4), "Not published yet")
+        self.store.clear()
+        self.assertEqual(self.store.publish({}, timestamp=0).sequence, 4)
+
+    async def test_data_is_not_copied(self):
+        data = {"Program": {"axes": [{"pos": 1}]}}
+        self.assertIs(self.store.publish(data, timestamp=0).data, data)
+
+    async def test_slices(self):
+        snapshot = self.store.publish({"Program": {"axes": [{"pos": 1}, {"pos": 2}], "flag": True}}, timestamp=0)
+        self.assertEqual(snapshot.get("Program:axes[1].pos"), 2)
+        self.assertEqual(snapshot.get("Program:axes[0]"), {"pos": 1})
+        self.assertIsNone(snapshot.get("Program:axes[5].pos"))
+        self.assertIsNone(snapshot.get("Program:flag.member"))
+        self.assertIsNone(snapshot.get("Other:flag"))
+        self.assertEqual(snapshot.slice(["Program:flag", "Program:axes[0].pos"]),
+                         {"Program:flag": True, "Program:axes[0].pos": 1})
+
+    async def test_flat_and_compact(self):
+        snapshot = self.store.publish({"Program:flag": True}, timestamp=0, flat=True)
+        self.assertTrue(snapshot.get("Program:flag"))
+        self.assertIsNone(snapshot.get("Program"))
+        compact = CompactBuilder(build_shape({"Program:axes[1].pos": 0})).build([7])
+        snapshot = self.store.publish(compact, timestamp=0)
+        self.assertEqual(snapshot.get("Program:axes[1].pos"), 7)
+        self.assertIsNone(snapshot.get("Program:axes[1].vel"))
+
+
+class TestEngineSnapshots(omni.kit.test.AsyncTestCase):
+    """Tests for the snapshots published by the engine, with the mock OMJSON server as the PLC."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self.plc.sockets[0].getsockname()[1],
+                    'REFRESH_RATE': 10,
+                    'ENABLE_COMMUNICATION': True}
+        self.engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        self.published = []
+        self.engine.on_data = lambda data: self.published.append((self.engine.snapshots.latest(), data))
+
+    async def tearDown(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.engine.stop)
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def test_every_published_cycle_is_stored(self):
+        self.engine.add_read("TestProg:counter")
+        self.engine.start()
+        deadline = asyncio.get_running_loop().time() + 5.0
+        while len(self.published) < 5:
+            self.assertLess(asyncio.get_running_loop().time(), deadline, "Timed out")
+            await asyncio.sleep(0.01)
+        sequences = [snapshot.sequence for snapshot, _ in self.published[:5]]
+        self.assertEqual(sequences, list(range(sequences[0], sequences[0] + 5)))
+        snapshot, data = self.published[-1]
+        self.assertIs(snapshot.data, data)
+        self.assertIsNotNone(snapshot.timestamp)
@@ -0,0 +1,55 @@
+"""
+Test the soak harness with a short run and fast churn
+"""
+
+import asyncio
+
+import omni.kit.test
+from loupe.simulation.br_bridge.tests.soak import SoakHarness, percentile, slope
+
+class TestSoakHarness(omni.kit.test.AsyncTestCase):
+    """Tests for the drift detection, and a short soak run."""
+
+    async def test_slope(self):
+        self.assertAlmostEqual(slope([0, 1, 2, 3], [1, 3, 5, 7]), 2.0)
+        self.assertAlmostEqual(slope([0, 1, 2, 3], [5, 5, 5, 5]), 0.0)
+        self.assertEqual(slope([1], [1]), 0.0)
+        self.assertEqual(slope([1, 1], [1, 2]), 0.0)
+
+    async def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertIsNone(percentile([], 50))
+
+    async def test_check_detects_growth(self):
+        harness = SoakHarness(max_rss_slope=1024, max_object_slope=10, max_latency_slope=0.001)
+        harness.samples = [{'time': t * 360, 'rss': 1000000 + t * 100000, 'objects': {'dict': 100 + t * 50},
+                            'p50': 0.001, 'p95': 0.002 + t * 0.001, 'p99': 0.003, 'reads': 10} for t in range(10)]
+        failures = harness.check()
+        self.assertEqual(len(failures), 3)
+
+        harness.samples = [{'time': t * 360, 'rss': 1000000, 'objects': {'dict': 100},
+                            'p50': 0.001, 'p95': 0.002, 'p99': 0.003, 'reads': 10} for t in range(10)]
+        self.assertEqual(harness.check(), [])
+
+    async def test_types_tracked_after_warmup(self):
+        """A type that only becomes common after the warm-up is checked from the sample it's tracked in."""
+        harness = SoakHarness(max_object_slope=10)
+        harness.samples = [{'time': t * 360, 'rss': None, 'objects': {'dict': 100},
+                            'p50': None, 'p95': None, 'p99': None, 'reads': 0} for t in range(10)]
+        for t in range(5, 10):
+            harness.samples[t]['objects']['Leak'] = 1000 + t * 100
+        self.assertEqual(harness.check(), ["Leak objects grow by 1000/h"])
+
+    async def test_short_run(self):
+        # Limits are generous: a few seconds are dominated by warm-up, the point is to exercise the churn
+        harness = SoakHarness(duration=3.0, sample_interval=0.25, reconnect_interval=1.0, read_list_interval=0.3,
+                              write_interval=0.1, max_rss_slope=float('inf'), max_object_slope=float('inf'),
+                              max_latency_slope=float('inf'))
+        failures = await asyncio.get_running_loop().run_in_executor(None, harness.run)
+        self.assertEqual(failures, [])
+        self.assertGreaterEqual(len(harness.samples), 8)
+        self.assertGreater(sum(sample['reads'] for sample in harness.samples), 0)
+        self.assertIsNotNone(harness.samples[-1]['rss'])
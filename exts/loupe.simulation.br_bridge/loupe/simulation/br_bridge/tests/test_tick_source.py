@@ -0,0 +1,149 @@
+"""
+Test the tick sources and the scheduler that paces the communication loop
+"""
+
+import threading
+
+import omni.kit.test
+from loupe.simulation.br_bridge.tick_source import (CycleScheduler, TickSource, WallClockTickSource, ExternalTickSource,
+                                                    LockstepTickSource, IDLE, CYCLE, PRIORITY, CONTROL)
+
+class FakeTickSource(TickSource):
+    """A tick source that is due whenever the test says so, and records the cycles it sees."""
+
+    def __init__(self):
+        super().__init__()
+        self.due = False
+        self.started = 0
+        self.finished = 0
+
+    def time_until_due(self, now):
+        return 0 if self.due else 0.001
+
+    def start_cycle(self, now):
+        self.due = False
+        self.started += 1
+
+    def finish_cycle(self):
+        self.finished += 1
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCycleScheduler(omni.kit.test.AsyncTestCase):
+    """Tests for the scheduler, driven by a fake tick source and clock."""
+
+    # Run before every test
+    async def setUp(self):
+        self.clock = FakeClock()
+        self.tick_source = FakeTickSource()
+        self.scheduler = CycleScheduler(self.tick_source, clock=self.clock)
+
+    def test_cycle_when_due(self):
+        """A cycle runs only when the tick source says so, and is finished on the next step."""
+        self.assertEqual(self.scheduler.next_step(), IDLE)
+        self.tick_source.due = True
+        self.assertEqual(self.scheduler.next_step(), CYCLE)
+        self.assertEqual((self.tick_source.started, self.tick_source.finished), (1, 0))
+        self.assertEqual(self.scheduler.next_step(), IDLE)
+        self.assertEqual((self.tick_source.started, self.tick_source.finished), (1, 1))
+
+    def test_priority_between_cycles(self):
+        """Priority requests are served between cycles, but cycles go first."""
+        self.scheduler.request_priority()
+        self.tick_source.due = True
+        self.assertEqual(self.scheduler.next_step(), CYCLE)
+        self.assertEqual(self.scheduler.next_step(), PRIORITY)
+        self.assertEqual(self.scheduler.next_step(), IDLE)
+
+    def test_priority_min_spacing(self):
+        """Priority requests wait for the minimum write spacing."""
+        self.scheduler.write_min_spacing = 0.010
+        self.scheduler.last_write_time = self.clock.now
+        self.scheduler.request_priority()
+        self.assertEqual(self.scheduler.next_step(), IDLE)
+        self.clock.now += 0.010
+        self.assertEqual(self.scheduler.next_step(), PRIORITY)
+
+    def test_control_goes_first(self):
+        """Connection changes are handled right away, before a due cycle, and without one."""
+        self.scheduler.request_control()
+        self.assertEqual(self.scheduler.next_step(), CONTROL)
+        self.assertEqual(self.scheduler.next_step(), IDLE)
+        self.scheduler.request_control()
+        self.tick_source.due = True
+        self.assertEqual(self.scheduler.next_step(), CONTROL)
+        self.assertEqual(self.scheduler.next_step(), CYCLE)
+
+    def test_replacing_tick_source_finishes_cycle(self):
+        """A cycle in progress is finished when the tick source is replaced."""
+        self.tick_source.due = True
+        self.scheduler.next_step()
+        self.scheduler.tick_source = FakeTickSource()
+        self.assertEqual(self.tick_source.finished, 1)
+
+
+class TestTickSources(omni.kit.test.AsyncTestCase):
+    """Tests for the wall clock, external and lockstep tick sources."""
+
+    # Run before every test
+    async def setUp(self):
+        self.clock = FakeClock()
+
+    def test_wall_clock(self):
+        """Cycles are due one period after the previous cycle started."""
+        scheduler = CycleScheduler(WallClockTickSource(lambda: 0.001), clock=self.clock)
+        self.assertEqual(scheduler.next_step(), CYCLE)
+        self.assertEqual(scheduler.next_step(), IDLE)
+        self.clock.now += 0.001
+        self.assertEqual(scheduler.next_step(), CYCLE)
+
+    def test_wall_clock_ignores_ticks(self):
+        self.assertFalse(WallClockTickSource(lambda: 0.02).tick())
+
+    def test_external_ticks_are_combined(self):
+        """No cycles run without ticks, and ticks during a cycle result in one more cycle."""
+        tick_source = ExternalTickSource()
+        scheduler = CycleScheduler(tick_source, clock=self.clock)
+        scheduler._wake_event.wait = lambda timeout: None # pylint: disable=W0212
+        self.assertEqual(scheduler.next_step(), IDLE)
+        tick_source.tick()
+        self.assertEqual(scheduler.next_step(), CYCLE)
+        tick_source.tick()
+        tick_source.tick()
+        self.assertEqual(scheduler.next_step(), CYCLE)
+        self.assertEqual(scheduler.next_step(), IDLE)
+
+    def test_lockstep_waits_for_cycle(self):
+        """A lockstep tick returns once its cycle is done."""
+        tick_source = LockstepTickSource(timeout=5)
+        scheduler = CycleScheduler(tick_source, clock=self.clock)
+        steps = []
+        stop = threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                step = scheduler.next_step()
+                if step == CYCLE:
+                    steps.append(step)
+
+        thread = threading.Thread(target=loop)
+        thread.start()
+        self.assertTrue(tick_source.tick())
+        self.assertTrue(tick_source.tick())
+        stop.set()
+        scheduler.wake()
+        thread.join(5)
+        self.assertEqual(steps, [CYCLE, CYCLE])
+
+    def test_lockstep_timeout(self):
+        """A lockstep tick gives up after the timeout if no cycle runs."""
+        tick_source = LockstepTickSource(timeout=0.01)
+        CycleScheduler(tick_source, clock=self.clock)
+        self.assertFalse(tick_source.tick())
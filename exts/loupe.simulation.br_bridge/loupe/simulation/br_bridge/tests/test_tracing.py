@@ -0,0 +1,73 @@
+"""
+Test cycle-phase tracing and the Chrome trace export
+"""
+
+import json
+import os
+import tempfile
+
+import omni.kit.test
+from loupe.simulation.br_bridge.tracing import Tracer
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+class TestTracer(omni.kit.test.AsyncTestCase):
+    """Tests for recording and exporting spans."""
+
+    # Run before every test
+    async def setUp(self):
+        self.tracer = Tracer(capacity=10)
+
+    def test_disabled_records_nothing(self):
+        with self.tracer.span("read"):
+            pass
+        self.tracer.instant("connected")
+        self.assertEqual(len(self.tracer), 0)
+
+    def test_spans_are_recorded(self):
+        self.tracer.enabled = True
+        with self.tracer.span("read", variables=3):
+            pass
+        self.tracer.instant("connected")
+        events = self.tracer.to_chrome_trace()["traceEvents"]
+        self.assertEqual([event["name"] for event in events], ["read", "connected"])
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertGreaterEqual(events[0]["dur"], 0)
+        self.assertEqual(events[0]["args"], {"variables": 3})
+        self.assertEqual(events[1]["ph"], "i")
+
+    def test_ring_is_bounded(self):
+        self.tracer.enabled = True
+        for i in range(25):
+            with self.tracer.span(f"cycle {i}"):
+                pass
+        self.assertEqual(len(self.tracer), 10)
+        self.assertEqual(self.tracer.to_chrome_trace()["traceEvents"][0]["name"], "cycle 15")
+        self.tracer.capacity = 5
+        self.assertEqual(len(self.tracer), 5)
+
+    def test_dump(self):
+        self.tracer.enabled = True
+        with self.tracer.span("cycle"):
+            pass
+        path = os.path.join(tempfile.mkdtemp(), "trace.json")
+        self.tracer.dump(path)
+        with open(path, encoding='utf-8') as file:
+            trace = json.load(file)
+        self.assertEqual(trace["traceEvents"][0]["name"], "cycle")
+        os.remove(path)
+
+
+class TestDriverTracing(omni.kit.test.AsyncTestCase):
+    """Tests for the spans recorded by the websockets driver."""
+
+    async def test_read_phases(self):
+        driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        driver._connection = FakeConnection({"type": "readresponse", "data": [{"Program:counter": 1}]})
+        driver.add_read("Program:counter")
+        driver.tracer.enabled = True
+        await driver.read_data()
+        names = [event["name"] for event in driver.tracer.to_chrome_trace()["traceEvents"]]
+        self.assertEqual(names, ["read send/recv", "decode", "parse"])
@@ -0,0 +1,67 @@
+"""
+Test the UI callbacks the engine calls
+"""
+
+import json
+
+import omni.kit.test
+from loupe.simulation.br_bridge.ui_builder import UIBuilder
+from loupe.simulation.br_bridge.websockets_driver import WebsocketsDriver
+from loupe.simulation.br_bridge.compact_snapshot import to_plain
+from loupe.simulation.br_bridge.tests.fake_connection import FakeConnection
+
+# pylint: disable=W0212
+
+NAMES = [f"Program:axes[{i}].pos" for i in range(3)] + ["Program:flag"]
+
+class FieldModel():
+    """Records the value a UI field is set to."""
+
+    def __init__(self):
+        self.value = None
+
+    def set_value(self, value):
+        self.value = value
+
+
+class Field():
+    """Stands in for an omni.ui field."""
+
+    def __init__(self):
+        self.model = FieldModel()
+
+
+class MonitorHolder():
+    """Receives data like UIBuilder does, into a monitor field that isn't built."""
+
+    def __init__(self):
+        self._ui_initialized = True
+        self._monitor_field = Field()
+
+    _update_monitor_field = UIBuilder._update_monitor_field
+
+
+class TestMonitorField(omni.kit.test.AsyncTestCase):
+    """Tests for the variable-monitoring field."""
+
+    # Run before every test
+    async def setUp(self):
+        self.driver = WebsocketsDriver(ip='127.0.0.1', port=8000)
+        self.driver._connection = FakeConnection({"type": "readresponse",
+                                                  "data": [{name: i} for i, name in enumerate(NAMES)]})
+        for name in NAMES:
+            self.driver.add_read(name)
+        self.holder = MonitorHolder()
+
+    async def test_nested_output(self):
+        data = await self.driver.read_data()
+        self.holder._update_monitor_field(data)
+        self.assertEqual(json.loads(self.holder._monitor_field.model.value), data)
+
+    async def test_compact_output(self):
+        """Compact snapshots are shown like the nested data they stand for."""
+        self.driver.compact_output = True
+        data = await self.driver.read_data()
+        self.holder._update_monitor_field(data)
+        self.assertEqual(self.holder._monitor_field.model.value, json.dumps(to_plain(data), indent=4))
+        self.assertEqual(json.loads(self.holder._monitor_field.model.value)["Program"]["axes"][2]["pos"], 2)
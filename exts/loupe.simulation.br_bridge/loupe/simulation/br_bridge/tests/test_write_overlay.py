@@ -0,0 +1,125 @@
+"""
+Test the overlay of pending writes on the published data
+"""
+
+import asyncio
+
+import omni.kit.test
+from websockets.server import serve
+from loupe.simulation.br_bridge.write_overlay import WriteOverlay
+from loupe.simulation.br_bridge.compact_snapshot import CompactBuilder
+from loupe.simulation.br_bridge.nested_view import build_shape
+from loupe.simulation.br_bridge.engine import BridgeEngine
+from loupe.simulation.br_bridge.tests.mock_server import mock_omjson_plc, mock_plc_data
+
+def reads_everything(name):
+    return True
+
+class TestWriteOverlay(omni.kit.test.AsyncTestCase):
+    """Tests for WriteOverlay."""
+
+    # Run before every test
+    async def setUp(self):
+        self.overlay = WriteOverlay(timeout=10.0)
+        self.data = {"Program": {"axes": [{"pos": 1}, {"pos": 2}], "flag": False}}
+
+    async def test_apply_copies_the_path(self):
+        self.overlay.add({"Program:axes[1].pos": 5, "Program:flag": True}, now=0)
+        data, names = self.overlay.apply(self.data, False, reads_everything)
+        self.assertEqual(data, {"Program": {"axes": [{"pos": 1}, {"pos": 5}], "flag": True}})
+        self.assertEqual(names, ["Program:axes[1].pos", "Program:flag"])
+        self.assertEqual(self.data["Program"]["axes"][1]["pos"], 2)
+        self.assertFalse(self.data["Program"]["flag"])
+        self.assertIs(data["Program"]["axes"][0], self.data["Program"]["axes"][0])
+
+    async def test_apply_flat_and_compact(self):
+        self.overlay.add({"Program:flag": True}, now=0)
+        data, _ = self.overlay.apply({"Program:flag": False}, True, reads_everything)
+        self.assertEqual(data, {"Program:flag": True})
+        compact = CompactBuilder(build_shape({"Program:flag": 0})).build([False])
+        data, _ = self.overlay.apply(compact, False, reads_everything)
+        self.assertEqual(data, {"Program": {"flag": True}})
+
+    async def test_only_read_variables(self):
+        self.overlay.add({"Program:other": 1}, now=0)
+        data, names = self.overlay.apply(self.data, False, lambda name: name != "Program:other")
+        self.assertIs(data, self.data)
+        self.assertEqual(names, [])
+
+    async def test_dropped_when_read_back(self):
+        self.overlay.add({"Program:flag": True}, now=0)
+        self.overlay.read_completed({"Program:flag": True}, read_timestamp=0.5, now=0.5)
+        self.assertEqual(len(self.overlay), 1, "Not sent yet")
+        self.overlay.mark_sent(["Program:flag"], now=1.0, published_values={"Program:flag": False})
+        self.overlay.read_completed({"Program:flag": False}, read_timestamp=0.9, now=1.1)
+        self.assertEqual(len(self.overlay), 1, "Read before the write was sent")
+        self.overlay.read_completed({"Program:flag": False}, read_timestamp=1.2, now=1.2)
+        self.assertEqual(len(self.overlay), 1, "The PLC didn't apply the write yet")
+        self.overlay.changed = False
+        self.overlay.read_completed({"Program:flag": True}, read_timestamp=1.3, now=1.3)
+        self.assertEqual(len(self.overlay), 0)
+        self.assertTrue(self.overlay.changed)
+
+    async def test_dropped_when_plc_changes_value(self):
+        self.overlay.add({"Program:counter": 100}, now=0)
+        self.overlay.mark_sent(["Program:counter"], now=0, published_values={"Program:counter": 7})
+        self.overlay.read_completed({"Program:counter": 101}, read_timestamp=0.1, now=0.1)
+        self.assertEqual(len(self.overlay), 0)
+
+    async def test_timeout(self):
+        self.overlay.add({"Program:flag": True}, now=0)
+        self.overlay.read_completed({}, read_timestamp=None, now=9.9)
+        self.assertEqual(self.overlay.pending, {"Program:flag": True})
+        self.overlay.read_completed({}, read_timestamp=None, now=10.0)
+        self.assertEqual(self.overlay.pending, {})
+
+    async def test_newer_write_replaces_sent_write(self):
+        self.overlay.add({"Program:flag": True}, now=0)
+        self.overlay.mark_sent(["Program:flag"], now=0, published_values={})
+        self.overlay.add({"Program:flag": False}, now=0.1)
+        self.overlay.read_completed({"Program:flag": True}, read_timestamp=0.2, now=0.2)
+        self.assertEqual(self.overlay.pending, {"Program:flag": False})
+
+
+class TestEngineWriteOverlay(omni.kit.test.AsyncTestCase):
+    """Tests for the write overlay of the engine, with the mock OMJSON server as the PLC."""
+
+    # Run before every test
+    async def setUp(self):
+        self._saved_plc_data = [dict(plc_var_dict) for plc_var_dict in mock_plc_data]
+        mock_plc_data[:] = [{"TestProg:counter": 0}]
+        self.plc = await serve(mock_omjson_plc, "127.0.0.1", 0)
+        # With offloaded decoding, the data of a cycle was requested in the cycle before, so a write isn't read back
+        # by the cycle that sends it
+        settings = {'PLC_IP_ADDRESS': "127.0.0.1",
+                    'PLC_PORT': self.plc.sockets[0].getsockname()[1],
+                    'ENABLE_COMMUNICATION': True,
+                    'TICK_SOURCE': 'lockstep',
+                    'LOCKSTEP_TIMEOUT': 2000,
+                    'DECODE_OFFLOAD': 'thread',
+                    'WRITE_OVERLAY': True}
+        self.engine = BridgeEngine(lambda name, default=None: settings.get(name, default))
+        self.published = []
+        self.engine.on_data = lambda data: self.published.append((data.get("TestProg", {}).get("counter"),
+                                                                  list(self.engine.optimistic)))
+
+    async def tearDown(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.engine.stop)
+        self.plc.close()
+        await self.plc.wait_closed()
+        mock_plc_data[:] = self._saved_plc_data
+
+    async def tick(self):
+        self.assertTrue(await asyncio.get_running_loop().run_in_executor(None, self.engine.tick))
+
+    async def test_write_shown_until_read_back(self):
+        self.engine.add_read("TestProg:counter")
+        self.engine.start()
+        while not self.published or self.published[-1][0] is None:
+            await self.tick()
+        self.engine.queue_write("TestProg:counter", 100)
+        await self.tick()
+        self.assertEqual(self.published[-1], (100, ["TestProg:counter"]))
+        await self.tick()
+        self.assertEqual(self.published[-1], (101, []))
+        self.assertEqual(self.engine.data["TestProg"]["counter"], 101)
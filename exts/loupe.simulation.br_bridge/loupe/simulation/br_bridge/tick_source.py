@@ -0,0 +1,223 @@
+'''
+  File: **tick_source.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import threading
+import time
+
+# Steps returned by CycleScheduler.next_step()
+IDLE = 'idle'
+CYCLE = 'cycle'
+PRIORITY = 'priority'
+CONTROL = 'control'
+
+class TickSource():
+    """
+    Decides when the next communication cycle is due.
+
+    The communication loop asks time_until_due() before every cycle, and calls start_cycle() and finish_cycle()
+    around every cycle it runs. Tick sources that are triggered from other threads call wake() to get the loop to
+    check again right away.
+
+    """
+
+    def __init__(self):
+        self._wake = None
+
+    def bind(self, wake):
+        """Sets the function that wakes up the communication loop."""
+        self._wake = wake
+
+    def wake(self):
+        if self._wake:
+            self._wake()
+
+    def time_until_due(self, now : float):
+        """
+        Returns the seconds until the next cycle is due, 0 or less if it is due now,
+        or None if it is only due after the next tick.
+        """
+        raise NotImplementedError
+
+    def start_cycle(self, now : float):
+        """Called by the communication loop when a cycle starts."""
+
+    def finish_cycle(self):
+        """Called by the communication loop when a cycle is done."""
+
+    def tick(self):
+        """
+        Triggers a cycle, for tick sources that are driven from outside. Other tick sources ignore ticks.
+
+        Returns:
+            bool: True if a cycle was triggered (and, in lockstep, completed).
+
+        """
+        return False
+
+class WallClockTickSource(TickSource):
+    """
+    Starts a cycle every refresh period, measured from the start of the previous cycle.
+
+    Args:
+        get_period (Callable[[], float]): Returns the refresh period in seconds. Called every cycle, so the period
+            can be changed while running.
+
+    """
+
+    def __init__(self, get_period):
+        super().__init__()
+        self._get_period = get_period
+        self._next_cycle_time = 0
+
+    def time_until_due(self, now : float):
+        return self._next_cycle_time - now
+
+    def start_cycle(self, now : float):
+        self._next_cycle_time = now + self._get_period()
+
+class ExternalTickSource(TickSource):
+    """
+    Starts a cycle after every tick, for example one per simulation step.
+    Ticks that arrive while a cycle is running are combined into one more cycle. No cycles run without ticks.
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._requested = 0
+        self._serving = 0
+        self._completed = 0
+
+    def time_until_due(self, now : float):
+        return 0 if self._requested > self._serving else None
+
+    def start_cycle(self, now : float):
+        with self._condition:
+            self._serving = self._requested
+
+    def finish_cycle(self):
+        with self._condition:
+            self._completed = self._serving
+            self._condition.notify_all()
+
+    def tick(self):
+        with self._condition:
+            self._requested += 1
+        self.wake()
+        return True
+
+class LockstepTickSource(ExternalTickSource):
+    """
+    Runs exactly one cycle per tick, and blocks the caller until that cycle is done.
+
+    Args:
+        timeout (float): The maximum number of seconds a tick waits for its cycle.
+
+    """
+
+    def __init__(self, timeout : float):
+        super().__init__()
+        self.timeout = timeout
+
+    def tick(self):
+        with self._condition:
+            self._requested += 1
+            requested = self._requested
+        self.wake()
+        with self._condition:
+            return self._condition.wait_for(lambda: self._completed >= requested, self.timeout)
+
+class CycleScheduler():
+    """
+    Paces the communication loop: runs a cycle whenever the tick source says one is due, and in between sends
+    priority writes as soon as they arrive, at most once per minimum write spacing. Connection changes, like a
+    disconnect before stopping, are due right away, whatever the tick source.
+
+    Attributes:
+        tick_source (TickSource): Decides when cycles are due. Can be replaced while running.
+        write_min_spacing (float): The minimum seconds between two priority writes.
+        last_write_time (float): When data was last written to the PLC. Set by the communication loop.
+
+    """
+
+    def __init__(self, tick_source : TickSource, clock=time.time):
+        self.write_min_spacing = 0.0
+        self.last_write_time = 0
+        self._clock = clock
+        self._wake_event = threading.Event()
+        self._priority_pending = False
+        self._control_pending = False
+        self._cycle_in_progress = False
+        self._tick_source = None
+        self.tick_source = tick_source
+
+    @property
+    def tick_source(self):
+        return self._tick_source
+
+    @tick_source.setter
+    def tick_source(self, tick_source : TickSource):
+        if self._cycle_in_progress:
+            self._tick_source.finish_cycle()
+            self._cycle_in_progress = False
+        tick_source.bind(self.wake)
+        self._tick_source = tick_source
+        self.wake()
+
+    def wake(self):
+        """Wakes up the communication loop to check what is due."""
+        self._wake_event.set()
+
+    def request_priority(self):
+        """Asks for queued writes and requests to be sent before the next cycle."""
+        self._priority_pending = True
+        self._wake_event.set()
+
+    def request_control(self):
+        """Asks for a connection change, e.g. a disconnect, to be handled before anything else."""
+        self._control_pending = True
+        self._wake_event.set()
+
+    def next_step(self):
+        """
+        Returns what the communication loop should do next, waiting until something may be due.
+        Calling this also marks the previous cycle as finished.
+
+        Returns:
+            str: CONTROL to handle a connection change, CYCLE to run a cycle, PRIORITY to send priority writes,
+                or IDLE if nothing is due yet.
+
+        """
+        tick_source = self._tick_source
+        if self._cycle_in_progress:
+            tick_source.finish_cycle()
+            self._cycle_in_progress = False
+
+        if self._control_pending:
+            self._control_pending = False
+            return CONTROL
+
+        now = self._clock()
+        timeout = tick_source.time_until_due(now)
+        if timeout is not None and timeout <= 0:
+            tick_source.start_cycle(now)
+            self._cycle_in_progress = True
+            return CYCLE
+
+        if self._priority_pending:
+            next_write_time = self.last_write_time + self.write_min_spacing
+            if now >= next_write_time:
+                self._priority_pending = False
+                return PRIORITY
+            timeout = next_write_time - now if timeout is None else min(timeout, next_write_time - now)
+
+        self._wake_event.wait(timeout)
+        self._wake_event.clear()
+        return IDLE
@@ -0,0 +1,127 @@
+'''
+  File: **tracing.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_TRACE_CAPACITY = 100000 # spans
+
+class _NullSpan():
+    """Returned while tracing is off, so a disabled span costs one call and nothing else."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span():
+
+    __slots__ = ('_events', '_name', '_args', '_start')
+
+    def __init__(self, events, name, args):
+        self._events = events
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._events.append((self._name, self._start, time.perf_counter(), threading.get_ident(), self._args))
+        return False
+
+class Tracer():
+    """
+    Records timed spans of the communication cycle into a bounded ring, and exports them as Chrome trace events,
+    which can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+    Spans are kept as tuples until they are exported. While tracing is off, span() returns a shared no-op context.
+
+    Attributes:
+        enabled (bool): Whether spans are recorded.
+
+    """
+
+    def __init__(self, capacity=DEFAULT_TRACE_CAPACITY):
+        self.enabled = False
+        self._events = deque(maxlen=int(capacity))
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+
+    @property
+    def capacity(self):
+        return self._events.maxlen
+
+    @capacity.setter
+    def capacity(self, capacity):
+        self._events = deque(self._events, maxlen=int(capacity))
+
+    def span(self, name : str, **args):
+        """
+        Returns a context manager that records the time spent inside it.
+
+        Args:
+            name (str): The name of the phase. "read"
+            args: Optional details shown with the span in the trace viewer.
+
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self._events, name, args)
+
+    def instant(self, name : str, **args):
+        """Records a point in time, e.g. a reconnect."""
+        if self.enabled:
+            now = time.perf_counter()
+            self._events.append((name, now, None, threading.get_ident(), args))
+
+    def clear(self):
+        """Removes all recorded spans."""
+        self._events.clear()
+
+    def __len__(self):
+        return len(self._events)
+
+    def to_chrome_trace(self):
+        """
+        Returns the recorded spans as a Chrome trace-event document.
+
+        Returns:
+            dict: {"traceEvents": [...], "displayTimeUnit": "ms", ...}
+
+        """
+        pid = os.getpid()
+        trace_events = []
+        for name, start, end, tid, args in list(self._events):
+            event = {"name": name, "cat": "br_bridge", "pid": pid, "tid": tid,
+                     "ts": (start - self._origin) * 1e6}
+            if end is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=(end - start) * 1e6)
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events,
+                "displayTimeUnit": "ms",
+                "otherData": {"wall_clock_origin": self._wall_origin}}
+
+    def dump(self, path : str):
+        """Writes the recorded spans to a Chrome trace-event JSON file."""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_chrome_trace(), file)
@@ -13,17 +13,17 @@ import omni.timeline
 
 from carb.settings import get_settings
 
-from .websockets_driver import WebsocketsDriver, PLCDataParsingException, WebsocketsConnectionException
+from .engine import BridgeEngine, TICK_SOURCES
+from .plc_types import PLCTypeException
+from .compact_snapshot import Record, to_plain
 
 from .global_variables import EXTENSION_NAME
 from .BrBridge import EVENT_TYPE_DATA_READ, EVENT_TYPE_DATA_READ_REQ, EVENT_TYPE_DATA_WRITE_REQ, EVENT_TYPE_DATA_INIT
+from .BrBridge import _set_active_bridge
 
-import threading
-from threading import RLock
-
-import asyncio
 import json
-from websockets.exceptions import ConnectionClosed, ConnectionClosedError
+import os
+import tempfile
 
 import time
 
@@ -41,6 +41,8 @@ TEST_PROGRAM_VARS = ["TestProg:counter",
                      "TestProg:real", 
                      "TestProg:lreal", 
                      "TestProg:string"]
+# Labels of the cycle triggers, see engine.TICK_SOURCES
+TICK_SOURCE_LABELS = ["Refresh Rate", "External Tick", "Lockstep With Simulation"]
  
 class UIBuilder:
     def __init__(self):
@@ -54,36 +56,27 @@ class UIBuilder:
         self.settings_interface = get_settings()
          
         # Internal status flags. 
-        self._thread_is_alive = True   
-        self._communication_initialized = False
         self._ui_initialized = False
 
-        # Configuration parameters for the extension.
-        # These are exposed on the UI. 
-        self._enable_communication = self.get_setting( 'ENABLE_COMMUNICATION', False ) 
-        self._refresh_rate = self.get_setting( 'REFRESH_RATE', 20 ) # in ms
-
-        # Timing variables
-        self._actual_cyclic_read_time = 0
-        self._last_cyclic_read_time = 0
-        self._worst_latency = 0
-        self._average_latency = 0
-
         # Data stream where the extension will dump the data that it reads from the PLC.
         self._event_stream = omni.kit.app.get_app().get_message_bus_event_stream()
 
-        self._websockets_connector = WebsocketsDriver(ip=self.get_setting('PLC_IP_ADDRESS', '127.0.0.1'), port=self.get_setting('PLC_PORT', 8000))
-        self._disconnect_command = False # command to trigger disconnect from outside async context
-        
-        self.write_queue = dict()
-        self.write_lock = RLock()
+        # The communication loop, configured from the persistent settings. This class only connects it to Kit.
+        self._engine = BridgeEngine(self.get_setting)
+        self._engine.on_data = self._publish_data
+        self._engine.on_data_changed = self._update_monitor_field
+        self._engine.on_status = self._update_ui_status
+        self._engine.on_statistics = self._update_statistics_fields
+        self._engine.on_refresh_period_changed = self._update_refresh_period_field
+        # DATA_READ events carry only the sequence number and timestamp of the snapshot, instead of the data
+        self._handle_payloads = self.get_setting('EVENT_PAYLOAD', 'data') == 'handle'
 
         self.read_req = self._event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_READ_REQ, self.on_read_req_event)
         self.write_req = self._event_stream.create_subscription_to_push_by_type(EVENT_TYPE_DATA_WRITE_REQ, self.on_write_req_event)
         self._event_stream.push(event_type=EVENT_TYPE_DATA_INIT, payload={'data': {}})
+        _set_active_bridge(self._engine)
 
-        self._thread = threading.Thread(target=self._thread_target)
-        self._thread.start()
+        self._engine.start()
 
     ###################################################################################
     #           The Functions Below Are Called Automatically By extension.py
@@ -95,9 +88,8 @@ class UIBuilder:
         """
         self._event_stream.push(event_type=EVENT_TYPE_DATA_INIT, payload={'data': {}})
 
-        if not self._thread_is_alive:
-            self._thread_is_alive = True
-            self._thread.start()
+        if not self._engine.is_running():
+            self._engine.start()
 
     def on_timeline_event(self, event):
         """Callback for Timeline events (Play, Pause, Stop)
@@ -112,6 +104,14 @@ class UIBuilder:
         elif(event.type == int(omni.timeline.TimelineEventType.PAUSE)):
             pass     
    
+    def on_physics_step(self, step):
+        """Callback for physics steps. Triggers a cycle if the bridge is driven by the simulation.
+
+        Args:
+            step (float): Simulation time step in seconds
+        """
+        self._engine.tick()
+
     def on_stage_event(self, event):
         """Callback for Stage Events
 
@@ -125,19 +125,10 @@ class UIBuilder:
         Called when the stage is closed or the extension is hot reloaded.
         Perform any necessary cleanup such as removing active callback functions
         """
-        # Disconnect websockets. Try to disconnect nicely before forcing.
-        if self._websockets_connector and self._thread_is_alive:
-            self._disconnect_command = True
-            start_time = time.time()
-            timeout_s = 2 # seconds
-            while self._websockets_connector.is_connected():
-                time.sleep(.1)
-                if time.time() - start_time > timeout_s:
-                    break
         self.read_req.unsubscribe()
         self.write_req.unsubscribe()
-        self._thread_is_alive = False
-        self._thread.join()
+        _set_active_bridge(None)
+        self._engine.stop()
 
     def build_ui(self):
         """
@@ -149,24 +140,72 @@ class UIBuilder:
 
                 with ui.HStack(spacing=5, height=0):
                     ui.Label("Enable Client")
-                    self._enable_communication_checkbox = ui.CheckBox(ui.SimpleBoolModel(self._enable_communication))
+                    self._enable_communication_checkbox = ui.CheckBox(ui.SimpleBoolModel(self._engine.enable_communication))
                     self._enable_communication_checkbox.model.add_value_changed_fn(self._toggle_communication_enable)
                 
                 with ui.HStack(spacing=5, height=0):
                     ui.Label("Refresh Rate (ms)")
-                    self._refresh_rate_field = ui.IntField(ui.SimpleIntModel(self._refresh_rate))
+                    self._refresh_rate_field = ui.IntField(ui.SimpleIntModel(self._engine.refresh_rate))
                     self._refresh_rate_field.model.set_min(10)
                     self._refresh_rate_field.model.set_max(10000)
                     self._refresh_rate_field.model.add_value_changed_fn(self._on_refresh_rate_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Adaptive Refresh Rate")
+                    self._adaptive_refresh_rate_checkbox = ui.CheckBox(ui.SimpleBoolModel(self._engine.adaptive_refresh_rate))
+                    self._adaptive_refresh_rate_checkbox.model.add_value_changed_fn(self._on_adaptive_refresh_rate_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Max Refresh Rate (ms)")
+                    self._max_refresh_rate_field = ui.IntField(ui.SimpleIntModel(self._engine.max_refresh_rate))
+                    self._max_refresh_rate_field.model.set_min(10)
+                    self._max_refresh_rate_field.model.set_max(10000)
+                    self._max_refresh_rate_field.model.add_value_changed_fn(self._on_max_refresh_rate_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Target Utilization")
+                    self._target_utilization_field = ui.FloatField(ui.SimpleFloatModel(self._engine.target_utilization))
+                    self._target_utilization_field.model.set_min(0.05)
+                    self._target_utilization_field.model.set_max(1.0)
+                    self._target_utilization_field.model.add_value_changed_fn(self._on_target_utilization_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Cycle Trigger")
+                    self._tick_source_combo = ui.ComboBox(self._tick_source_index(), *TICK_SOURCE_LABELS)
+                    self._tick_source_combo.model.get_item_value_model().add_value_changed_fn(self._on_tick_source_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Lockstep Timeout (ms)")
+                    self._lockstep_timeout_field = ui.IntField(ui.SimpleIntModel(self._engine.lockstep_timeout))
+                    self._lockstep_timeout_field.model.set_min(1)
+                    self._lockstep_timeout_field.model.set_max(10000)
+                    self._lockstep_timeout_field.model.add_value_changed_fn(self._on_lockstep_timeout_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Publish On Change Only")
+                    self._publish_on_change_checkbox = ui.CheckBox(ui.SimpleBoolModel(self._engine.publish_on_change))
+                    self._publish_on_change_checkbox.model.add_value_changed_fn(self._on_publish_on_change_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Flat Output")
+                    self._flat_output_checkbox = ui.CheckBox(ui.SimpleBoolModel(self._engine.flat_output))
+                    self._flat_output_checkbox.model.add_value_changed_fn(self._on_flat_output_changed)
+
+                with ui.HStack(spacing=5, height=0):
+                    ui.Label("Min Priority Write Spacing (ms)")
+                    self._write_min_spacing_field = ui.IntField(ui.SimpleIntModel(self._engine.write_min_spacing))
+                    self._write_min_spacing_field.model.set_min(0)
+                    self._write_min_spacing_field.model.set_max(10000)
+                    self._write_min_spacing_field.model.add_value_changed_fn(self._on_write_min_spacing_changed)
                                    
                 with ui.HStack(spacing=5, height=0):
                     ui.Label("PLC IP Address")
-                    self._plc_ip_field = ui.StringField(ui.SimpleStringModel(self._websockets_connector.ip))
+                    self._plc_ip_field = ui.StringField(ui.SimpleStringModel(self._engine.driver.ip))
                     self._plc_ip_field.model.add_value_changed_fn(self._on_plc_ip_changed)
 
                 with ui.HStack(spacing=5, height=0):
                     ui.Label("PLC Port")
-                    self._plc_port_field = ui.IntField(ui.SimpleIntModel(self._websockets_connector.port))
+                    self._plc_port_field = ui.IntField(ui.SimpleIntModel(self._engine.driver.port))
                     self._plc_port_field.model.add_value_changed_fn(self._on_plc_port_changed)
                     self._plc_port_field.model.set_min(0)
                     self._plc_port_field.model.set_max(65535)
@@ -191,17 +230,21 @@ class UIBuilder:
         with ui.CollapsableFrame("Dev Tools", collapsed=True):
             with ui.VStack(spacing=5, height=0):
                 ui.Label("Average PLC read latency")
-                self._average_cyclic_read_time_field = ui.FloatField(ui.SimpleFloatModel(self._average_latency), 
+                self._average_cyclic_read_time_field = ui.FloatField(ui.SimpleFloatModel(self._engine.average_latency), 
                                                                      multiline=False,
                                                                      read_only=True)
                 ui.Label("Worst PLC read latency")
-                self._worst_cyclic_read_time_field = ui.FloatField(ui.SimpleFloatModel(self._worst_latency), 
+                self._worst_cyclic_read_time_field = ui.FloatField(ui.SimpleFloatModel(self._engine.worst_latency), 
                                                                    multiline=False,
                                                                    read_only=True)
                 self._test_read_button = ui.Button(text="Reset worst-case latency", 
                                                    clicked_fn=self._reset_worst_latency)
+                ui.Label("Current refresh period (ms)")
+                self._current_refresh_period_field = ui.FloatField(ui.SimpleFloatModel(self._engine.refresh_period * 1000),
+                                                                   multiline=False,
+                                                                   read_only=True)
                 ui.Label("Last PLC read latency")
-                self._actual_cyclic_read_time_field = ui.FloatField(ui.SimpleFloatModel(self._actual_cyclic_read_time), 
+                self._actual_cyclic_read_time_field = ui.FloatField(ui.SimpleFloatModel(self._engine.last_cycle_time), 
                                                                     multiline=False, 
                                                                     read_only=True)
 
@@ -213,9 +256,9 @@ class UIBuilder:
                                                        multiline=True,
                                                        read_only=False)
                 self._test_read_button = ui.Button(text="Add Var To Cyclic Reads", 
-                                                   clicked_fn=lambda: self._websockets_connector.add_read(plc_var=self._test_read_field.model.as_string))
+                                                   clicked_fn=lambda: self._engine.driver.add_read(plc_var=self._test_read_field.model.as_string))
                 self._clear_read_list_button = ui.Button(text="Clear Read List", 
-                                                         clicked_fn=self._websockets_connector.clear_read_list)
+                                                         clicked_fn=self._engine.driver.clear_read_list)
 
                 self._separator = ui.Separator()
                 
@@ -224,7 +267,16 @@ class UIBuilder:
                                                         read_only=False)
                 self._test_write_field_value = ui.StringField(ui.SimpleStringModel(DEFAULT_DEV_TEST_UI_WRITE_VALUE), multiline=True, read_only=False)
                 self._test_read_button = ui.Button(text="Write value",
-                                                   clicked_fn=lambda: self.queue_write(name=self._test_write_field.model.as_string, value=self._test_write_field_value.model.as_string))
+                                                   clicked_fn=lambda: self._engine.queue_write(name=self._test_write_field.model.as_string, value=self._test_write_field_value.model.as_string))
+
+                self._separator = ui.Separator()
+
+                with ui.HStack(spacing=5):
+                    ui.Label("Tracing")
+                    self._tracing_checkbox = ui.CheckBox(ui.SimpleBoolModel(self._engine.tracing_enabled))
+                    self._tracing_checkbox.model.add_value_changed_fn(lambda a: self._engine.enable_tracing(a.get_value_as_bool()))
+                self._dump_trace_button = ui.Button(text="Dump Trace",
+                                                    clicked_fn=self._dump_trace_to_temp)
                 
         self._ui_initialized = True
 
@@ -233,7 +285,7 @@ class UIBuilder:
         Add a stock set of variables, corresponding to test variables in the sample AS program, to the readlist.
         """
         for var in TEST_PROGRAM_VARS:
-            self._websockets_connector.add_read(plc_var=var)
+            self._engine.add_read(var)
 
     ####################################
     ####################################
@@ -243,29 +295,49 @@ class UIBuilder:
 
     def on_read_req_event(self, event):
         """Callback for extension event stream. On read request event, add the variables to the read list."""
-        event_data = event.payload
+        event_data = event.payload.get_dict()
         variables : list = event_data['variables']
+        for deadband in event_data.get('deadbands', []):
+            self._engine.driver.set_deadband(deadband['pattern'], deadband['absolute'], deadband['relative'])
+        for variable_type in event_data.get('types', []):
+            try:
+                self._engine.driver.types.set_type(variable_type['name'], variable_type['type'])
+            except PLCTypeException as e:
+                self._update_ui_status(f"Invalid type: {e}")
         for var in variables:
-            self._websockets_connector.add_read(plc_var=var)
+            try:
+                self._engine.add_read(var)
+            except ValueError as e:
+                self._update_ui_status(f"Invalid read: {e}")
 
     def on_write_req_event(self, event):
-        """Callback for extension event stream. On write request event, add a variable to the write queue."""
-        variables = event.payload["variables"]
-        for variable in variables:
-            self.queue_write(variable['name'], variable['value'])
-
-    def queue_write(self, name, value):
-        """
-        Add PLC variable to the write queue for sending variables and values to the PLC.
-        
-        Args
-        name: str
-            The name of the variable to write to.
-        value:
-            The value to write to the variable.
-        """
-        with self.write_lock:
-            self.write_queue[name] = value
+        """Callback for extension event stream. On write request event, add the variables to the write queue."""
+        event_data = event.payload.get_dict()
+        variables = event_data["variables"]
+        self._engine.queue_writes({variable['name']: variable['value'] for variable in variables},
+                                  priority=event_data.get('priority', False))
+
+    def _publish_data(self, data):
+        """Push the data of a cycle to the event stream, or only its handle in the snapshot store."""
+        if self._handle_payloads:
+            # Subscribers fetch the data, or the parts they need, from the snapshot store through the Manager
+            snapshot = self._engine.snapshots.latest()
+            self._event_stream.push(event_type=EVENT_TYPE_DATA_READ,
+                                    payload={'sequence': snapshot.sequence, 'timestamp': snapshot.timestamp})
+            return
+        if isinstance(data, Record):
+            # Event payloads are copied into plain dictionaries anyway
+            data = data.to_dict()
+        payload = {'data': data}
+        if self._engine.write_overlay:
+            # Variables showing a written value that hasn't been read back yet
+            payload['optimistic'] = list(self._engine.optimistic)
+        self._event_stream.push(event_type=EVENT_TYPE_DATA_READ, payload=payload)
+
+    def _dump_trace_to_temp(self):
+        path = os.path.join(tempfile.gettempdir(), f"br_bridge_trace_{int(time.time())}.json")
+        self._engine.dump_trace(path)
+        self._update_ui_status(f"Trace written to {path}")
 
     def _update_ui_status(self, message, reset_monitor=False):
         """
@@ -282,132 +354,35 @@ class UIBuilder:
             if reset_monitor:
                 self._monitor_field.model.set_value("{}")
 
-    def _update_monitor_field(self):
+    def _update_monitor_field(self, data):
         """Update the variable-monitoring field in the UI."""
         if self._ui_initialized:
-            json_formatted_str = json.dumps(self._data, indent=4)
+            json_formatted_str = json.dumps(data, indent=4, default=to_plain)
             self._monitor_field.model.set_value(json_formatted_str)
 
-    def _thread_target(self):
-        """Entry point for the worker thread."""
-        asyncio.run(self._update_plc_data())
-
-    async def _update_plc_data(self):
-        """
-        Main loop for connecting, auto-reconnecting, reading data, and writing data to the PLC.
-        """
-
-        DATA_READ_FAIL_SLEEP_TIME_SECONDS = 2 # wait this long before retrying, also allows UI status to stick around
-
-        thread_start_time = time.time()
-
-        while self._thread_is_alive:
-
-            # Sleep for the refresh rate minus time spent in last cycle
-            last_cycle_time = time.time() - thread_start_time
-            sleepy_time = self._refresh_rate/1000 - last_cycle_time
-            if sleepy_time > 0:
-                time.sleep(sleepy_time)
-
-            thread_start_time = time.time()
-
-            # Handle disconnect
-            if self._disconnect_command:
-                await self._websockets_connector.disconnect()
-                self._disconnect_command = False
-                continue
-
-            # Check if the communication is disabled
-            if not self._enable_communication:
-                self._update_ui_status(message="Disabled", reset_monitor=True)
-                continue
-
-            # Start the communication if it is and not initialized and enabled 
-            if not self._communication_initialized and self._enable_communication:
-                # Attempt to connect
-                self._update_ui_status("Connecting...")
-                try:
-                    if await self._websockets_connector.connect():
-                        self._communication_initialized = True
-                        self._update_ui_status("Connected")
-                        self._last_cyclic_read_time = time.time()
-                        self._reset_worst_latency()
-                except WebsocketsConnectionException as e:
-                    self._update_ui_status(f"{e}")
-                    time.sleep(DATA_READ_FAIL_SLEEP_TIME_SECONDS)
-                    continue
-
-            # Catch exceptions and log them to the status field
-            try:
-                if self._websockets_connector.is_connected():
-                    try:
-                        if self.write_queue:                                             
-                            with self.write_lock:
-                                # TODO would it be better if this was a deepcopy?
-                                values = self.write_queue
-                                self.write_queue = {}
-                            await self._websockets_connector.write_data(values)
-
-                    except ConnectionClosed as e:
-                        self._update_ui_status(f"Connection Closed: {e}")
-
-                    except Exception as e:
-                        self._update_ui_status(f"Error writing data to PLC: {e}")
-
-                    # Read data from the PLC
-                    try:
-                        self._data = await self._websockets_connector.read_data()
-                    except PLCDataParsingException as e:
-                        self._update_ui_status(f"PLC read data prasing error: {e}")
-
-                    # Push the data to the event stream
-                    self._event_stream.push(event_type=EVENT_TYPE_DATA_READ, payload={'data': self._data})
-
-                    self._update_monitor_field()
-
-                    self._calculate_statistics()
-
-            except ConnectionClosedError as e:
-                self._update_ui_status(f"Connection Closed: {e}")
-                self._communication_initialized = False
-
-            except Exception as e:
-                self._update_ui_status(f"Error: {e}")
-                time.sleep(DATA_READ_FAIL_SLEEP_TIME_SECONDS)
-
     ####################################
     ####################################
     # Statistics
     ####################################
     ####################################
 
-    def _calculate_statistics(self):
+    def _update_statistics_fields(self):
         """
-        Calculate timing statistics for the read / write cycle.
+        Show the timing statistics of the read / write cycle.
         """
-        self._actual_cyclic_read_time = time.time() - self._last_cyclic_read_time
-        
-        self._actual_cyclic_read_time_field.model.set_value(self._actual_cyclic_read_time)
+        if not self._ui_initialized:
+            return
+        self._actual_cyclic_read_time_field.model.set_value(self._engine.last_cycle_time)
+        self._average_cyclic_read_time_field.model.set_value(self._engine.average_latency)
+        self._worst_cyclic_read_time_field.model.set_value(self._engine.worst_latency)
 
-        self._average_latency = self.rolling_average(self._average_latency, self._actual_cyclic_read_time)
-        self._average_cyclic_read_time_field.model.set_value(self._average_latency)
+    def _update_refresh_period_field(self, period):
+        if self._ui_initialized:
+            self._current_refresh_period_field.model.set_value(period * 1000)
 
-        if (self._actual_cyclic_read_time > self._worst_latency):
-            self._worst_latency = self._actual_cyclic_read_time
-            self._worst_cyclic_read_time_field.model.set_value(self._worst_latency)
-        
-        # Reset for next scan
-        self._last_cyclic_read_time = time.time()
-
-    def rolling_average(self, average, new):
-        """Calculate a rolling average over a given number of samples."""
-        NUM_SAMPLES = 10
-        average -= average / NUM_SAMPLES
-        average += new / NUM_SAMPLES
-        return average
-    
     def _reset_worst_latency(self):
-        self._worst_latency = 0
+        self._engine.reset_worst_latency()
+        self._update_statistics_fields()
 
     ####################################
     ####################################
@@ -426,44 +401,84 @@ class UIBuilder:
         self.settings_interface.set("/persistent/" + EXTENSION_NAME + "/" + name, value)
 
     def _on_plc_ip_changed(self, value):
-        self._websockets_connector.ip = value.get_value_as_string()
-        self._communication_initialized = False
-        if self._websockets_connector:
-            self._disconnect_command = True
+        self._engine.driver.ip = value.get_value_as_string()
+        self._engine.reconnect()
 
     def _on_plc_port_changed(self, value):
-        self._websockets_connector.port = value.get_value_as_int()
-        self._communication_initialized = False
-        if self._websockets_connector:
-            self._disconnect_command = True
+        self._engine.driver.port = value.get_value_as_int()
+        self._engine.reconnect()
 
     def _on_refresh_rate_changed(self, value):
-        self._refresh_rate = value.get_value_as_int()
+        self._engine.refresh_rate = value.get_value_as_int()
 
-    def _toggle_communication_enable(self, state):
-        self._enable_communication = state.get_value_as_bool()
-        if not self._enable_communication:
-            self._disconnect_command = True
-            self._communication_initialized = False
+    def _on_adaptive_refresh_rate_changed(self, value):
+        self._engine.adaptive_refresh_rate = value.get_value_as_bool()
 
-    def save_settings(self):
-        self.set_setting('REFRESH_RATE', self._refresh_rate)
-        self.set_setting('PLC_IP_ADDRESS', self._websockets_connector.ip)
-        self.set_setting('PLC_PORT', self._websockets_connector.port)
-        self.set_setting('ENABLE_COMMUNICATION', self._enable_communication)
+    def _on_max_refresh_rate_changed(self, value):
+        self._engine.max_refresh_rate = value.get_value_as_int()
 
-    def load_settings(self):
-        self._refresh_rate = self.get_setting('REFRESH_RATE')
-        self._websockets_connector.ip = self.get_setting('PLC_IP_ADDRESS')
-        self._websockets_connector.port = self.get_setting('PLC_PORT')
-        self._enable_communication = self.get_setting('ENABLE_COMMUNICATION')
+    def _on_target_utilization_changed(self, value):
+        self._engine.target_utilization = value.get_value_as_float()
+
+    def _on_write_min_spacing_changed(self, value):
+        self._engine.write_min_spacing = value.get_value_as_int()
 
-        self._refresh_rate_field.model.set_value(self._refresh_rate)
-        self._plc_ip_field.model.set_value(self._websockets_connector.ip)
-        self._plc_port_field.model.set_value(self._websockets_connector.port)
-        self._enable_communication_checkbox.model.set_value(self._enable_communication)
-        self._communication_initialized = False
-        if self._websockets_connector:
-            self._disconnect_command = True
+    def _tick_source_index(self):
+        return TICK_SOURCES.index(self._engine.tick_source_name) if self._engine.tick_source_name in TICK_SOURCES else 0
 
+    def _on_tick_source_changed(self, value):
+        self._engine.tick_source_name = TICK_SOURCES[value.get_value_as_int()]
 
+    def _on_lockstep_timeout_changed(self, value):
+        self._engine.lockstep_timeout = value.get_value_as_int()
+
+    def _on_publish_on_change_changed(self, value):
+        self._engine.publish_on_change = value.get_value_as_bool()
+
+    def _on_flat_output_changed(self, value):
+        self._engine.flat_output = value.get_value_as_bool()
+
+    def _toggle_communication_enable(self, state):
+        self._engine.enable_communication = state.get_value_as_bool()
+
+    def save_settings(self):
+        self.set_setting('REFRESH_RATE', self._engine.refresh_rate)
+        self.set_setting('PLC_IP_ADDRESS', self._engine.driver.ip)
+        self.set_setting('PLC_PORT', self._engine.driver.port)
+        self.set_setting('ENABLE_COMMUNICATION', self._engine.enable_communication)
+        self.set_setting('PUBLISH_ON_CHANGE', self._engine.publish_on_change)
+        self.set_setting('FLAT_OUTPUT', self._engine.flat_output)
+        self.set_setting('WRITE_MIN_SPACING', self._engine.write_min_spacing)
+        self.set_setting('TICK_SOURCE', self._engine.tick_source_name)
+        self.set_setting('LOCKSTEP_TIMEOUT', self._engine.lockstep_timeout)
+        self.set_setting('ADAPTIVE_REFRESH_RATE', self._engine.adaptive_refresh_rate)
+        self.set_setting('MAX_REFRESH_RATE', self._engine.max_refresh_rate)
+        self.set_setting('TARGET_UTILIZATION', self._engine.target_utilization)
+
+    def load_settings(self):
+        self._engine.refresh_rate = self.get_setting('REFRESH_RATE')
+        self._engine.adaptive_refresh_rate = self.get_setting('ADAPTIVE_REFRESH_RATE')
+        self._engine.max_refresh_rate = self.get_setting('MAX_REFRESH_RATE')
+        self._engine.target_utilization = self.get_setting('TARGET_UTILIZATION')
+        self._engine.driver.ip = self.get_setting('PLC_IP_ADDRESS')
+        self._engine.driver.port = self.get_setting('PLC_PORT')
+        self._engine.enable_communication = self.get_setting('ENABLE_COMMUNICATION')
+        self._engine.publish_on_change = self.get_setting('PUBLISH_ON_CHANGE')
+        self._engine.flat_output = self.get_setting('FLAT_OUTPUT')
+        self._engine.write_min_spacing = self.get_setting('WRITE_MIN_SPACING')
+        self._engine.tick_source_name = self.get_setting('TICK_SOURCE')
+        self._engine.lockstep_timeout = self.get_setting('LOCKSTEP_TIMEOUT')
+
+        self._refresh_rate_field.model.set_value(self._engine.refresh_rate)
+        self._plc_ip_field.model.set_value(self._engine.driver.ip)
+        self._plc_port_field.model.set_value(self._engine.driver.port)
+        self._enable_communication_checkbox.model.set_value(self._engine.enable_communication)
+        self._publish_on_change_checkbox.model.set_value(self._engine.publish_on_change)
+        self._flat_output_checkbox.model.set_value(self._engine.flat_output)
+        self._write_min_spacing_field.model.set_value(self._engine.write_min_spacing)
+        self._lockstep_timeout_field.model.set_value(self._engine.lockstep_timeout)
+        self._adaptive_refresh_rate_checkbox.model.set_value(self._engine.adaptive_refresh_rate)
+        self._max_refresh_rate_field.model.set_value(self._engine.max_refresh_rate)
+        self._target_utilization_field.model.set_value(self._engine.target_utilization)
+        self._tick_source_combo.model.get_item_value_model().set_value(self._tick_source_index())
+        self._engine.reconnect()
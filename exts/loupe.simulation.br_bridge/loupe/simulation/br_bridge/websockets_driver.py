@@ -9,18 +9,88 @@
 
 import asyncio
 import json
+import sys
 import time
-import re
+from functools import partial
 
 import websockets.client
 from websockets.exceptions import ConnectionClosedError
 
+from .deadband import DeadbandFilter
+from .samples import SampleStore
+from .history import HistoryStore
+from .plc_types import TypeSchema
+from .nested_view import NestedView, build_shape, compile_path, insert_path, replace_path, _MergedRanges
+from .compact_snapshot import CompactBuilder
+from .tracing import Tracer
+from .metrics import MetricsRegistry
+from .read_ranges import parse_range, expand_ranges
+from .read_groups import ReadGroup, MISSING
+
 class PLCDataParsingException(Exception):
     pass
 
 class WebsocketsConnectionException(Exception):
     pass
 
+class ResponseTimeoutException(Exception):
+    pass
+
+class LinkDeadException(ResponseTimeoutException):
+    pass
+
+_NOT_PUBLISHED = object()
+
+# Asks for nothing, but is still answered. Checks the link while the read list is empty.
+_HEARTBEAT_PAYLOAD = json.dumps({"type": "read", "data": []})
+
+def decode_response(response_json):
+    """
+    Decodes a raw response frame. Doesn't touch any driver state, so it can run in a thread or process pool.
+
+    Raises:
+        ValueError: If the frame isn't valid JSON.
+        PLCDataParsingException: If the frame isn't a response.
+
+    """
+    response = json.loads(response_json)
+    if "data" not in response:
+        raise PLCDataParsingException("No data in response")
+    elif "type" not in response:
+        raise PLCDataParsingException("No type in response")
+    return response
+
+class _ReadRequest():
+    """The cyclic read request of a read list, with the position of every range in it."""
+
+    def __init__(self, read_names : list, ranges : dict, range_requests : bool):
+        self.range_requests = range_requests
+        self.names = [plc_var for plc_var in read_names if plc_var not in ranges]
+        self.singles = set(self.names)
+        self.single_count = len(self.names)
+        self.ranges = [ranges[plc_var] for plc_var in read_names if plc_var in ranges]
+        self.elements = {}
+        self.arrays = {}
+        for read_range in self.ranges:
+            if range_requests:
+                if read_range.base not in self.arrays:
+                    self.names.append(read_range.base)
+                self.arrays.setdefault(read_range.base, []).append(read_range)
+            else:
+                self.names.extend(read_range.element_names)
+            for index, name in enumerate(read_range.element_names, read_range.start):
+                self.elements[name] = (read_range, index)
+        self.payload_json = json.dumps({"type": "read", "data": self.names})
+
+class _InFlight():
+    """A read request waiting for its response."""
+
+    def __init__(self, payload_json, response, send_time, start):
+        self.payload_json = payload_json
+        self.response = response
+        self.send_time = send_time
+        self.start = start
+
 class WebsocketsDriver():
     """
     A class that represents an websockets driver. It contains a list of variables to read from the target device and provides methods to read and write data.
@@ -30,6 +100,29 @@ class WebsocketsDriver():
         port (int): port of the PLC
         connection (WebSocketClientProtocol):
         _read_names (list): A list of plc var names for reading data.
+        data_changed (bool): True if any published value changed during the last read.
+        samples (SampleStore): The last few timestamped samples of every numeric variable.
+        history (HistoryStore): The optional history of selected numeric variables.
+        last_read_timestamp (float): Estimated time the last read values were valid at.
+        types (TypeSchema): Optional PLC types, used to normalize read values and to validate written values.
+        flat_output (bool): If True, read_data() returns values keyed by the full variable name, instead of a nested tree.
+        compact_output (bool): If True, and flat_output isn't set, read_data() returns a compact snapshot, where
+            structs are Records that share the member names of their type. See compact_snapshot.py.
+        tracer (Tracer): Optional timing spans of the connect, write, read, decode and parse phases.
+        metrics (MetricsRegistry): Counters of messages, bytes, errors and writes, and read and write latencies.
+        range_requests (bool): If True, read ranges are requested by the name of their array, and sliced from the
+            whole array in the response. Otherwise, their elements are requested one by one.
+        response_timeout (float): If set, the time in seconds a read request waits for its response. A request that
+            times out stays in flight, and the next read waits for its response instead of sending another request.
+        max_missed_responses (int): After this many response timeouts in a row, the link is declared dead and the
+            connection is dropped.
+        heartbeat_interval (float): While the read list is empty, an empty read is sent this often, in seconds, so a
+            dead link is still detected. Only if response_timeout is set.
+        read_groups (dict): Groups of variables that are read when their trigger fires, instead of every cycle, by
+            name. See add_read_group().
+        decode_executor (Executor): If set, cyclic responses are decoded in this thread or process pool while the
+            next request is on the wire, and parsed on the event loop. read_data() then returns the previous frame.
+            Only the JSON decoding runs in the pool: the driver state is only touched from the event loop thread.
 
     """
 
@@ -44,20 +137,251 @@ class WebsocketsDriver():
 
         self._read_names = list()
 
-    def add_read(self, plc_var : str):
+        # Read ranges in the read list, by name, and the request compiled from the read list
+        self._ranges = {}
+        self.range_requests = False
+        self._request = None
+
+        # The decoded frame waiting to be parsed by the next read_data(), when decoding is offloaded
+        self.decode_executor = None
+        self._pending_frame = None
+        self._last_data = {}
+
+        # Variables read when a trigger fires, by group name. Their values are kept in the data between reads.
+        self.read_groups = {}
+        self._group_variables = []
+
+        # Application-level heartbeat. A silently dropped link otherwise blocks the read forever.
+        self.response_timeout = None
+        self.max_missed_responses = 3
+        self.heartbeat_interval = 1.0
+        self._in_flight = None
+        self._missed_responses = 0
+        self._last_response_time = 0
+
+        # Every variable gets a slot when it is first added to the read list. Slots are never reassigned.
+        self._slots = {}
+        self._slot_values = []
+        self.flat_output = False
+        self.compact_output = False
+
+        # The interned name and the interned path in the nested data of every variable, compiled when it is added
+        self._paths = {}
+
+        # Lazy nested view and compact snapshots of the slot values. The shape follows the read list.
+        self._shape = None
+        self._view = None
+        self._compact_builder = None
+
+        self._deadbands = DeadbandFilter()
+        self._published_values = {}
+        self.data_changed = False
+
+        self.samples = SampleStore()
+        self.history = HistoryStore()
+        self.last_read_timestamp = None
+        # Costs of the last read, in seconds
+        self.last_round_trip_time = None
+        self.last_parse_time = None
+
+        self.types = TypeSchema()
+        self.tracer = Tracer()
+
+        self.metrics = MetricsRegistry()
+        self._metric_connects = self.metrics.counter('br_bridge_connects_total', "Successful connections to the PLC")
+        self._metric_messages_sent = self.metrics.counter('br_bridge_messages_sent_total', "Messages sent to the PLC")
+        self._metric_messages_received = self.metrics.counter('br_bridge_messages_received_total', "Messages received from the PLC")
+        self._metric_bytes_sent = self.metrics.counter('br_bridge_bytes_sent_total', "Bytes sent to the PLC")
+        self._metric_bytes_received = self.metrics.counter('br_bridge_bytes_received_total', "Bytes received from the PLC")
+        self._metric_parse_errors = self.metrics.counter('br_bridge_parse_errors_total', "Responses that could not be decoded or parsed")
+        self._metric_writes = self.metrics.counter('br_bridge_writes_total', "Write messages sent to the PLC")
+        self._metric_variables_written = self.metrics.counter('br_bridge_variables_written_total', "Variables written to the PLC")
+        self._metric_read_latency = self.metrics.histogram('br_bridge_read_latency_seconds', "Round trip time of read requests")
+        self._metric_write_latency = self.metrics.histogram('br_bridge_write_latency_seconds', "Time to send write messages")
+        self._metric_response_timeouts = self.metrics.counter('br_bridge_response_timeouts_total', "Read requests not answered within the response timeout")
+        self._metric_dead_links = self.metrics.counter('br_bridge_dead_links_total', "Connections dropped after too many response timeouts")
+        self._metric_group_reads = self.metrics.counter('br_bridge_group_reads_total', "Triggered reads of read groups")
+        self._metric_read_list_size = self.metrics.gauge('br_bridge_read_list_size', "Variables in the cyclic read list")
+
+    @property
+    def published_values(self):
+        """The last published value of every variable, as a flat dictionary. {"Program:my_struct.my_var": 1, ...}"""
+        return self._published_values
+
+    def add_read(self, plc_var : str, deadband=None, relative_deadband=None):
         """
         Adds a variable to the cyclic read list.
 
+        A range of array elements can be added as one entry, with an inclusive index range: "Program:buf[0..999]".
+        Its value is a list indexed like the PLC array, with None below the start of the range. Deadbands, samples
+        and history don't apply to ranges.
+
         Args:
             plc_var (str): The plc_var of the data to be read. "Program:my_struct.my_array[0].my_var"
+            deadband (float): Optional absolute deadband for numeric values.
+            relative_deadband (float): Optional deadband relative to the last published value (0.01 = 1%).
+
+        Raises:
+            ValueError: If plc_var is a range that ends before it starts.
 
         """
         if plc_var not in self._read_names:
+            read_range = parse_range(plc_var)
+            if read_range is not None:
+                self._ranges[plc_var] = read_range
             self._read_names.append(plc_var)
+            self._request = None
+            self._pending_frame = None
+            self._register(plc_var, read_range)
+            self._metric_read_list_size.set(len(self._read_names))
+        if deadband is not None or relative_deadband is not None:
+            self.set_deadband(plc_var, deadband or 0.0, relative_deadband or 0.0)
+
+    def _register(self, plc_var : str, read_range=None):
+        """Gives a variable its slot and its compiled path, if it doesn't have them yet, and resets the shape."""
+        if plc_var not in self._slots:
+            self._slots[plc_var] = len(self._slot_values)
+            self._slot_values.append(None)
+            path_name = read_range.base if read_range is not None else plc_var
+            self._paths[plc_var] = (sys.intern(plc_var), compile_path(path_name))
+        self._shape = None
+        self._compact_builder = None
+
+    def add_read_group(self, name : str, variables : list, trigger : str, predicate=None, fallback_period=None):
+        """
+        Adds a group of variables that is read once when a trigger fires, instead of every cycle. The trigger is
+        added to the cyclic read list, and evaluated after every cyclic read. A triggered group is read in the same
+        cycle, with one extra request. Its values stay in the data until the group is read again.
+        A group with the same name is replaced.
+
+        Args:
+            name (str): The name of the group.
+            variables (list): The variables of the group. ["Program:recipe.speed", "Program:recipe.steps[0..9]"]
+            trigger (str): The trigger variable. "Program:recipeLoaded"
+            predicate (Callable[[any], bool]): Optional. If set, the group is read when this becomes true for the
+                trigger's value, instead of whenever the value changes.
+            fallback_period (float): Optional, read the group at least this often, in seconds.
+
+        Raises:
+            ValueError: If a variable is a range that ends before it starts.
+
+        """
+        read_ranges = [parse_range(plc_var) for plc_var in variables]
+        self.add_read(trigger)
+        self.read_groups[name] = ReadGroup(name, variables, trigger, predicate, fallback_period)
+        for plc_var, read_range in zip(variables, read_ranges):
+            self._register(plc_var, read_range)
+        self._update_group_variables()
+
+    def remove_read_group(self, name : str):
+        """Removes a read group. Its trigger stays in the cyclic read list, and its last values in the data_view()."""
+        if self.read_groups.pop(name, None) is not None:
+            self._update_group_variables()
+
+    def _update_group_variables(self):
+        variables = dict.fromkeys(plc_var for group in self.read_groups.values() for plc_var in group.variables)
+        self._group_variables = [plc_var for plc_var in variables if plc_var not in self._read_names]
+        self._shape = None
+        self._compact_builder = None
+
+    def reads(self, plc_var : str):
+        """Returns True if a variable is in the cyclic read list by itself, not as an element of a read range."""
+        return plc_var in self._compile_request().singles
+
+    def accessor(self, plc_var : str):
+        """
+        Returns a precompiled getter for the latest published value of a variable, adding it to the cyclic read list.
+        The getter reads the variable's slot directly, without any name lookup or tree walk.
+        Accessors stay valid when the read list is cleared, and return None until the variable is read again.
+
+        Args:
+            plc_var (str): The name of the variable. "Program:axis[3].pos"
+
+        Returns:
+            Callable[[], any]: Returns the value, or None if it hasn't been read yet.
+
+        """
+        self.add_read(plc_var)
+        return partial(self._slot_values.__getitem__, self._slots[plc_var])
+
+    def data_view(self):
+        """
+        Returns a read-only view of the latest values, shaped like the nested output of read_data().
+        Sub-views are only built when they are accessed. The view is cached until the next read.
+
+        Returns:
+            NestedView: {"Program": {"my_struct": {"my_var": 1}}, ...}
+
+        """
+        if self._view is None:
+            self._view = NestedView(self._get_shape(), list(self._slot_values))
+        return self._view
+
+    def _get_shape(self):
+        """The shape of the nested data, built once per read list."""
+        if self._shape is None:
+            ranges = dict(self._ranges)
+            shape = {}
+            for plc_var in self._read_names:
+                if plc_var not in ranges:
+                    shape[plc_var] = self._slots[plc_var]
+            for plc_var in self._group_variables:
+                read_range = parse_range(plc_var)
+                if read_range is None:
+                    shape[plc_var] = self._slots[plc_var]
+                else:
+                    ranges[plc_var] = read_range
+            # Ranges of the same array are merged into one list, as in the nested output
+            ranges_by_base = {}
+            for plc_var, read_range in ranges.items():
+                ranges_by_base.setdefault(read_range.base, []).append((self._slots[plc_var], read_range.start, read_range.end))
+            for base, base_ranges in ranges_by_base.items():
+                shape[base] = base_ranges[0][0] if len(base_ranges) == 1 else _MergedRanges(base_ranges)
+            self._shape = build_shape(shape)
+        return self._shape
+
+    def compact_snapshot(self):
+        """
+        Returns the latest values as a compact snapshot, shaped like the nested output of read_data().
+        Structs are Records: their values are kept in a tuple, and their member names in a key table that is shared
+        by every struct with the same members. Member names are interned once, when variables are added.
+
+        Returns:
+            Record: {"Program": {"my_struct": {"my_var": 1}}, ...}, as Records and lists.
+
+        """
+        if self._compact_builder is None:
+            self._compact_builder = CompactBuilder(self._get_shape())
+        return self._compact_builder.build(self._slot_values)
+
+    def set_deadband(self, pattern : str, absolute=0.0, relative=0.0):
+        """
+        Sets the deadband for a variable, or for every variable matching a pattern.
+        Changes smaller than the deadband are not published, the last published value is kept instead.
+
+        Args:
+            pattern (str): A PLC var name, or a pattern using '*' and '?' wildcards. "Program:axis[*].pos"
+            absolute (float): Changes smaller than this amount are suppressed.
+            relative (float): Changes smaller than this fraction of the last published value are suppressed.
+
+        """
+        self._deadbands.set_deadband(pattern, absolute, relative)
 
     def clear_read_list(self):
         """Clear the current list of variables to read from the PLC."""
         self._read_names = []
+        self._ranges = {}
+        self.read_groups = {}
+        self._group_variables = []
+        self._request = None
+        self._pending_frame = None
+        self._metric_read_list_size.set(0)
+        self._slot_values[:] = [None] * len(self._slot_values)
+        self._shape = None
+        self._view = None
+        self._compact_builder = None
+        self._deadbands.reset()
+        self.samples.clear()
 
     async def write_data(self, data : dict ):
         """
@@ -68,164 +392,506 @@ class WebsocketsDriver():
             e.g.
             data = {'MAIN:b_Execute': False, 'MAIN:str_TestString': 'Goodbye World', 'MAIN:r32_TestReal': 54.321}
 
+        Raises:
+            PLCTypeException: If any value is not valid for its variable's type. Nothing is written.
+
         """
-        payload = {
-            "type": "write",
-            "data": data
-        }
-        payload_json = json.dumps(payload)
-        await self._connection.send(payload_json)
+        with self.tracer.span("write", variables=len(data)):
+            if self.types:
+                data = self.types.encode_all(data)
+            payload = {
+                "type": "write",
+                "data": data
+            }
+            payload_json = json.dumps(payload)
+            start = time.perf_counter()
+            await self._connection.send(payload_json)
+            self._metric_write_latency.observe(time.perf_counter() - start)
+        self._metric_writes.inc()
+        self._metric_variables_written.inc(len(data))
+        self._metric_messages_sent.inc()
+        self._metric_bytes_sent.inc(len(payload_json))
 
     async def read_data(self):
         """
         Reads all variables from the cyclic read list.
 
         Returns:
-            dict: A dictionary containing the parsed data from the PLC
+            dict: A dictionary containing the parsed data from the PLC. Nested by default, or keyed by the full
+            variable name if flat_output is set.
 
         """
         plc_var_dict = {}
 
         if not self._read_names:
+            if self.response_timeout is not None and time.monotonic() - self._last_response_time >= self.heartbeat_interval:
+                await self._exchange([], _HEARTBEAT_PAYLOAD)
+            # Publish the empty result once after the read list is cleared
+            self.data_changed = bool(self._published_values)
+            self._published_values = {}
+            self._last_data = plc_var_dict
             return plc_var_dict
 
-        # Send request for data
-        payload_obj = {
-            "type": "read",
-            "data": self._read_names
-        }
-        payload_json = json.dumps(payload_obj)
-
-        results = await asyncio.gather(
-            self._connection.send(payload_json),
-            self._connection.recv()
-        )
-        response_json = results[1] # get the return from results' second function
+        request = self._compile_request()
+        if self.decode_executor is not None:
+            plc_var_dict = await self._read_data_pipelined(request)
+        else:
+            response, self.last_read_timestamp = await self._request_read(request.names, request.payload_json)
+            plc_var_dict = self._parse_plc_response(response, self.last_read_timestamp)
 
-        # Wait for response
-        response = json.loads(response_json)
+        if self.read_groups:
+            plc_var_dict = await self._read_triggered_groups(plc_var_dict)
+
+        return plc_var_dict
 
-        if "data" not in response:
-            raise PLCDataParsingException("No data in response")
-        elif "type" not in response:
-            raise PLCDataParsingException("No type in response")
+    async def _read_triggered_groups(self, plc_var_dict):
+        """
+        Evaluates the triggers of the read groups on the values just read, reads the triggered groups with one
+        request, and adds the last values of every group to the data. The data may have been published already, e.g.
+        when no new frame arrived, so it isn't modified: the values are added to a copy.
+
+        Returns:
+            dict: The data, with the values of the read groups.
+
+        """
+        now = time.time()
+        due = [group for group in self.read_groups.values()
+               if group.update(self._published_values.get(group.trigger, MISSING), now)]
+        if due:
+            names = list(dict.fromkeys(plc_var for group in due for plc_var in group.variables))
+            with self.tracer.span("group read", variables=len(names)):
+                values = await self.read_variables(names)
+            self._metric_group_reads.inc(len(due))
+            for group in due:
+                group.read_completed(now)
+            for plc_var, plc_var_value in values.items():
+                slot = self._slots.get(plc_var)
+                if slot is None:
+                    continue
+                plc_var = self._paths[plc_var][0]
+                if self._published_values.get(plc_var, _NOT_PUBLISHED) != plc_var_value:
+                    self._published_values[plc_var] = plc_var_value
+                    self.data_changed = True
+                self._slot_values[slot] = plc_var_value
+            self._view = None
+
+        if self.compact_output:
+            # Compact snapshots are rebuilt from the slots, which hold the group values too
+            return self.compact_snapshot() if due else plc_var_dict
+        group_values = [(self._paths[plc_var], self._slot_values[self._slots[plc_var]]) for plc_var in self._group_variables]
+        group_values = [(paths, plc_var_value) for paths, plc_var_value in group_values if plc_var_value is not None]
+        if not group_values:
+            return plc_var_dict
+        if self.flat_output:
+            plc_var_dict = dict(plc_var_dict)
+            for paths, plc_var_value in group_values:
+                plc_var_dict[paths[0]] = plc_var_value
         else:
-            plc_var_dict = self._parse_plc_response(response)
-            
+            copied = set()
+            for paths, plc_var_value in group_values:
+                plc_var_dict = replace_path(plc_var_dict, paths[1], plc_var_value, copied)
         return plc_var_dict
+
+    async def _read_data_pipelined(self, request):
+        """
+        Sends the next read request while the previous response is parsed, and hands the new response to the decode
+        executor. Frames are parsed one at a time, in the order they were received.
+
+        Returns:
+            dict: The data of the previous response. The last data, unchanged, if there was no previous response.
+
+        """
+        pending, self._pending_frame = self._pending_frame, None
+        if pending is None:
+            response_json, timestamp = await self._exchange(request.names, request.payload_json)
+            self.data_changed = False
+            result = self._last_data
+        else:
+            # The exchange must finish even if parsing fails, so the next request doesn't receive this response
+            exchanged, result = await asyncio.gather(self._exchange(request.names, request.payload_json),
+                                                     self._parse_pending_frame(*pending),
+                                                     return_exceptions=True)
+            if isinstance(exchanged, BaseException):
+                raise exchanged
+            response_json, timestamp = exchanged
+        decoded = asyncio.get_running_loop().run_in_executor(self.decode_executor, decode_response, response_json)
+        self._pending_frame = (decoded, timestamp)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    async def _parse_pending_frame(self, decoded, timestamp):
+        """Waits for an offloaded decode, and parses the response on the event loop, which owns the driver state."""
+        with self.tracer.span("decode wait"):
+            try:
+                response = await decoded
+            except (ValueError, PLCDataParsingException):
+                self._metric_parse_errors.inc()
+                raise
+        self.last_read_timestamp = timestamp
+        self._last_data = self._parse_plc_response(response, timestamp)
+        return self._last_data
+
+    async def read_variables(self, plc_vars : list):
+        """
+        Reads variables once, whether or not they are in the cyclic read list.
+        The values are returned as they are sent by the PLC, without deadbands or sampling.
+
+        Args:
+            plc_vars (list): The names of the variables to read. ["Program:my_struct.my_var", ...]
+
+        Returns:
+            dict: A flat dictionary of variable names and values. {"Program:my_struct.my_var": 1, ...}
+
+        """
+        if not plc_vars:
+            return {}
+
+        names, read_ranges = expand_ranges(plc_vars)
+        response, _ = await self._request_read(names)
+        while response["type"] == "writeresponse":
+            # The confirmation of a write sent before this request, e.g. by a confirmed write. The read response follows.
+            response = await self._receive_response()
+        if response["type"] != "readresponse":
+            self._metric_parse_errors.inc()
+            raise PLCDataParsingException("Unexpected response type: " + str(response["type"]))
+        types = self.types
+        try:
+            if types:
+                values = {plc_var: types.decode(plc_var, value) for var_dict in response["data"] for plc_var, value in var_dict.items()}
+            else:
+                values = {plc_var: value for var_dict in response["data"] for plc_var, value in var_dict.items()}
+        except Exception as e:
+            self._metric_parse_errors.inc()
+            raise PLCDataParsingException(str(e)) from e
+        for read_range in read_ranges:
+            read_range.values[read_range.start:] = [values.pop(name, None) for name in read_range.element_names]
+            values[read_range.name] = read_range.values
+        return values
+
+    def _compile_request(self):
+        """
+        Returns the cyclic read request, compiled once per read list.
+        Single variables are requested first, then every range, each one either element by element or as its array.
+        """
+        if self._request is None or self._request.range_requests != self.range_requests:
+            self._request = _ReadRequest(self._read_names, self._ranges, self.range_requests)
+        return self._request
+
+    async def _request_read(self, plc_vars : list, payload_json=None):
+        """
+        Sends a read request and waits for the response.
+
+        Args:
+            plc_vars (list): The names to read.
+            payload_json (str): The request, if already encoded.
+
+        Returns:
+            tuple: The decoded response, and the estimated time the values were valid at.
+
+        """
+        response_json, timestamp = await self._exchange(plc_vars, payload_json)
+
+        with self.tracer.span("decode", size=len(response_json)):
+            try:
+                response = decode_response(response_json)
+            except (ValueError, PLCDataParsingException):
+                self._metric_parse_errors.inc()
+                raise
+
+        return response, timestamp
+
+    async def _receive_response(self):
+        """
+        Receives and decodes the next frame without sending a request, within the response timeout if there is one.
+
+        Returns:
+            dict: The decoded frame.
+
+        """
+        if self.response_timeout is None:
+            response_json = await self._connection.recv()
+            self._metric_messages_received.inc()
+            self._metric_bytes_received.inc(len(response_json))
+        else:
+            in_flight = self._in_flight = _InFlight(None, asyncio.ensure_future(self._connection.recv()),
+                                                    time.time(), time.perf_counter())
+            response_json = await self._receive_in_flight(in_flight)
+
+        with self.tracer.span("decode", size=len(response_json)):
+            try:
+                return decode_response(response_json)
+            except (ValueError, PLCDataParsingException):
+                self._metric_parse_errors.inc()
+                raise
+
+    async def _exchange(self, plc_vars : list, payload_json=None):
+        """
+        Sends a read request and receives the raw response.
+
+        Returns:
+            tuple: The response frame, and the estimated time the values were valid at.
+
+        """
+        # Send request for data
+        if payload_json is None:
+            payload_obj = {
+                "type": "read",
+                "data": plc_vars
+            }
+            payload_json = json.dumps(payload_obj)
+
+        if self.response_timeout is not None:
+            return await self._exchange_with_deadline(payload_json, len(plc_vars))
+
+        send_time = time.time()
+        start = time.perf_counter()
+        with self.tracer.span("read send/recv", variables=len(plc_vars)):
+            results = await asyncio.gather(
+                self._connection.send(payload_json),
+                self._connection.recv()
+            )
+        response_json = results[1] # get the return from results' second function
+        self.last_round_trip_time = time.perf_counter() - start
+        self._metric_read_latency.observe(self.last_round_trip_time)
+        self._metric_messages_sent.inc()
+        self._metric_bytes_sent.inc(len(payload_json))
+        self._metric_messages_received.inc()
+        self._metric_bytes_received.inc(len(response_json))
+
+        # The PLC sampled the values somewhere between the request and the response, estimate the midpoint
+        timestamp = (send_time + time.time()) / 2
+
+        return response_json, timestamp
+
+    async def _exchange_with_deadline(self, payload_json, variables):
+        """
+        Sends a read request, unless the same request is still in flight, and receives its response within the
+        response timeout. A response that arrives late is received by the next exchange, so it never answers another
+        request.
+
+        Returns:
+            tuple: The response frame, and the estimated time the values were valid at.
+
+        Raises:
+            ResponseTimeoutException: If the response didn't arrive in time.
+            LinkDeadException: If max_missed_responses responses in a row didn't arrive in time. The connection is
+                dropped.
+
+        """
+        in_flight = self._in_flight
+        if in_flight is not None and in_flight.payload_json != payload_json:
+            # The late response of another request, receive it before sending this one
+            with self.tracer.span("read recv late"):
+                await self._receive_in_flight(in_flight)
+            in_flight = None
+
+        if in_flight is None:
+            with self.tracer.span("read send", variables=variables):
+                send_time = time.time()
+                start = time.perf_counter()
+                await self._connection.send(payload_json)
+            self._metric_messages_sent.inc()
+            self._metric_bytes_sent.inc(len(payload_json))
+            in_flight = self._in_flight = _InFlight(payload_json, asyncio.ensure_future(self._connection.recv()),
+                                                    send_time, start)
+
+        with self.tracer.span("read recv", variables=variables):
+            response_json = await self._receive_in_flight(in_flight)
+        self.last_round_trip_time = time.perf_counter() - in_flight.start
+        self._metric_read_latency.observe(self.last_round_trip_time)
+
+        timestamp = (in_flight.send_time + time.time()) / 2
+        return response_json, timestamp
+
+    async def _receive_in_flight(self, in_flight):
+        """Waits up to the response timeout for the response of the request in flight."""
+        try:
+            response_json = await asyncio.wait_for(asyncio.shield(in_flight.response), self.response_timeout)
+        except asyncio.TimeoutError:
+            self._missed_responses += 1
+            self._metric_response_timeouts.inc()
+            timeout_ms = self.response_timeout * 1000
+            if self._missed_responses >= self.max_missed_responses:
+                missed = self._missed_responses
+                self._drop_dead_link()
+                raise LinkDeadException(f"No response in {missed} tries of {timeout_ms:.0f} ms") from None
+            raise ResponseTimeoutException(f"No response within {timeout_ms:.0f} ms "
+                                           f"({self._missed_responses}/{self.max_missed_responses})") from None
+        except BaseException:
+            if in_flight.response.done():
+                self._in_flight = None
+            raise
+        self._in_flight = None
+        self._missed_responses = 0
+        self._last_response_time = time.monotonic()
+        self._metric_messages_received.inc()
+        self._metric_bytes_received.inc(len(response_json))
+        return response_json
+
+    def _drop_dead_link(self):
+        """Forgets the request in flight and aborts the connection, without waiting for the PLC."""
+        self._metric_dead_links.inc()
+        self._reset_in_flight()
+        transport = getattr(self._connection, 'transport', None)
+        if transport is not None:
+            transport.abort()
+
+    def _reset_in_flight(self):
+        if self._in_flight is not None:
+            self._in_flight.response.cancel()
+        self._in_flight = None
+        self._missed_responses = 0
     
-    def _parse_plc_response(self, response):
+    def _parse_plc_response(self, response, timestamp=None):
+        start = time.perf_counter()
+        with self.tracer.span("parse"):
+            try:
+                return self._parse_plc_response_untraced(response, timestamp)
+            except PLCDataParsingException:
+                self._metric_parse_errors.inc()
+                raise
+            finally:
+                self.last_parse_time = time.perf_counter() - start
+
+    def _parse_plc_response_untraced(self, response, timestamp=None):
         """
         Parses the dictionary of variables sent from the PLC.
         This function assumes response is a dictionary with a "type" and "data" key
         
         Args:
             response (dict): A dictionary containing the data to be parsed
+            timestamp (float): The time the values were valid at. If given, numeric values are added to the samples.
         """
         plc_var_dict = {}
+        self.data_changed = False
+        self._view = None
+        types = self.types if self.types else None
+        slots, slot_values, flat_output, paths = self._slots, self._slot_values, self.flat_output, self._paths
+        compact_output = self.compact_output and not flat_output
         if response["type"] == "readresponse":
             try:
-                for var_dict in response["data"]:
+                var_dicts = self._store_ranges(response["data"], types) if self._ranges else response["data"]
+                for var_dict in var_dicts:
                     for plc_var, plc_var_value in var_dict.items():
-                        plc_var_dict = self._parse_flat_plc_var_to_dict(plc_var_dict,
-                                                                        plc_var,
-                                                                        plc_var_value)
+                        # Registered variables are keyed by their interned name and path, so every cycle's data
+                        # shares the same key strings
+                        registered = paths.get(plc_var)
+                        if registered is not None:
+                            plc_var = registered[0]
+                        if types:
+                            plc_var_value = types.decode(plc_var, plc_var_value)
+                        plc_var_value = self._deadbands.filter(plc_var, plc_var_value)
+                        if self._published_values.get(plc_var, _NOT_PUBLISHED) != plc_var_value:
+                            self._published_values[plc_var] = plc_var_value
+                            self.data_changed = True
+                        if timestamp is not None:
+                            self.samples.add(plc_var, timestamp, plc_var_value)
+                            self.history.add(plc_var, timestamp, plc_var_value)
+                        slot = slots.get(plc_var)
+                        if slot is not None:
+                            slot_values[slot] = plc_var_value
+                        if flat_output:
+                            plc_var_dict[plc_var] = plc_var_value
+                        elif not compact_output:
+                            insert_path(plc_var_dict,
+                                        registered[1] if registered is not None else compile_path(plc_var),
+                                        plc_var_value)
+                arrays = {}
+                paths_by_base = {}
+                for read_range in self._ranges.values():
+                    plc_var_value = list(read_range.values)
+                    if self._published_values.get(read_range.name, _NOT_PUBLISHED) != plc_var_value:
+                        self._published_values[read_range.name] = plc_var_value
+                        self.data_changed = True
+                    slot_values[slots[read_range.name]] = plc_var_value
+                    if flat_output:
+                        plc_var_dict[paths[read_range.name][0]] = plc_var_value
+                    elif compact_output:
+                        continue
+                    elif read_range.base in arrays:
+                        # Ranges of the same array are merged into one list
+                        array = arrays[read_range.base] = list(arrays[read_range.base])
+                        if len(array) <= read_range.end:
+                            array.extend([None] * (read_range.end + 1 - len(array)))
+                        array[read_range.start:read_range.end + 1] = read_range.values[read_range.start:]
+                    else:
+                        arrays[read_range.base] = plc_var_value
+                        paths_by_base[read_range.base] = paths[read_range.name][1]
+                for base, array in arrays.items():
+                    insert_path(plc_var_dict, paths_by_base[base], array)
+                if compact_output:
+                    plc_var_dict = self.compact_snapshot()
             except Exception as e:
                 raise PLCDataParsingException(str(e)) from e
         elif response["type"] == "writeresponse":
             print('succesfully wrote data')
         return plc_var_dict
 
-
-    def _ensure_list_with_index_in_dict(self, list_name, _dict, _index):
+    def _store_ranges(self, var_dicts : list, types=None):
         """
-        Ensure that dictionary has a key of list_name, that it's value is a list,
-        and that the list is long enough to include the index
+        Decodes the values of the read ranges into their arrays.
+
+        Returns:
+            list: The var dicts of the single variables.
+
         """
+        request = self._compile_request()
+        if len(var_dicts) == len(request.names):
+            # The response lists the names in the order they were requested, the ranges are sliced by position
+            offset = request.single_count
+            try:
+                if request.range_requests:
+                    for base, read_ranges in request.arrays.items():
+                        for read_range in read_ranges:
+                            read_range.store_array(var_dicts[offset][base], types)
+                        offset += 1
+                else:
+                    for read_range in request.ranges:
+                        read_range.store(var_dicts[offset:offset + len(read_range)], types)
+                        offset += len(read_range)
+                return var_dicts[:request.single_count]
+            except (KeyError, TypeError):
+                pass
+
+        # Partial, reordered or merged responses, e.g. frames from the communication worker: match by name
+        single_var_dicts = []
+        for read_range in request.ranges:
+            read_range.clear()
+        for var_dict in var_dicts:
+            single_values = {}
+            for plc_var, value in var_dict.items():
+                element = request.elements.get(plc_var)
+                if element is not None:
+                    read_range, index = element
+                    read_range.values[index] = types.decode(plc_var, value) if types else value
+                elif plc_var in request.arrays:
+                    for read_range in request.arrays[plc_var]:
+                        read_range.store_array(value, types)
+                if plc_var in request.singles:
+                    single_values[plc_var] = value
+            if single_values:
+                single_var_dicts.append(single_values)
+        return single_var_dicts
 
-        # Create list if not in dict
-        if list_name not in _dict or not isinstance(_dict[list_name], list):
-            _dict[list_name] = []
 
-        # Extend list if not long enough
-        if _index >= len(_dict[list_name]):
-            _dict[list_name].extend([None] * (_index - len(_dict[list_name]) + 1))
-    
     def _parse_flat_plc_var_to_dict(self, plc_var_dict, plc_var, value):
         """
         Convert a flat, string representation of a PLC var into a dictionary.
 
-        This function uses recursion to build up the complete dictionary of PLC variables, and values.
-        
         This is performed every read, rather than being cached, to not assume PLC variable values
         to be at their previous value if they are not being actively read. Caching can be
-        performed in the usage of this library if necessary.
+        performed in the usage of this library if necessary. Only the path of the variable is cached,
+        when it is added to the read list.
 
         Args:
             plc_var_dict (dict): The dictionary to write the value into
             plc_var (str): The variable name in flattened string form ("Program:myStruct.myVar")
             value (any): The value to write to the dictionary entry
         """
+        registered = self._paths.get(plc_var)
+        return insert_path(plc_var_dict, registered[1] if registered is not None else compile_path(plc_var), value)
 
-        name_parts = re.split('[:.]', plc_var)
-
-        if len(name_parts) > 1:
-            # Multiple parts in passed-in plc_var (e.g. Program:myStruct[3].myVar has 3 parts)
-            # From here we want to use recursion to assign a dictionary value (i.e. sub dictionary) to the first part.
-
-            first_part_is_array = '[' in name_parts[0]
-
-            ## Get pre-existing subdictionary (or create if necessary)
-            if first_part_is_array:
-                array_name, array_index = name_parts[0].split("[")
-                array_index = int(array_index[:-1])
-                
-                # Ensure array is in dictionary and is long enough
-                self._ensure_list_with_index_in_dict(array_name, plc_var_dict, array_index)
-
-                # Ensure array index location has dict-typed value
-                if not isinstance(plc_var_dict[array_name][array_index], dict):
-                    plc_var_dict[array_name][array_index] = {}
-                    
-                existing_sub_dict = plc_var_dict[array_name][array_index]
-            else:
-                member_plc_var = name_parts[0]
-                
-                ## Ensure corresponding subdictionary exists
-                if member_plc_var not in plc_var_dict or not isinstance(plc_var_dict[member_plc_var], dict):
-                    plc_var_dict[member_plc_var] = {}
-                
-                existing_sub_dict = plc_var_dict[member_plc_var]
-            
-            # Get subdictionary from using remaining part of path
-            sub_plc_var = '.'.join(name_parts[1:])
-            sub_dict = self._parse_flat_plc_var_to_dict(existing_sub_dict,
-                                                              sub_plc_var,
-                                                              value)
-            
-            # Assign result of recursive call (subdictionary) to first part
-            if first_part_is_array:
-                plc_var_dict[array_name][array_index] = sub_dict
-            else:
-                plc_var_dict[member_plc_var] = sub_dict
-        else:
-            # Only one part in passed-in plc_var
-            # Proceed to assign value
-
-            if '[' in name_parts[0]:
-                array_name, array_index = name_parts[0].split("[")
-                array_index = int(array_index[:-1])
-                
-                # Ensure array is in dictionary and is long enough
-                self._ensure_list_with_index_in_dict(array_name, plc_var_dict, array_index)
-
-                plc_var_dict[array_name][array_index] = value
-            else:
-                # Write value (regardless of whether it exists or not)
-                plc_var_dict[name_parts[0]] = value
-                
-        return plc_var_dict
-    
     async def connect(self):
         """
         Connects to the target device.
@@ -233,11 +899,19 @@ class WebsocketsDriver():
         Returns True if connection was succesful, False otherwise.
 
         """
+        # Publish everything on the first read after (re)connecting
+        self._published_values = {}
+        self._pending_frame = None
+        self._reset_in_flight()
+        self._last_response_time = time.monotonic()
+        for group in self.read_groups.values():
+            group.reset()
         try:
-            self._connection = await websockets.client.connect("ws://" + self.ip + ":" + str(self.port),
-                                                               open_timeout=3,
-                                                               ping_interval=None,  # OMJSON does not use ping/pong
-                                                               close_timeout=1) # Could potentially be shorter
+            with self.tracer.span("connect"):
+                self._connection = await websockets.client.connect("ws://" + self.ip + ":" + str(self.port),
+                                                                   open_timeout=3,
+                                                                   ping_interval=None,  # OMJSON does not use ping/pong
+                                                                   close_timeout=1) # Could potentially be shorter
         except ConnectionClosedError as e:
             raise WebsocketsConnectionException("Connection Closed Error: " + str(e)) from e
         except asyncio.TimeoutError as e:
@@ -246,8 +920,9 @@ class WebsocketsDriver():
             raise WebsocketsConnectionException("Connection Refused Error, check IP and Port: " + str(e)) from e
         except Exception as e:
             raise WebsocketsConnectionException("Connection Error: " + str(e)) from e
-        if self._connection:
-            return self._connection.open
+        if self._connection and self._connection.open:
+            self._metric_connects.inc()
+            return True
         else:
             return False
         
@@ -0,0 +1,142 @@
+'''
+  File: **write_overlay.py**
+  Copyright (c) 2024 Loupe
+  https://loupe.team
+
+  This file is part of Omniverse_BnR_Bridge_Extension, licensed under the MIT License.
+
+'''
+
+from .nested_view import compile_path, replace_path
+from .compact_snapshot import Record, to_plain
+
+DEFAULT_WRITE_OVERLAY_TIMEOUT = 1.0 # in seconds
+
+class _PendingWrite():
+
+    __slots__ = ('value', 'keys', 'expires', 'sent_time', 'value_before')
+
+    def __init__(self, value, keys, expires):
+        self.value = value
+        self.keys = keys
+        self.expires = expires
+        self.sent_time = None
+        self.value_before = None
+
+class WriteOverlay():
+    """
+    Keeps track of writes that were queued or sent, but not read back yet, so they can be laid over the published
+    data. A write is dropped from the overlay once a cyclic read that started after it was sent brings it back: the
+    read value is the written value, or the PLC changed the value since the write was sent. Otherwise, it's dropped
+    when its timeout passes, e.g. if it's never sent, or the PLC applies it later.
+
+    Args:
+        timeout (float): Seconds after which a write is dropped, whether or not it was read back.
+
+    Attributes:
+        changed (bool): True if writes were added or dropped since it was last reset.
+
+    """
+
+    def __init__(self, timeout=DEFAULT_WRITE_OVERLAY_TIMEOUT):
+        self.timeout = timeout
+        self.changed = False
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def pending(self):
+        """The pending writes. {"Program:my_var": 1, ...}"""
+        return {name: write.value for name, write in self._pending.items()}
+
+    def add(self, values : dict, now : float):
+        """
+        Adds queued writes. A newer write to the same variable replaces the pending one.
+
+        Args:
+            values (dict): The written values, as they will be read back, i.e. decoded by the type schema if any.
+            now (float): The current time.
+
+        """
+        for name, value in values.items():
+            write = self._pending.get(name)
+            keys = write.keys if write is not None else compile_path(name)
+            self._pending[name] = _PendingWrite(value, keys, now + self.timeout)
+        if values:
+            self.changed = True
+
+    def mark_sent(self, names, now : float, published_values : dict):
+        """
+        Records that writes were sent to the PLC. Writes that were sent before aren't updated.
+
+        Args:
+            names (Iterable[str]): The names of the written variables.
+            now (float): The current time.
+            published_values (dict): The last values read from the PLC, to tell when the PLC changed them.
+
+        """
+        for name in names:
+            write = self._pending.get(name)
+            if write is not None and write.sent_time is None:
+                write.sent_time = now
+                write.value_before = published_values.get(name)
+
+    def read_completed(self, published_values : dict, read_timestamp : float, now : float):
+        """
+        Drops the writes that were read back by a cyclic read, and the writes whose timeout passed.
+
+        Args:
+            published_values (dict): The values of the read.
+            read_timestamp (float): The time the values of the read were valid at.
+            now (float): The current time.
+
+        """
+        dropped = [name for name, write in self._pending.items()
+                   if write.expires <= now or (write.sent_time is not None and read_timestamp is not None
+                                               and write.sent_time < read_timestamp
+                                               and _read_back(write, published_values.get(name)))]
+        for name in dropped:
+            del self._pending[name]
+        if dropped:
+            self.changed = True
+
+    def clear(self):
+        if self._pending:
+            self.changed = True
+        self._pending = {}
+
+    def apply(self, data, flat_output : bool, reads):
+        """
+        Returns the data with the pending writes laid over it. The data isn't modified: the dicts and lists on the path
+        of every pending write are copied. A compact snapshot is converted to plain dicts and lists.
+
+        Args:
+            data (dict): The data of a cyclic read, nested or flat.
+            flat_output (bool): If True, the data is keyed by the full variable name.
+            reads (Callable[[str], bool]): Returns True for variables in the cyclic read list. Only those are laid
+                over the data, the others would never be read back.
+
+        Returns:
+            tuple: The data, and the names of the variables that were laid over it.
+
+        """
+        names = [name for name in self._pending if reads(name)]
+        if not names:
+            return data, names
+        if isinstance(data, Record):
+            data = to_plain(data)
+        if flat_output:
+            data = dict(data)
+        copied = set()
+        for name in names:
+            write = self._pending[name]
+            if flat_output:
+                data[name] = write.value
+            else:
+                data = replace_path(data, write.keys, write.value, copied)
+        return data, names
+
+def _read_back(write, value):
+    return value == write.value or value != write.value_before